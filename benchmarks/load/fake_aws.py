@@ -0,0 +1,536 @@
+"""
+EleKnowledge-AI Benchmarks - In-process AWS Services
+Stand-ins for the Cognito, Bedrock, S3 and Lambda clients used by the handlers
+
+Each fake implements only the client methods the handlers call, raises
+botocore ClientErrors with the real error codes, sleeps according to a
+latency model per operation and counts its calls in `calls`.
+
+FakeCognito issues RS256 JWTs signed with a key generated at startup, so
+the handlers' local token verification (auth_tokens) runs unchanged once
+its JWKS cache is seeded with `FakeCognito.jwks()`.
+"""
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import secrets
+import threading
+import time
+import uuid
+from collections import defaultdict
+from fake_dynamodb import client_error
+
+# Cognito default password policy: 8+ characters, uppercase, lowercase, number, symbol
+PASSWORD_PATTERNS = (r'.{8,}', r'[A-Z]', r'[a-z]', r'[0-9]', r'[^A-Za-z0-9]')
+
+# DER prefix of the SHA-256 DigestInfo in an RSASSA-PKCS1-v1_5 signature
+SHA256_DIGEST_INFO = bytes.fromhex('3031300d060960864801650304020105000420')
+
+SMALL_PRIMES = [p for p in range(3, 2000) if all(p % d for d in range(2, int(p ** 0.5) + 1))]
+
+
+class LatencyModel:
+    """
+    Lognormal latency from a median and a p99 (milliseconds)
+
+    Service latencies are right-skewed: most calls are close to the median,
+    a few take several times longer. `scale` shrinks or stretches every
+    sample (e.g. 0.1 for quick runs).
+    """
+
+    def __init__(self, median_ms: float, p99_ms: float, scale: float = 1.0, rng: random.Random = None):
+        self.mu = math.log(median_ms / 1000)
+        self.sigma = math.log(p99_ms / median_ms) / 2.326
+        self.scale = scale
+        self.rng = rng or random.Random()
+
+    def sample(self) -> float:
+        return self.rng.lognormvariate(self.mu, self.sigma) * self.scale
+
+    def sleep(self):
+        if self.scale:
+            time.sleep(self.sample())
+
+
+class Latencies:
+    """
+    Latency models per (service, operation)
+
+    Args:
+        models: {(service, operation): (median ms, p99 ms)}; operations
+            without a model take no time
+    """
+
+    def __init__(self, models: dict, scale: float = 1.0, seed: int = None):
+        rng = random.Random(seed)
+        self.models = {key: LatencyModel(median, p99, scale, rng) for key, (median, p99) in models.items()}
+        self.scale = scale
+
+    def sleep(self, service: str, operation: str):
+        model = self.models.get((service, operation))
+        if model:
+            model.sleep()
+
+    def for_service(self, service: str):
+        """Callable(operation) for FakeDynamoDB's latency argument"""
+        return lambda operation: self.sleep(service, operation)
+
+
+class FakeService:
+    """Call counting and latency shared by the fakes"""
+
+    service = None
+
+    def __init__(self, latencies: Latencies = None):
+        self.latencies = latencies
+        self.calls = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def _call(self, operation: str):
+        with self.lock:
+            self.calls[operation] += 1
+        if self.latencies:
+            self.latencies.sleep(self.service, operation)
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _is_probable_prime(n: int, rounds: int = 40) -> bool:
+    if any(n % p == 0 for p in SMALL_PRIMES):
+        return n in SMALL_PRIMES
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d, r = d // 2, r + 1
+    for _ in range(rounds):
+        x = pow(secrets.randbelow(n - 3) + 2, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _random_prime(bits: int, exponent: int) -> int:
+    while True:
+        candidate = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+        if (candidate - 1) % exponent and _is_probable_prime(candidate):
+            return candidate
+
+
+class RsaSigningKey:
+    """RS256 signing key (RSASSA-PKCS1-v1_5 with SHA-256), CRT signing"""
+
+    def __init__(self, bits: int = 2048, exponent: int = 65537):
+        while True:
+            p, q = _random_prime(bits // 2, exponent), _random_prime(bits // 2, exponent)
+            if p != q and (p * q).bit_length() == bits:
+                break
+        self.modulus, self.exponent = p * q, exponent
+        d = pow(exponent, -1, (p - 1) * (q - 1))
+        self.p, self.q = p, q
+        self.dp, self.dq, self.q_inverse = d % (p - 1), d % (q - 1), pow(q, -1, p)
+        self.size = (bits + 7) // 8
+        self.kid = hashlib.sha256(str(self.modulus).encode('ascii')).hexdigest()[:16]
+
+    def sign(self, message: bytes) -> bytes:
+        digest_info = SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+        block = b'\x00\x01' + b'\xff' * (self.size - len(digest_info) - 3) + b'\x00' + digest_info
+        m = int.from_bytes(block, 'big')
+        m1, m2 = pow(m, self.dp, self.p), pow(m, self.dq, self.q)
+        signature = m2 + self.q * ((m1 - m2) * self.q_inverse % self.p)
+        return signature.to_bytes(self.size, 'big')
+
+    def jwt(self, claims: dict) -> str:
+        header = _b64url(json.dumps({'kid': self.kid, 'alg': 'RS256'}).encode('utf-8'))
+        payload = _b64url(json.dumps(claims).encode('utf-8'))
+        signature = self.sign(f"{header}.{payload}".encode('ascii'))
+        return f"{header}.{payload}.{_b64url(signature)}"
+
+
+class FakeCognito(FakeService):
+    """
+    Stand-in for boto3.client('cognito-idp') (user pool with email usernames)
+
+    Verification and password reset codes are not sent anywhere; a scenario
+    reads them with `code_for(email)`.
+    """
+
+    service = 'cognito-idp'
+
+    def __init__(self, user_pool_id: str, client_id: str, region: str, latencies: Latencies = None,
+                 token_seconds: int = 3600):
+        super().__init__(latencies)
+        self.user_pool_id = user_pool_id
+        self.client_id = client_id
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        self.token_seconds = token_seconds
+        self.key = RsaSigningKey()
+        self.users = {}
+        self.codes = {}
+        self.refresh_tokens = {}
+        self.issued = {}
+
+    def jwks(self) -> dict:
+        """{kid: (modulus, exponent)}, the format of auth_tokens' JWKS cache"""
+        return {self.key.kid: (self.key.modulus, self.key.exponent)}
+
+    def code_for(self, email: str) -> str:
+        return self.codes.get(email)
+
+    def _check_client(self, client_id: str, operation: str):
+        if client_id != self.client_id:
+            raise client_error('ResourceNotFoundException', 'User pool client does not exist.', operation)
+
+    def _check_password(self, password: str, operation: str):
+        if not all(re.search(pattern, password or '') for pattern in PASSWORD_PATTERNS):
+            raise client_error('InvalidPasswordException', 'Password did not conform with policy', operation)
+
+    def _user(self, username: str, operation: str) -> dict:
+        user = self.users.get(username)
+        if not user:
+            raise client_error('UserNotFoundException', 'User does not exist.', operation)
+        return user
+
+    def _new_code(self, username: str) -> dict:
+        self.codes[username] = f"{secrets.randbelow(1000000):06d}"
+        return {'Destination': username, 'DeliveryMedium': 'EMAIL', 'AttributeName': 'email'}
+
+    def _tokens(self, user: dict) -> dict:
+        """
+        ID and access tokens of a user
+
+        Signing in pure Python takes ~10 ms of CPU per token, which would
+        show up as handler latency under load, so a user's tokens are signed
+        once and reused for half their lifetime.
+        """
+        now = int(time.time())
+        cached = self.issued.get(user['sub'])
+        if cached and now < cached[0]:
+            return dict(cached[1])
+        common = {'sub': user['sub'], 'iss': self.issuer, 'auth_time': now, 'iat': now,
+                  'exp': now + self.token_seconds, 'jti': str(uuid.uuid4())}
+        id_token = self.key.jwt({**common, 'aud': self.client_id, 'token_use': 'id', 'email_verified': True,
+                                 'cognito:username': user['sub'], 'email': user['email']})
+        access_token = self.key.jwt({**common, 'client_id': self.client_id, 'token_use': 'access',
+                                     'scope': 'aws.cognito.signin.user.admin', 'username': user['sub']})
+        tokens = {'AccessToken': access_token, 'IdToken': id_token, 'ExpiresIn': self.token_seconds,
+                  'TokenType': 'Bearer'}
+        self.issued[user['sub']] = (now + self.token_seconds // 2, tokens)
+        return dict(tokens)
+
+    def sign_up(self, ClientId, Username, Password, UserAttributes=None):
+        self._call('SignUp')
+        self._check_client(ClientId, 'SignUp')
+        with self.lock:
+            if Username in self.users:
+                raise client_error('UsernameExistsException', 'An account with the given email already exists.',
+                                   'SignUp')
+            self._check_password(Password, 'SignUp')
+            user = self.users[Username] = {'sub': str(uuid.uuid4()), 'email': Username, 'password': Password,
+                                           'confirmed': False}
+            delivery = self._new_code(Username)
+        return {'UserConfirmed': False, 'UserSub': user['sub'], 'CodeDeliveryDetails': delivery}
+
+    def confirm_sign_up(self, ClientId, Username, ConfirmationCode):
+        self._call('ConfirmSignUp')
+        self._check_client(ClientId, 'ConfirmSignUp')
+        with self.lock:
+            user = self._user(Username, 'ConfirmSignUp')
+            if user['confirmed']:
+                raise client_error('NotAuthorizedException', 'User cannot be confirmed. Current status is CONFIRMED',
+                                   'ConfirmSignUp')
+            if self.codes.get(Username) != ConfirmationCode:
+                raise client_error('CodeMismatchException', 'Invalid verification code provided, please try again.',
+                                   'ConfirmSignUp')
+            user['confirmed'] = True
+            del self.codes[Username]
+        return {}
+
+    def initiate_auth(self, ClientId, AuthFlow, AuthParameters):
+        self._call(f"InitiateAuth:{AuthFlow}")
+        self._check_client(ClientId, 'InitiateAuth')
+        if AuthFlow == 'USER_PASSWORD_AUTH':
+            user = self._user(AuthParameters.get('USERNAME'), 'InitiateAuth')
+            if user['password'] != AuthParameters.get('PASSWORD'):
+                raise client_error('NotAuthorizedException', 'Incorrect username or password.', 'InitiateAuth')
+            if not user['confirmed']:
+                raise client_error('UserNotConfirmedException', 'User is not confirmed.', 'InitiateAuth')
+            refresh_token = secrets.token_urlsafe(96)
+            with self.lock:
+                self.refresh_tokens[refresh_token] = user['email']
+            return {'AuthenticationResult': {**self._tokens(user), 'RefreshToken': refresh_token},
+                    'ChallengeParameters': {}}
+        if AuthFlow == 'REFRESH_TOKEN_AUTH':
+            username = self.refresh_tokens.get(AuthParameters.get('REFRESH_TOKEN'))
+            if not username:
+                raise client_error('NotAuthorizedException', 'Invalid Refresh Token', 'InitiateAuth')
+            # No rotation: the refresh token stays valid and none is returned
+            return {'AuthenticationResult': self._tokens(self.users[username]), 'ChallengeParameters': {}}
+        raise client_error('InvalidParameterException', f"Unsupported auth flow: {AuthFlow}", 'InitiateAuth')
+
+    def get_user(self, AccessToken):
+        """Attributes of the owner of an access token (the warm-up calls it with an invalid one)"""
+        self._call('GetUser')
+        with self.lock:
+            user = next((self.users[email] for email in self.users
+                         if self.issued.get(self.users[email]['sub'], (0, {}))[1].get('AccessToken') == AccessToken),
+                        None)
+        if not user:
+            raise client_error('NotAuthorizedException', 'Invalid Access Token', 'GetUser')
+        return {'Username': user['sub'], 'UserAttributes': [{'Name': 'sub', 'Value': user['sub']},
+                                                            {'Name': 'email', 'Value': user['email']}]}
+
+    def forgot_password(self, ClientId, Username):
+        self._call('ForgotPassword')
+        self._check_client(ClientId, 'ForgotPassword')
+        with self.lock:
+            self._user(Username, 'ForgotPassword')
+            return {'CodeDeliveryDetails': self._new_code(Username)}
+
+    def confirm_forgot_password(self, ClientId, Username, ConfirmationCode, Password):
+        self._call('ConfirmForgotPassword')
+        self._check_client(ClientId, 'ConfirmForgotPassword')
+        with self.lock:
+            user = self._user(Username, 'ConfirmForgotPassword')
+            if self.codes.get(Username) != ConfirmationCode:
+                raise client_error('CodeMismatchException', 'Invalid verification code provided, please try again.',
+                                   'ConfirmForgotPassword')
+            self._check_password(Password, 'ConfirmForgotPassword')
+            user['password'] = Password
+            del self.codes[Username]
+            # A password reset signs the user out everywhere
+            self.refresh_tokens = {token: name for token, name in self.refresh_tokens.items() if name != Username}
+        return {}
+
+
+class Body:
+    """Minimal botocore StreamingBody replacement backed by bytes"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self, amt: int = None) -> bytes:
+        data, self.data = (self.data, b'') if amt is None else (self.data[:amt], self.data[amt:])
+        return data
+
+
+class FakeBedrockAgentRuntime(FakeService):
+    """
+    Stand-in for boto3.client('bedrock-agent-runtime'): Knowledge Base retrieve
+
+    Results come from a fixed synthetic catalog of documents in the
+    documents bucket, with the metadata keys the RAG function reads.
+    """
+
+    service = 'bedrock-agent-runtime'
+    DOCUMENT_TYPES = ('manual', 'policy', 'report', 'specification')
+
+    def __init__(self, documents_bucket: str, latencies: Latencies = None, documents: int = 200,
+                 chunk_chars: int = 600, seed: int = 0):
+        super().__init__(latencies)
+        rng = random.Random(seed)
+        self.rng = random.Random(seed + 1)
+        self.chunk_chars = chunk_chars
+        self.catalog = [{
+            'x-amz-bedrock-kb-source-uri': f"s3://{documents_bucket}/manuals/document-{index:04d}.pdf",
+            'document': rng.choice(self.DOCUMENT_TYPES),
+            'title': f"保守点検マニュアル {index:04d}",
+            'product': f"Product{rng.randint(1, 12)}",
+            'model': f"v{rng.randint(1, 5)}.0"
+        } for index in range(documents)]
+
+    def retrieve(self, knowledgeBaseId, retrievalQuery, retrievalConfiguration=None):
+        self._call('Retrieve')
+        count = ((retrievalConfiguration or {}).get('vectorSearchConfiguration') or {}).get('numberOfResults', 5)
+        with self.lock:
+            # Several chunks of one document are common in real results
+            documents = [self.rng.choice(self.catalog) for _ in range(count)]
+            scores = sorted((self.rng.uniform(0.3, 0.9) for _ in range(count)), reverse=True)
+        return {'retrievalResults': [{
+            'content': {'text': ('点検手順と安全上の注意事項。' * self.chunk_chars)[:self.chunk_chars]},
+            'location': {'type': 'S3', 's3Location': {'uri': metadata['x-amz-bedrock-kb-source-uri']}},
+            'metadata': dict(metadata),
+            'score': score
+        } for metadata, score in zip(documents, scores)]}
+
+
+class FakeBedrockRuntime(FakeService):
+    """
+    Stand-in for boto3.client('bedrock-runtime'): Anthropic Messages invoke_model
+
+    Latency is time to first token plus output tokens at `tokens_per_second`,
+    so long answers take proportionally longer. With `max_concurrency`,
+    calls over that many in flight are retried with backoff like botocore's
+    standard retry mode and then fail with ThrottlingException, which is
+    how an on-demand model quota shows up under load.
+    """
+
+    service = 'bedrock-runtime'
+
+    def __init__(self, latencies: Latencies = None, tokens_per_second: float = 60.0, output_tokens: tuple = (150, 600),
+                 max_concurrency: int = 0, max_attempts: int = 3, seed: int = 0):
+        super().__init__(latencies)
+        self.rng = random.Random(seed)
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.in_flight = 0
+        self.throttled = 0
+
+    def _acquire(self) -> bool:
+        with self.lock:
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.throttled += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def invoke_model(self, modelId, body, contentType='application/json', accept='application/json'):
+        self._call('InvokeModel')
+        request = json.loads(body)
+        if 'messages' not in request:
+            raise client_error('ValidationException', 'Malformed input request: required key [messages] not found',
+                               'InvokeModel')
+        for attempt in range(self.max_attempts):
+            if self._acquire():
+                break
+            if attempt + 1 < self.max_attempts:
+                time.sleep(self.rng.uniform(0, min(20, 2 ** attempt)) * (self.latencies.scale if self.latencies else 1))
+        else:
+            raise client_error('ThrottlingException', 'Too many requests, please wait before trying again.',
+                               'InvokeModel')
+
+        try:
+            input_tokens = sum(len(message['content']) for message in request['messages']) // 2
+            with self.lock:
+                output_tokens = self.rng.randint(*self.output_tokens)
+            if self.latencies:
+                self.latencies.sleep(self.service, 'InvokeModel:FirstToken')
+                if self.latencies.scale:
+                    time.sleep(output_tokens / self.tokens_per_second * self.latencies.scale)
+            text = ('資料に基づく回答です。' * output_tokens)[:output_tokens * 2]
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+        return {
+            'body': Body(json.dumps({
+                'id': f"msg_{uuid.uuid4().hex}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': modelId,
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+                'usage': {'input_tokens': input_tokens, 'output_tokens': output_tokens}
+            }, ensure_ascii=False).encode('utf-8')),
+            'contentType': 'application/json'
+        }
+
+
+class FakeS3(FakeService):
+    """
+    Stand-in for boto3.client('s3'): objects in memory, local URL signing
+
+    generate_presigned_url signs locally like the real client (no request
+    and no latency), but is counted.
+    """
+
+    service = 's3'
+
+    def __init__(self, latencies: Latencies = None):
+        super().__init__(latencies)
+        self.objects = {}
+        self.multipart = {}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, HttpMethod=None):
+        with self.lock:
+            self.calls['GeneratePresignedUrl'] += 1
+        params = Params or {}
+        signature = hashlib.sha256(f"{ClientMethod}{sorted(params.items())}{ExpiresIn}".encode('utf-8')).hexdigest()
+        return (f"https://{params.get('Bucket')}.s3.amazonaws.com/{params.get('Key')}"
+                f"?X-Amz-Expires={ExpiresIn}&X-Amz-Signature={signature}")
+
+    def put_object(self, Bucket, Key, Body=b'', **kwargs):
+        self._call('PutObject')
+        data = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        with self.lock:
+            self.objects[(Bucket, Key)] = data
+        return {'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._call('GetObject')
+        data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise client_error('NoSuchKey', 'The specified key does not exist.', 'GetObject')
+        return {'Body': Body(data), 'ContentLength': len(data)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call('HeadObject')
+        data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise client_error('404', 'Not Found', 'HeadObject')
+        return {'ContentLength': len(data)}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._call('CreateMultipartUpload')
+        upload_id = uuid.uuid4().hex
+        with self.lock:
+            self.multipart[upload_id] = {}
+        return {'Bucket': Bucket, 'Key': Key, 'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._call('UploadPart')
+        data = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        with self.lock:
+            self.multipart[UploadId][PartNumber] = data
+        return {'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload=None, **kwargs):
+        self._call('CompleteMultipartUpload')
+        with self.lock:
+            parts = self.multipart.pop(UploadId)
+            self.objects[(Bucket, Key)] = b''.join(parts[number] for number in sorted(parts))
+        return {'Bucket': Bucket, 'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._call('AbortMultipartUpload')
+        with self.lock:
+            self.multipart.pop(UploadId, None)
+        return {}
+
+
+class FakeLambda(FakeService):
+    """
+    Stand-in for boto3.client('lambda'): asynchronous invocations run the
+    target handler on a background thread
+    """
+
+    service = 'lambda'
+
+    def __init__(self, handlers: dict = None, latencies: Latencies = None):
+        super().__init__(latencies)
+        self.handlers = handlers or {}
+        self.threads = []
+
+    def invoke(self, FunctionName, InvocationType='RequestResponse', Payload=b'{}'):
+        self._call(f"Invoke:{InvocationType}")
+        handler = self.handlers.get(FunctionName)
+        if not handler:
+            raise client_error('ResourceNotFoundException', f"Function not found: {FunctionName}", 'Invoke')
+        event = json.loads(Payload)
+        if InvocationType == 'Event':
+            thread = threading.Thread(target=handler, args=(event, None), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+            return {'StatusCode': 202}
+        return {'StatusCode': 200, 'Payload': Body(json.dumps(handler(event, None)).encode('utf-8'))}
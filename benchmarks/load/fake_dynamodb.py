@@ -0,0 +1,552 @@
+"""
+EleKnowledge-AI Benchmarks - In-process DynamoDB
+Dict-backed subset of the boto3 DynamoDB resource used by the handlers
+
+Supported: get_item, put_item, update_item, delete_item, query (table and
+GSIs) and the resource's batch_get_item, with string expressions
+(KeyCondition / Filter / Condition / Projection / Update) and
+ExpressionAttributeNames / Values.
+
+Behaviour that matters for load results is emulated:
+- Limit and the 1 MB page size stop a query and return LastEvaluatedKey;
+  ExclusiveStartKey resumes it
+- GSIs are maintained on every write, are sparse (items without the
+  index key are not indexed), return only their projection and reject
+  ConsistentRead
+- Items over 400 KB are rejected; numbers come back as Decimal
+- Request counts and estimated read / write units are kept per table
+"""
+import copy
+import math
+import re
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+MAX_ITEM_BYTES = 400 * 1024
+MAX_PAGE_BYTES = 1024 * 1024
+
+TOKEN_PATTERN = re.compile(r"\s*(#\w+|:\w+|<>|<=|>=|[=<>(),+\-]|[A-Za-z_][\w.]*)")
+FUNCTIONS = ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains', 'if_not_exists',
+             'list_append', 'size')
+
+
+def client_error(code: str, message: str, operation: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+def to_stored(value):
+    """Python value -> stored attribute (ints become Decimal, as the resource API returns them)"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, dict):
+        return {k: to_stored(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_stored(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if hasattr(value, 'value') and isinstance(value.value, (bytes, bytearray)):
+        return bytes(value.value)  # boto3 Binary
+    if isinstance(value, set):
+        return {to_stored(v) for v in value}
+    return value
+
+
+def attribute_size(value) -> int:
+    """Approximate DynamoDB size of an attribute value in bytes"""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, Decimal):
+        return len(str(value)) // 2 + 2
+    if isinstance(value, dict):
+        return 3 + sum(len(k) + attribute_size(v) + 1 for k, v in value.items())
+    if isinstance(value, (list, set)):
+        return 3 + sum(attribute_size(v) + 1 for v in value)
+    return 1
+
+
+def item_size(item: dict) -> int:
+    return sum(len(name.encode('utf-8')) + attribute_size(value) for name, value in item.items())
+
+
+class Expression:
+    """Tokenizer and recursive-descent parser of DynamoDB expressions"""
+
+    def __init__(self, text: str, names: dict = None, values: dict = None):
+        self.tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = TOKEN_PATTERN.match(text, position)
+            if not match:
+                raise client_error('ValidationException', f"Invalid expression near: {text[position:]}", 'Expression')
+            self.tokens.append(match.group(1))
+            position = match.end()
+        self.position = 0
+        self.names = names or {}
+        self.values = {k: to_stored(v) for k, v in (values or {}).items()}
+
+    # Tokens
+    def peek(self, offset: int = 0) -> str:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self, expected: str = None) -> str:
+        token = self.peek()
+        if token is None or (expected and token.upper() != expected):
+            raise client_error('ValidationException', f"Expected {expected or 'token'}, got {token}", 'Expression')
+        self.position += 1
+        return token
+
+    def at_keyword(self, *keywords) -> bool:
+        token = self.peek()
+        return token is not None and token.upper() in keywords
+
+    def done(self) -> bool:
+        return self.position >= len(self.tokens)
+
+    # Operands
+    def name(self, token: str) -> str:
+        if token.startswith('#'):
+            if token not in self.names:
+                raise client_error('ValidationException', f"Undefined attribute name {token}", 'Expression')
+            return self.names[token]
+        return token
+
+    def operand(self):
+        token = self.take()
+        if token.startswith(':'):
+            if token not in self.values:
+                raise client_error('ValidationException', f"Undefined attribute value {token}", 'Expression')
+            return ('value', self.values[token])
+        if token in FUNCTIONS and self.peek() == '(':
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                args.append(self.operand())
+            self.take(')')
+            return ('call', token, args)
+        return ('path', self.name(token))
+
+    # Conditions
+    def condition(self):
+        node = self.conjunction()
+        while self.at_keyword('OR'):
+            self.take()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.at_keyword('AND'):
+            self.take()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.at_keyword('NOT'):
+            self.take()
+            return ('not', self.negation())
+        if self.peek() == '(':
+            self.take('(')
+            node = self.condition()
+            self.take(')')
+            return node
+        left = self.operand()
+        if left[0] == 'call' and left[1] != 'size':
+            return left
+        if self.at_keyword('BETWEEN'):
+            self.take()
+            low = self.operand()
+            self.take('AND')
+            return ('between', left, low, self.operand())
+        if self.at_keyword('IN'):
+            self.take()
+            self.take('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                options.append(self.operand())
+            self.take(')')
+            return ('in', left, options)
+        operator = self.take()
+        if operator not in ('=', '<>', '<', '<=', '>', '>='):
+            raise client_error('ValidationException', f"Invalid operator {operator}", 'Expression')
+        return ('compare', operator, left, self.operand())
+
+    def parse_condition(self):
+        node = self.condition()
+        if not self.done():
+            raise client_error('ValidationException', f"Unexpected token {self.peek()}", 'Expression')
+        return node
+
+    # Update
+    def parse_update(self) -> list:
+        actions = []
+        while not self.done():
+            clause = self.take().upper()
+            while True:
+                if clause == 'SET':
+                    path = self.name(self.take())
+                    self.take('=')
+                    value = self.operand()
+                    if self.peek() in ('+', '-'):
+                        value = ('arith', self.take(), value, self.operand())
+                    actions.append(('SET', path, value))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', self.name(self.take()), None))
+                elif clause in ('ADD', 'DELETE'):
+                    actions.append((clause, self.name(self.take()), self.operand()))
+                else:
+                    raise client_error('ValidationException', f"Unknown update clause {clause}", 'UpdateItem')
+                if self.peek() != ',':
+                    break
+                self.take(',')
+        return actions
+
+    # Projection
+    def parse_projection(self) -> list:
+        paths = [self.name(self.take())]
+        while self.peek() == ',':
+            self.take(',')
+            paths.append(self.name(self.take()))
+        return paths
+
+
+def evaluate(node, item: dict):
+    """Value of an operand / truth of a condition against an item"""
+    kind = node[0]
+    if kind == 'value':
+        return node[1]
+    if kind == 'path':
+        return item.get(node[1])
+    if kind == 'call':
+        function, args = node[1], node[2]
+        if function == 'attribute_exists':
+            return args[0][1] in item
+        if function == 'attribute_not_exists':
+            return args[0][1] not in item
+        if function == 'begins_with':
+            value, prefix = evaluate(args[0], item), evaluate(args[1], item)
+            return isinstance(value, (str, bytes)) and value.startswith(prefix)
+        if function == 'contains':
+            value, member = evaluate(args[0], item), evaluate(args[1], item)
+            return value is not None and member in value
+        if function == 'if_not_exists':
+            return item[args[0][1]] if args[0][1] in item else evaluate(args[1], item)
+        if function == 'list_append':
+            return list(evaluate(args[0], item) or []) + list(evaluate(args[1], item) or [])
+        if function == 'size':
+            value = evaluate(args[0], item)
+            return Decimal(attribute_size(value) if isinstance(value, (str, bytes)) else len(value or ()))
+    if kind == 'arith':
+        left, right = evaluate(node[2], item), evaluate(node[3], item)
+        return left + right if node[1] == '+' else left - right
+    if kind == 'and':
+        return evaluate(node[1], item) and evaluate(node[2], item)
+    if kind == 'or':
+        return evaluate(node[1], item) or evaluate(node[2], item)
+    if kind == 'not':
+        return not evaluate(node[1], item)
+    if kind == 'between':
+        value = evaluate(node[1], item)
+        return value is not None and evaluate(node[2], item) <= value <= evaluate(node[3], item)
+    if kind == 'in':
+        return evaluate(node[1], item) in [evaluate(option, item) for option in node[2]]
+    if kind == 'compare':
+        operator, left, right = node[1], evaluate(node[2], item), evaluate(node[3], item)
+        if operator == '=':
+            return left == right
+        if operator == '<>':
+            return left != right
+        if left is None or right is None or type(left) is not type(right):
+            return False
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[operator]
+    raise client_error('ValidationException', f"Unsupported expression node {kind}", 'Expression')
+
+
+def project(item: dict, paths: list) -> dict:
+    return {path: item[path] for path in paths if path in item}
+
+
+class FakeTable:
+    """
+    One table: {hash value: {sort value: item}}
+
+    Args:
+        key_schema: (hash attribute, sort attribute or None)
+        indexes: {index name: (hash attribute, sort attribute or None,
+            projected non-key attributes or 'ALL')}
+    """
+
+    def __init__(self, resource, name: str, key_schema: tuple, indexes: dict = None):
+        self.resource = resource
+        self.name = name
+        self.table_name = name
+        self.hash_key, self.sort_key = key_schema
+        self.indexes = indexes or {}
+        self.partitions = defaultdict(dict)
+        # {index name: {index hash value: {(table hash, table sort): item}}}
+        self.index_entries = {name: defaultdict(dict) for name in self.indexes}
+        self.lock = threading.RLock()
+
+    # Keys
+    def _key(self, key: dict) -> tuple:
+        if self.hash_key not in key or (self.sort_key and self.sort_key not in key):
+            raise client_error('ValidationException', 'The provided key element does not match the schema',
+                               'GetItem')
+        return to_stored(key[self.hash_key]), to_stored(key[self.sort_key]) if self.sort_key else None
+
+    def _key_of(self, item: dict) -> dict:
+        key = {self.hash_key: item[self.hash_key]}
+        if self.sort_key:
+            key[self.sort_key] = item[self.sort_key]
+        return key
+
+    def _get(self, key: dict) -> dict:
+        hash_value, sort_value = self._key(key)
+        return self.partitions.get(hash_value, {}).get(sort_value)
+
+    def _store(self, item: dict, operation: str):
+        size = item_size(item)
+        if size > MAX_ITEM_BYTES:
+            raise client_error('ValidationException', 'Item size has exceeded the maximum allowed size', operation)
+        key = self._key(item)
+        self._unindex(key, self.partitions.get(key[0], {}).get(key[1]))
+        self.partitions[key[0]][key[1]] = item
+        for index_name, (hash_key, sort_key, _) in self.indexes.items():
+            # Sparse: items without the index key are not indexed
+            if hash_key in item and (not sort_key or sort_key in item):
+                self.index_entries[index_name][item[hash_key]][key] = item
+        self.resource.count(self.name, operation, write_bytes=size)
+
+    def _delete(self, key: dict):
+        key = self._key(key)
+        partition = self.partitions.get(key[0], {})
+        self._unindex(key, partition.pop(key[1], None))
+        if not partition:
+            self.partitions.pop(key[0], None)
+
+    def _unindex(self, key: tuple, item: dict):
+        if not item:
+            return
+        for index_name, (hash_key, _, _) in self.indexes.items():
+            entries = self.index_entries[index_name].get(item.get(hash_key))
+            if entries is not None:
+                entries.pop(key, None)
+
+    def _check(self, condition: str, names: dict, values: dict, item: dict, operation: str):
+        if condition and not evaluate(Expression(condition, names, values).parse_condition(), item or {}):
+            self.resource.count(self.name, operation, write_bytes=1)  # Failed conditions are still billed
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed', operation)
+
+    # Item operations
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, ConsistentRead=False):
+        self.resource.sleep('GetItem')
+        with self.lock:
+            item = self._get(Key)
+            self.resource.count(self.name, 'GetItem', read_bytes=item_size(item) if item else 1,
+                                consistent=ConsistentRead)
+            if item is None:
+                return {}
+            item = copy.deepcopy(item)
+        if ProjectionExpression:
+            item = project(item, Expression(ProjectionExpression, ExpressionAttributeNames).parse_projection())
+        return {'Item': item}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None):
+        self.resource.sleep('PutItem')
+        item = to_stored(Item)
+        with self.lock:
+            self._check(ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                        self._get(item), 'PutItem')
+            self._store(item, 'PutItem')
+        return {}
+
+    def update_item(self, Key, UpdateExpression=None, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE'):
+        self.resource.sleep('UpdateItem')
+        actions = Expression(UpdateExpression or '', ExpressionAttributeNames,
+                             ExpressionAttributeValues).parse_update()
+        with self.lock:
+            current = self._get(Key)
+            self._check(ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, current,
+                        'UpdateItem')
+            item = copy.deepcopy(current) if current else to_stored(dict(Key))
+            before = dict(item)
+            for action, path, operand in actions:
+                if action == 'SET':
+                    item[path] = evaluate(operand, before)
+                elif action == 'REMOVE':
+                    item.pop(path, None)
+                elif action == 'ADD':
+                    value = evaluate(operand, before)
+                    item[path] = (item[path] | value if isinstance(value, set) else item[path] + value) \
+                        if path in item else value
+                elif action == 'DELETE':
+                    item[path] = item.get(path, set()) - evaluate(operand, before)
+            self._store(item, 'UpdateItem')
+            result = copy.deepcopy(item)
+        if ReturnValues == 'ALL_NEW':
+            return {'Attributes': result}
+        if ReturnValues == 'UPDATED_NEW':
+            return {'Attributes': {path: result[path] for _, path, _ in actions if path in result}}
+        return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None):
+        self.resource.sleep('DeleteItem')
+        with self.lock:
+            current = self._get(Key)
+            self._check(ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, current,
+                        'DeleteItem')
+            self._delete(Key)
+            self.resource.count(self.name, 'DeleteItem', write_bytes=item_size(current) if current else 1)
+        return {}
+
+    def query(self, KeyConditionExpression, IndexName=None, FilterExpression=None, ProjectionExpression=None,
+              ExpressionAttributeNames=None, ExpressionAttributeValues=None, ScanIndexForward=True, Limit=None,
+              ExclusiveStartKey=None, ConsistentRead=False, Select=None):
+        self.resource.sleep('Query')
+        if IndexName and ConsistentRead:
+            raise client_error('ValidationException', 'Consistent reads are not supported on global secondary '
+                                                      'indexes', 'Query')
+        if IndexName and IndexName not in self.indexes:
+            raise client_error('ValidationException', f"The table does not have the specified index: {IndexName}",
+                               'Query')
+        names, values = ExpressionAttributeNames, ExpressionAttributeValues
+        hash_key, sort_key, projection = self.indexes[IndexName] if IndexName else \
+            (self.hash_key, self.sort_key, 'ALL')
+        key_condition = Expression(KeyConditionExpression, names, values).parse_condition()
+        hash_value = self._hash_value(key_condition, hash_key)
+        filter_condition = Expression(FilterExpression, names, values).parse_condition() if FilterExpression else None
+        projection_paths = Expression(ProjectionExpression, names).parse_projection() if ProjectionExpression else None
+
+        def order(item):
+            return (item.get(sort_key) if sort_key else None, item[self.hash_key],
+                    item.get(self.sort_key) if self.sort_key else None)
+
+        with self.lock:
+            if IndexName:
+                candidates = list(self.index_entries[IndexName].get(hash_value, {}).values())
+            else:
+                candidates = list(self.partitions.get(hash_value, {}).values())
+            candidates = [item for item in candidates if evaluate(key_condition, item)]
+            candidates.sort(key=order, reverse=not ScanIndexForward)
+
+            if ExclusiveStartKey:
+                start = order(to_stored(ExclusiveStartKey))
+                candidates = [item for item in candidates
+                              if (order(item) > start if ScanIndexForward else order(item) < start)]
+
+            # A page ends at Limit evaluated items or 1 MB; DynamoDB does not look
+            # ahead, so a full page has a LastEvaluatedKey even if nothing follows
+            evaluated, page_bytes, last_key = [], 0, None
+            for item in candidates:
+                evaluated.append(item)
+                page_bytes += item_size(item)
+                if (Limit is not None and len(evaluated) >= Limit) or page_bytes >= MAX_PAGE_BYTES:
+                    last_key = item
+                    break
+
+            items = [copy.deepcopy(item) for item in evaluated
+                     if filter_condition is None or evaluate(filter_condition, item)]
+            self.resource.count(self.name, 'Query', read_bytes=page_bytes, consistent=ConsistentRead)
+
+        if IndexName and projection != 'ALL':
+            keep = {self.hash_key, self.sort_key, hash_key, sort_key, *projection} - {None}
+            items = [project(item, keep) for item in items]
+        if projection_paths:
+            items = [project(item, projection_paths) for item in items]
+
+        response = {'Count': len(items), 'ScannedCount': len(evaluated)}
+        if Select != 'COUNT':
+            response['Items'] = items
+        if last_key is not None:
+            key_attributes = {self.hash_key, self.sort_key, hash_key, sort_key} - {None}
+            response['LastEvaluatedKey'] = project(copy.deepcopy(last_key), key_attributes)
+        return response
+
+    @staticmethod
+    def _hash_value(node, hash_key: str):
+        """Value of the `hash_key = :value` term of a key condition"""
+        if node[0] == 'compare' and node[1] == '=' and node[2] == ('path', hash_key):
+            return node[3][1]
+        if node[0] == 'and':
+            for child in node[1:]:
+                try:
+                    return FakeTable._hash_value(child, hash_key)
+                except ClientError:
+                    pass
+        raise client_error('ValidationException', f"Query condition missed key schema element: {hash_key}", 'Query')
+
+
+class FakeDynamoDB:
+    """
+    Stand-in for boto3.resource('dynamodb')
+
+    Args:
+        latency: Optional callable(operation) -> seconds slept before each request
+    """
+
+    def __init__(self, latency=None):
+        self.tables = {}
+        self.latency = latency
+        self.requests = defaultdict(lambda: defaultdict(int))
+        self.units = defaultdict(lambda: {'read': 0.0, 'write': 0.0})
+        self.lock = threading.Lock()
+
+    def create_table(self, name: str, key_schema: tuple, indexes: dict = None) -> FakeTable:
+        self.tables[name] = FakeTable(self, name, key_schema, indexes)
+        return self.tables[name]
+
+    def Table(self, name: str) -> FakeTable:
+        if name not in self.tables:
+            raise client_error('ResourceNotFoundException', f"Requested resource not found: {name}", 'DescribeTable')
+        return self.tables[name]
+
+    def sleep(self, operation: str):
+        if self.latency:
+            self.latency(operation)
+
+    def count(self, table: str, operation: str, read_bytes: int = 0, write_bytes: int = 0, consistent: bool = True):
+        with self.lock:
+            self.requests[table][operation] += 1
+            if read_bytes:
+                self.units[table]['read'] += math.ceil(read_bytes / 4096) * (1 if consistent else 0.5)
+            if write_bytes:
+                self.units[table]['write'] += math.ceil(write_bytes / 1024)
+
+    def batch_get_item(self, RequestItems):
+        self.sleep('BatchGetItem')
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self.Table(table_name)
+            with table.lock:
+                items = [copy.deepcopy(item) for item in (table._get(key) for key in request['Keys']) if item]
+            table.resource.count(table_name, 'BatchGetItem', read_bytes=sum(item_size(item) for item in items) or 1,
+                                 consistent=request.get('ConsistentRead', False))
+            responses[table_name] = items
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def report(self) -> dict:
+        """Request counts and estimated capacity units per table"""
+        return {
+            table: {
+                'requests': dict(self.requests[table]),
+                'totalRequests': sum(self.requests[table].values()),
+                'readUnits': round(self.units[table]['read'], 1),
+                'writeUnits': round(self.units[table]['write'], 1),
+                'items': sum(len(partition) for partition in self.tables[table].partitions.values())
+            }
+            for table in self.tables
+        }
@@ -0,0 +1,571 @@
+"""
+EleKnowledge-AI Benchmarks - Full-stack Load Test
+Drive the auth, RAG and chat-management handlers with concurrent users
+against in-process AWS fakes
+
+Usage:
+    python load_test.py [--users 100] [--concurrency 100] [--questions 5]
+                        [--latency-scale 1.0] [--think-time 2] [--ramp-up 10]
+                        [--auth-mode consolidated|per-route] [--bedrock-concurrency 40]
+                        [--output results.json] [--handler-log handlers.log]
+
+All eight handlers (the six auth routes or the consolidated auth router,
+the RAG function and chat-management) run unchanged in this process.
+Their AWS clients are replaced by fakes: a dict-backed DynamoDB with GSI
+and pagination semantics (fake_dynamodb.py) and Cognito, Bedrock, S3 and
+Lambda with lognormal latency models (fake_aws.py). Each API call goes
+through a pool of emulated Lambda containers per function, so cold starts
+and container counts follow the concurrency.
+
+Every virtual user registers (signup -> verify), then runs the scenario:
+login -> list sessions -> ask --questions questions in a new session ->
+view the session -> delete it, optionally with a token refresh, a password
+reset or an export. The report has throughput, latency percentiles per
+endpoint, DynamoDB requests and capacity units per table, calls per service,
+container statistics and data anomalies seen by the users (e.g. messages
+of another user in their session).
+
+Latencies are modelled, not measured: absolute numbers show how the
+request mix and the service latencies add up, while request counts and
+anomalies are exact.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCHMARK_DIR, '..', '..', 'lambda')
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_aws import (FakeBedrockAgentRuntime, FakeBedrockRuntime, FakeCognito, FakeLambda, FakeS3,  # noqa: E402
+                      Latencies, LatencyModel)
+from fake_dynamodb import FakeDynamoDB  # noqa: E402
+
+REGION = 'us-east-1'
+USER_POOL_ID = f"{REGION}_LoadTest1"
+CLIENT_ID = 'loadtestclient0000000000000'
+PASSWORD = 'LoadTest-Passw0rd!'
+
+# Environment of the handlers (read when their modules are imported)
+ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': REGION,
+    'AWS_REGION': REGION,
+    'COGNITO_USER_POOL_ID': USER_POOL_ID,
+    'COGNITO_CLIENT_ID': CLIENT_ID,
+    'USERS_TABLE': 'users',
+    'RATE_LIMIT_TABLE': 'auth-rate-limits',
+    'CHATLOGS_TABLE': 'chatlogs',
+    'DYNAMODB_CHATLOGS_TABLE': 'chatlogs',
+    'STATS_TABLE': 'chatstats',
+    'DOCUMENTS_BUCKET': 'loadtest-documents',
+    'EXPORTS_BUCKET': 'loadtest-exports',
+    'KNOWLEDGE_BASE_ID': 'LOADTESTKB',
+    'BEDROCK_MODEL_ID': 'anthropic.claude-sonnet-4-20250514-v1:0'
+}
+
+# (service, operation): (median ms, p99 ms), typical in-region values
+LATENCY_MODELS = {
+    ('dynamodb', 'GetItem'): (4, 15),
+    ('dynamodb', 'PutItem'): (6, 25),
+    ('dynamodb', 'UpdateItem'): (6, 25),
+    ('dynamodb', 'DeleteItem'): (6, 25),
+    ('dynamodb', 'Query'): (8, 35),
+    ('dynamodb', 'BatchGetItem'): (8, 35),
+    ('cognito-idp', 'SignUp'): (180, 500),
+    ('cognito-idp', 'ConfirmSignUp'): (120, 350),
+    ('cognito-idp', 'InitiateAuth:USER_PASSWORD_AUTH'): (200, 600),
+    ('cognito-idp', 'InitiateAuth:REFRESH_TOKEN_AUTH'): (120, 350),
+    ('cognito-idp', 'ForgotPassword'): (180, 500),
+    ('cognito-idp', 'GetUser'): (40, 120),
+    ('cognito-idp', 'ConfirmForgotPassword'): (150, 450),
+    ('bedrock-agent-runtime', 'Retrieve'): (350, 1200),
+    ('bedrock-runtime', 'InvokeModel:FirstToken'): (700, 2500),
+    ('s3', 'PutObject'): (25, 120),
+    ('s3', 'GetObject'): (15, 80),
+    ('s3', 'HeadObject'): (10, 60),
+    ('s3', 'CreateMultipartUpload'): (25, 120),
+    ('s3', 'UploadPart'): (40, 200),
+    ('s3', 'CompleteMultipartUpload'): (40, 200),
+    ('s3', 'AbortMultipartUpload'): (20, 100),
+    ('lambda', 'Invoke:Event'): (20, 80),
+    ('api-gateway', 'Overhead'): (10, 40)
+}
+
+# Container init (imports, boto3 clients) of a cold start
+COLD_START_MS = (600, 1500)
+
+# (method, resource): (endpoint name, function)
+ROUTES = {
+    ('POST', '/auth/signup'): 'signup',
+    ('POST', '/auth/verify'): 'verify',
+    ('POST', '/auth/login'): 'login',
+    ('POST', '/auth/refresh'): 'refresh',
+    ('POST', '/auth/forgot-password'): 'forgot-password',
+    ('POST', '/auth/confirm-password-reset'): 'confirm-password-reset',
+    ('POST', '/rag/query'): 'rag',
+    ('GET', '/chat/sessions'): 'chat-management',
+    ('GET', '/chat/sessions/{sessionId}/messages'): 'chat-management',
+    ('DELETE', '/chat/sessions/{sessionId}'): 'chat-management',
+    ('POST', '/chat/exports'): 'chat-management',
+    ('GET', '/chat/exports/{jobId}'): 'chat-management'
+}
+
+AUTH_OPERATIONS = ('signup', 'verify', 'login', 'refresh', 'forgot-password', 'confirm-password-reset')
+
+QUESTIONS = (
+    '昇降機の定期点検で確認すべき項目を教えてください',
+    'ブレーキライニングの交換基準は？',
+    '受変電設備の絶縁抵抗測定の手順を教えてください',
+    '非常用電源の切替試験の頻度は？',
+    'ロープの素線切れの判定基準は？',
+    'インバーター異常時のエラーコード E05 の対処方法は？',
+    '巻上機の異音がする場合の点検箇所は？',
+    '停電時の救出運転の手順を教えてください'
+)
+
+
+def load_module(name: str, path: str):
+    """Import a handler's app.py under a unique module name"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Context:
+    """Lambda context of an emulated container"""
+
+    def __init__(self, function_name: str):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 30000
+
+
+class FunctionPool:
+    """
+    Emulated Lambda containers of one function
+
+    An invocation takes an idle container or starts a new one, paying the
+    cold start. Handler modules are shared by all containers (one process),
+    so per-container caches are warmer here than in Lambda.
+    """
+
+    def __init__(self, name: str, handler, cold_start: LatencyModel):
+        self.name = name
+        self.handler = handler
+        self.cold_start = cold_start
+        self.idle = 0
+        self.containers = 0
+        self.cold_starts = 0
+        self.invocations = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, event: dict) -> dict:
+        with self.lock:
+            self.invocations += 1
+            cold = not self.idle
+            if cold:
+                self.containers += 1
+                self.cold_starts += 1
+            else:
+                self.idle -= 1
+        if cold:
+            self.cold_start.sleep()
+        try:
+            return self.handler(event, Context(self.name))
+        finally:
+            with self.lock:
+                self.idle += 1
+
+    def report(self) -> dict:
+        return {'invocations': self.invocations, 'containers': self.containers, 'coldStarts': self.cold_starts}
+
+
+class Recorder:
+    """Latency and status per endpoint, and anomalies seen by the users"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.anomalies = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, status: int):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def anomaly(self, kind: str):
+        with self.lock:
+            self.anomalies[kind] += 1
+
+    def report(self) -> dict:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': sum(count for status, count in statuses.items() if status >= 400),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+                **{f"p{p}Ms": round(percentile(values, p) * 1000, 1) for p in (50, 90, 99)},
+                'maxMs': round(values[-1] * 1000, 1)
+            }
+        return endpoints
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class Api:
+    """
+    API Gateway stand-in: builds proxy events for ROUTES and invokes the
+    function pool of each route
+    """
+
+    def __init__(self, pools: dict, auth_mode: str, latencies: Latencies, recorder: Recorder):
+        self.pools = pools
+        self.auth_mode = auth_mode
+        self.latencies = latencies
+        self.recorder = recorder
+
+    def request(self, method: str, resource: str, path_parameters: dict = None, body: dict = None,
+                query: dict = None, token: str = None, source_ip: str = None) -> tuple:
+        function = ROUTES[(method, resource)]
+        if function in AUTH_OPERATIONS and self.auth_mode == 'consolidated':
+            function = 'auth'
+        path = resource
+        for name, value in (path_parameters or {}).items():
+            path = path.replace(f"{{{name}}}", value)
+
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        event = {
+            'httpMethod': method,
+            'resource': resource,
+            'path': path,
+            'pathParameters': path_parameters,
+            'queryStringParameters': query,
+            'headers': headers,
+            'body': json.dumps(body, ensure_ascii=False) if body is not None else None,
+            'requestContext': {'requestId': str(uuid.uuid4()), 'identity': {'sourceIp': source_ip}}
+        }
+
+        start_time = time.perf_counter()
+        self.latencies.sleep('api-gateway', 'Overhead')
+        response = self.pools[function].invoke(event)
+        self.recorder.record(f"{method} {resource}", time.perf_counter() - start_time, response['statusCode'])
+        return response['statusCode'], json.loads(response['body'] or '{}')
+
+
+class VirtualUser:
+    """One user's requests, in the order the frontend makes them"""
+
+    def __init__(self, index: int, api: Api, cognito: FakeCognito, recorder: Recorder, args, seed: int):
+        self.api = api
+        self.cognito = cognito
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(seed + index)
+        self.email = f"loadtest-{index:05d}@example.com"
+        self.password = PASSWORD
+        self.source_ip = f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}" if not args.ips else \
+            f"192.0.2.{index % args.ips}"
+        self.tokens = {}
+        self.user_id = None
+
+    def think(self):
+        if self.args.think_time:
+            time.sleep(self.rng.expovariate(1 / self.args.think_time))
+
+    def post_auth(self, resource: str, body: dict) -> tuple:
+        return self.api.request('POST', resource, body=body, source_ip=self.source_ip)
+
+    def register(self) -> bool:
+        status, _ = self.post_auth('/auth/signup', {'email': self.email, 'password': self.password,
+                                                    'name': self.email.split('@')[0]})
+        if status != 201:
+            return False
+        status, _ = self.post_auth('/auth/verify', {'email': self.email, 'code': self.cognito.code_for(self.email)})
+        return status == 200
+
+    def login(self) -> bool:
+        status, body = self.post_auth('/auth/login', {'email': self.email, 'password': self.password})
+        if status != 200:
+            return False
+        self.tokens = body['tokens']
+        self.user_id = body['user']['userId']
+        return True
+
+    def refresh(self) -> bool:
+        status, body = self.post_auth('/auth/refresh', {'refreshToken': self.tokens['refreshToken']})
+        if status != 200:
+            return False
+        self.tokens.update(body['tokens'])
+        return True
+
+    def reset_password(self) -> bool:
+        status, _ = self.post_auth('/auth/forgot-password', {'email': self.email})
+        if status != 200:
+            return False
+        self.password = f"{PASSWORD}{self.rng.randint(0, 9)}"
+        status, _ = self.post_auth('/auth/confirm-password-reset', {
+            'email': self.email, 'code': self.cognito.code_for(self.email), 'newPassword': self.password})
+        return status == 200
+
+    def chat(self, method: str, resource: str, path_parameters: dict = None, body: dict = None) -> tuple:
+        return self.api.request(method, resource, path_parameters=path_parameters, body=body,
+                                token=self.tokens['idToken'], source_ip=self.source_ip)
+
+    def export(self) -> bool:
+        status, body = self.chat('POST', '/chat/exports')
+        if status != 202:
+            return False
+        for _ in range(20):
+            time.sleep(max(0.05, 0.5 * self.args.latency_scale))
+            status, body = self.chat('GET', '/chat/exports/{jobId}', {'jobId': body.get('jobId', '')})
+            if status != 200 or body.get('status') != 'running':
+                return status == 200 and body.get('status') == 'completed'
+        return False
+
+    def run_scenario(self) -> bool:
+        """login -> list sessions -> ask questions -> view session -> delete"""
+        if self.args.reset_fraction and self.rng.random() < self.args.reset_fraction:
+            if not self.reset_password():
+                return False
+        if not self.login():
+            return False
+        self.think()
+
+        status, _ = self.chat('GET', '/chat/sessions')
+        if status != 200:
+            return False
+
+        session_id = None
+        for index in range(self.args.questions):
+            self.think()
+            if index and self.args.refresh_fraction and self.rng.random() < self.args.refresh_fraction:
+                if not self.refresh():
+                    return False
+            # The first question opens a new session (sessionId null, as in the frontend)
+            status, body = self.chat('POST', '/rag/query', body={'sessionId': session_id,
+                                                                 'query': self.rng.choice(QUESTIONS)})
+            if status != 200:
+                return False
+            if session_id and body['sessionId'] != session_id:
+                self.recorder.anomaly('sessionChanged')
+            session_id = body['sessionId']
+
+        self.think()
+        status, body = self.chat('GET', '/chat/sessions/{sessionId}/messages', {'sessionId': session_id})
+        if status != 200:
+            return False
+        messages = body['messages']
+        if any(message.get('userId') != self.user_id for message in messages):
+            self.recorder.anomaly('foreignMessagesInSession')
+        if sum(message.get('userId') == self.user_id for message in messages) != self.args.questions * 2:
+            self.recorder.anomaly('ownMessagesMissing')
+
+        if self.args.export_fraction and self.rng.random() < self.args.export_fraction:
+            if not self.export():
+                return False
+
+        self.think()
+        status, _ = self.chat('DELETE', '/chat/sessions/{sessionId}', {'sessionId': session_id})
+        return status == 200
+
+
+class Environment:
+    """Fakes, handlers and function pools of one load test"""
+
+    def __init__(self, args):
+        os.environ.update(ENVIRONMENT)
+        self.latencies = Latencies(LATENCY_MODELS, args.latency_scale, args.seed)
+        self.dynamodb = FakeDynamoDB(self.latencies.for_service('dynamodb'))
+        self.dynamodb.create_table(ENVIRONMENT['USERS_TABLE'], ('userId', None))
+        self.dynamodb.create_table(ENVIRONMENT['RATE_LIMIT_TABLE'], ('pk', None))
+        self.dynamodb.create_table(ENVIRONMENT['CHATLOGS_TABLE'], ('sessionId', 'messageId'), {
+            'userId-timestamp-index': ('userId', 'timestamp', ('title', 'ttl'))})
+        self.dynamodb.create_table(ENVIRONMENT['STATS_TABLE'], ('pk', 'sk'))
+        self.cognito = FakeCognito(USER_POOL_ID, CLIENT_ID, REGION, self.latencies)
+        self.bedrock_agent = FakeBedrockAgentRuntime(ENVIRONMENT['DOCUMENTS_BUCKET'], self.latencies, seed=args.seed)
+        self.bedrock_runtime = FakeBedrockRuntime(self.latencies, max_concurrency=args.bedrock_concurrency,
+                                                  seed=args.seed)
+        self.s3 = FakeS3(self.latencies)
+        self.lambda_client = FakeLambda(latencies=self.latencies)
+        self.handlers = self.load_handlers()
+
+        cold_start_rng = random.Random(args.seed)
+        auth_functions = ('auth',) if args.auth_mode == 'consolidated' else AUTH_OPERATIONS
+        self.pools = {
+            name: FunctionPool(name, self.handlers[name],
+                               LatencyModel(*COLD_START_MS, args.latency_scale, cold_start_rng))
+            for name in auth_functions + ('rag', 'chat-management')
+        }
+
+    def load_handlers(self) -> dict:
+        """Import every handler and replace its AWS clients with the fakes"""
+        for path in (os.path.join(LAMBDA_DIR, 'layers', 'auth', 'python'),
+                     os.path.join(LAMBDA_DIR, 'layers', 'shared', 'python'),
+                     os.path.join(LAMBDA_DIR, 'layers', 'warmup', 'python'),
+                     os.path.join(LAMBDA_DIR, 'chat', 'chat-management')):
+            sys.path.insert(0, path)
+
+        import auth_operations
+        import auth_tokens
+        import rate_limit
+        auth_operations.cognito_client = self.cognito
+        auth_operations.users_table = self.dynamodb.Table(ENVIRONMENT['USERS_TABLE'])
+        rate_limit.rate_limit_table = self.dynamodb.Table(ENVIRONMENT['RATE_LIMIT_TABLE'])
+        # The JWKS is fetched once per container in Lambda; seed it with the fake pool's key
+        auth_tokens._jwks = self.cognito.jwks()
+        auth_tokens._jwks_fetched_at = time.time()
+
+        handlers = {operation: load_module(f"auth_{operation.replace('-', '_')}_app",
+                                           os.path.join(LAMBDA_DIR, 'auth', operation, 'app.py')).lambda_handler
+                    for operation in AUTH_OPERATIONS}
+        handlers['auth'] = load_module('auth_router_app', os.path.join(LAMBDA_DIR, 'auth', 'router', 'app.py')
+                                       ).lambda_handler
+
+        rag = load_module('rag_app', os.path.join(LAMBDA_DIR, 'rag', 'rag-function', 'app.py'))
+        rag.chatlogs_table = self.dynamodb.Table(ENVIRONMENT['DYNAMODB_CHATLOGS_TABLE'])
+        rag.bedrock_agent = self.bedrock_agent
+        rag.bedrock_runtime = self.bedrock_runtime
+        rag.s3_client = self.s3
+        handlers['rag'] = rag.lambda_handler
+
+        chat = load_module('chat_management_app', os.path.join(LAMBDA_DIR, 'chat', 'chat-management', 'app.py'))
+        chat.chatlogs_table = self.dynamodb.Table(ENVIRONMENT['CHATLOGS_TABLE'])
+        chat.dynamodb = self.dynamodb
+        chat.stats_table = self.dynamodb.Table(ENVIRONMENT['STATS_TABLE'])
+        chat.s3_client = self.s3
+        chat.lambda_client = self.lambda_client
+        # Export jobs invoke the function itself (context.function_name of its pool)
+        self.lambda_client.handlers['chat-management'] = chat.lambda_handler
+        handlers['chat-management'] = chat.lambda_handler
+        return handlers
+
+    def services_report(self) -> dict:
+        services = {fake.service: dict(fake.calls) for fake in (self.cognito, self.bedrock_agent,
+                                                                  self.bedrock_runtime, self.s3, self.lambda_client)}
+        services['bedrock-runtime']['throttledAttempts'] = self.bedrock_runtime.throttled
+        return services
+
+
+def run_phase(users: list, action, concurrency: int, ramp_up: float) -> tuple:
+    """Run `action(user)` for every user with at most `concurrency` at once"""
+    def run(index_user):
+        index, user = index_user
+        if ramp_up and index < concurrency:
+            time.sleep(ramp_up * index / concurrency)
+        return action(user)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(run, enumerate(users)))
+    return results, time.perf_counter() - start_time
+
+
+def print_report(report: dict):
+    scenario = report['scenario']
+    print(f"\nScenario: {scenario['completed']}/{scenario['users']} users completed in {scenario['seconds']} s "
+          f"({scenario['scenariosPerMinute']} scenarios/min, {scenario['requestsPerSecond']} requests/s)")
+    print(f"\n{'endpoint':<45}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<45}{stats['requests']:>9}{stats['errors']:>8}{stats['p50Ms']:>9}{stats['p90Ms']:>9}"
+              f"{stats['p99Ms']:>9}{stats['maxMs']:>9}")
+    print(f"\n{'table':<20}{'requests':>9}{'RCU':>9}{'WCU':>9}  by operation")
+    for table, stats in report['dynamodb'].items():
+        print(f"{table:<20}{stats['totalRequests']:>9}{stats['readUnits']:>9}{stats['writeUnits']:>9}  "
+              f"{json.dumps(stats['requests'])}")
+    print(f"\nService calls: {json.dumps(report['services'])}")
+    print(f"Lambda containers: {json.dumps(report['functions'])}")
+    if report['anomalies']:
+        print(f"Anomalies: {json.dumps(report['anomalies'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=100, help='Users running at the same time')
+    parser.add_argument('--questions', type=int, default=5, help='Questions per session')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='Multiplier of every modelled latency')
+    parser.add_argument('--think-time', type=float, default=2.0, help='Mean pause between user actions (s)')
+    parser.add_argument('--ramp-up', type=float, default=10.0, help='Seconds over which the first users start')
+    parser.add_argument('--auth-mode', choices=('consolidated', 'per-route'), default='consolidated')
+    parser.add_argument('--bedrock-concurrency', type=int, default=0,
+                        help='Concurrent InvokeModel calls before throttling (0: unlimited)')
+    parser.add_argument('--ips', type=int, default=0, help='Share this many client IPs (0: one per user)')
+    parser.add_argument('--refresh-fraction', type=float, default=0.2, help='Share of questions preceded by a refresh')
+    parser.add_argument('--reset-fraction', type=float, default=0.05, help='Share of users resetting the password')
+    parser.add_argument('--export-fraction', type=float, default=0.0, help='Share of users exporting their history')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Results JSON (default: results/<timestamp>.json here)')
+    parser.add_argument('--handler-log', help="File for the handlers' log output (default: discarded)")
+    args = parser.parse_args()
+
+    print(f"Generating the user pool signing key and loading the handlers ({args.auth_mode} auth)...")
+    environment = Environment(args)
+    recorder = Recorder()
+    api = Api(environment.pools, args.auth_mode, environment.latencies, recorder)
+    users = [VirtualUser(index, api, environment.cognito, recorder, args, args.seed) for index in range(args.users)]
+
+    # Handler logs (print) go to --handler-log instead of the report
+    with open(args.handler_log or os.devnull, 'w') as handler_log:
+        with contextlib.redirect_stdout(handler_log):
+            registered, setup_seconds = run_phase(users, VirtualUser.register, args.concurrency, 0)
+        print(f"Registered {sum(registered)}/{len(users)} users in {setup_seconds:.1f} s")
+        setup_requests = sum(len(values) for values in recorder.latencies.values())
+
+        active = [user for user, ok in zip(users, registered) if ok]
+        with contextlib.redirect_stdout(handler_log):
+            completed, seconds = run_phase(active, VirtualUser.run_scenario, args.concurrency, args.ramp_up)
+            for thread in environment.lambda_client.threads:
+                thread.join()
+        scenario_requests = sum(len(values) for values in recorder.latencies.values()) - setup_requests
+
+    report = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpuCount': os.cpu_count(),
+        'options': vars(args),
+        'scenario': {
+            'users': len(active),
+            'completed': sum(completed),
+            'seconds': round(seconds, 1),
+            'scenariosPerMinute': round(sum(completed) / seconds * 60, 1),
+            'requestsPerSecond': round(scenario_requests / seconds, 1)
+        },
+        'endpoints': recorder.report(),
+        'dynamodb': environment.dynamodb.report(),
+        'services': environment.services_report(),
+        'functions': {name: pool.report() for name, pool in environment.pools.items()},
+        'anomalies': dict(recorder.anomalies)
+    }
+    print_report(report)
+
+    output_path = args.output or os.path.join(BENCHMARK_DIR, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+EleKnowledge-AI Benchmarks - Local S3 Stand-in
+Directory-backed subset of the boto3 S3 client used by the PDF splitter
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from botocore.exceptions import ClientError
+
+
+class StreamingBody:
+    """Minimal botocore StreamingBody replacement backed by a file"""
+
+    def __init__(self, path: str, start: int = 0, end: int = None):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = (end if end is not None else os.path.getsize(path) - 1) - start + 1
+
+    def read(self, amt: int = None) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if amt is None else min(amt, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        if self.remaining <= 0:
+            self.file.close()
+        return data
+
+    def iter_chunks(self, chunk_size: int = 1024 * 1024):
+        while True:
+            data = self.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+
+class LocalS3Client:
+    """
+    Stores objects as files under root/<bucket>/<key>
+
+    Request counts per operation are kept in `calls` for reporting.
+    Uploads can be slowed to a simulated bandwidth (MB/s per request) so
+    upload and split time can be compared.
+    """
+
+    def __init__(self, root: str, upload_mb_per_second: float = None):
+        self.root = root
+        self.upload_mb_per_second = upload_mb_per_second
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.multipart = {}
+
+    def _count(self, operation: str):
+        with self.lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def _transfer(self, size: int):
+        if self.upload_mb_per_second:
+            time.sleep(size / 1024 / 1024 / self.upload_mb_per_second)
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, key)
+
+    def _meta_path(self, bucket: str, key: str) -> str:
+        return self._path(bucket, key) + '.__meta__.json'
+
+    def _not_found(self, operation: str):
+        raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'Not Found'}}, operation)
+
+    def _etag(self, path: str) -> str:
+        digest = hashlib.md5()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return f'"{digest.hexdigest()}"'
+
+    def _write_meta(self, bucket: str, key: str, metadata: dict, content_type: str):
+        path = self._path(bucket, key)
+        with open(self._meta_path(bucket, key), 'w') as f:
+            json.dump({
+                'Metadata': metadata or {},
+                'ContentType': content_type,
+                'ETag': self._etag(path)
+            }, f)
+
+    def put_file(self, bucket: str, key: str, source_path: str, metadata: dict = None):
+        """Seed an object from a local file (benchmark setup, not a boto3 API)"""
+        path = self._path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(source_path, path)
+        self._write_meta(bucket, key, metadata, 'application/pdf')
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self._count('HeadObject')
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            self._not_found('HeadObject')
+        with open(self._meta_path(Bucket, Key)) as f:
+            meta = json.load(f)
+        return {'ContentLength': os.path.getsize(path), **meta}
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None, IfMatch: str = None, **kwargs) -> dict:
+        self._count('GetObject')
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            self._not_found('GetObject')
+        if IfMatch and IfMatch != self.head_object(Bucket=Bucket, Key=Key)['ETag']:
+            raise ClientError({'Error': {'Code': 'PreconditionFailed', 'Message': 'ETag mismatch'}}, 'GetObject')
+        if Range:
+            start, end = (int(x) for x in Range.replace('bytes=', '').split('-'))
+            return {'Body': StreamingBody(path, start, end), 'ContentLength': end - start + 1}
+        return {'Body': StreamingBody(path), 'ContentLength': os.path.getsize(path)}
+
+    def put_object(self, Bucket: str, Key: str, Body=b'', ContentType: str = None,
+                   Metadata: dict = None, **kwargs) -> dict:
+        self._count('PutObject')
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = Body if isinstance(Body, (bytes, bytearray)) else Body.read()
+        self._transfer(len(data))
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._write_meta(Bucket, Key, Metadata, ContentType)
+        return {'ETag': self._etag(path)}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, ContentType: str = None,
+                                Metadata: dict = None, **kwargs) -> dict:
+        self._count('CreateMultipartUpload')
+        upload_id = uuid.uuid4().hex
+        with self.lock:
+            self.multipart[upload_id] = {'parts': {}, 'ContentType': ContentType, 'Metadata': Metadata}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body=b'', **kwargs) -> dict:
+        self._count('UploadPart')
+        data = bytes(Body)
+        self._transfer(len(data))
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self.lock:
+            self.multipart[UploadId]['parts'][PartNumber] = (etag, data)
+        return {'ETag': etag}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict, **kwargs) -> dict:
+        self._count('CompleteMultipartUpload')
+        with self.lock:
+            upload = self.multipart.pop(UploadId)
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            for part in MultipartUpload['Parts']:
+                etag, data = upload['parts'][part['PartNumber']]
+                if etag != part['ETag']:
+                    raise ClientError({'Error': {'Code': 'InvalidPart', 'Message': 'ETag mismatch'}},
+                                      'CompleteMultipartUpload')
+                f.write(data)
+        self._write_meta(Bucket, Key, upload['Metadata'], upload['ContentType'])
+        return {'ETag': self._etag(path)}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> dict:
+        self._count('AbortMultipartUpload')
+        with self.lock:
+            self.multipart.pop(UploadId, None)
+        return {}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, ExtraArgs: dict = None, **kwargs):
+        self._count('UploadFile')
+        extra = ExtraArgs or {}
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._transfer(os.path.getsize(Filename))
+        shutil.copyfile(Filename, path)
+        self._write_meta(Bucket, Key, extra.get('Metadata'), extra.get('ContentType'))
+
+    def delete_objects(self, Bucket: str, Delete: dict, **kwargs) -> dict:
+        self._count('DeleteObjects')
+        for obj in Delete['Objects']:
+            for path in (self._path(Bucket, obj['Key']), self._meta_path(Bucket, obj['Key'])):
+                if os.path.exists(path):
+                    os.remove(path)
+        return {}
+
+    def put_object_tagging(self, Bucket: str, Key: str, Tagging: dict, **kwargs) -> dict:
+        self._count('PutObjectTagging')
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', **kwargs) -> dict:
+        self._count('ListObjectsV2')
+        base = os.path.join(self.root, Bucket)
+        contents = []
+        for directory, _, files in os.walk(base):
+            for name in files:
+                if name.endswith('.__meta__.json'):
+                    continue
+                key = os.path.relpath(os.path.join(directory, name), base).replace(os.sep, '/')
+                if key.startswith(Prefix):
+                    contents.append({'Key': key, 'Size': os.path.getsize(os.path.join(directory, name))})
+        return {'Contents': sorted(contents, key=lambda x: x['Key']), 'KeyCount': len(contents)}
@@ -0,0 +1,129 @@
+"""
+EleKnowledge-AI Benchmarks - PDF Splitter Memory Benchmark
+Compare peak RSS of the in-memory and streaming split modes
+
+Usage:
+    python memory_benchmark.py --size-mb 150 --size-mb 300
+
+Each mode runs in a fresh subprocess. Peak RSS comes from VmHWM (reset on
+exec, unlike ru_maxrss which inherits the parent's high-water mark), and
+peak anonymous memory is sampled separately because the streaming mode's
+mmap pages are file-backed and reclaimable.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SPLITTER_DIR = os.path.join(BENCHMARK_DIR, '..', '..', 'lambda', 'utils', 'pdf-splitter')
+BUCKET = 'benchmark-documents'
+SOURCE_KEY = 'manuals/benchmark.pdf'
+PAGE_BYTES = 512 * 1024
+
+
+def read_status_mb(field: str) -> float:
+    """Read a memory field (kB) from /proc/self/status"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process"""
+    if os.path.exists('/proc/self/status'):
+        return read_status_mb('VmHWM')
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class AnonMemorySampler(threading.Thread):
+    """Sample RssAnon (heap, not file-backed pages) every few milliseconds"""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.peak_mb = max(self.peak_mb, read_status_mb('RssAnon'))
+            time.sleep(self.interval)
+
+    def stop(self) -> float:
+        self.stopped.set()
+        self.join()
+        return self.peak_mb
+
+
+def run_mode(mode: str, pdf_path: str) -> dict:
+    """Run the splitter handler once in this process (subprocess entry point)"""
+    sys.path.insert(0, BENCHMARK_DIR)
+    sys.path.insert(0, SPLITTER_DIR)
+    from local_s3 import LocalS3Client
+    import app
+
+    with tempfile.TemporaryDirectory() as root:
+        s3 = LocalS3Client(root)
+        s3.put_file(BUCKET, SOURCE_KEY, pdf_path)
+        app.s3_client = s3
+        app.STREAMING_THRESHOLD_BYTES = 0 if mode == 'streaming' else float('inf')
+
+        baseline_mb = peak_rss_mb()
+        sampler = AnonMemorySampler()
+        sampler.start()
+        start_time = time.time()
+        result = app.lambda_handler({'Records': [{'s3': {'bucket': {'name': BUCKET}, 'object': {'key': SOURCE_KEY}}}]}, None)
+        body = json.loads(result['body'])
+        peak_anon_mb = sampler.stop()
+
+        return {
+            'mode': mode,
+            'inputMb': round(os.path.getsize(pdf_path) / 1024 / 1024, 1),
+            'seconds': round(time.time() - start_time, 2),
+            'chunks': body['results'][0].get('chunkCount'),
+            'baselineRssMb': round(baseline_mb, 1),
+            'peakRssMb': round(peak_rss_mb(), 1),
+            'peakAnonMb': round(peak_anon_mb, 1)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, action='append', help='Synthetic input size (repeatable)')
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'PDF'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(*args.run)))
+        return
+
+    sys.path.insert(0, BENCHMARK_DIR)
+    from synthetic_pdf import make_pdf
+
+    results = []
+    for size_mb in args.size_mb or [100, 200]:
+        with tempfile.TemporaryDirectory() as work_dir:
+            pdf_path = os.path.join(work_dir, f"synthetic-{size_mb}mb.pdf")
+            make_pdf(pdf_path, pages=size_mb * 1024 * 1024 // PAGE_BYTES, page_bytes=PAGE_BYTES)
+
+            for mode in ('memory', 'streaming'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--run', mode, pdf_path],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                results.append(json.loads(output.strip().splitlines()[-1]))
+                print(json.dumps(results[-1]))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+EleKnowledge-AI Benchmarks - PDF Splitter Pipeline Benchmark
+Compare split-then-upload (sequential put_object) with the pipelined
+multipart upload
+
+Usage:
+    python pipeline_benchmark.py --size-mb 200 --upload-mbps 25 [--fail-every 5]
+
+Uploads go to LocalS3Client throttled to --upload-mbps per request, so the
+sequential mode costs split + size / bandwidth while the pipelined mode
+should approach max(split, size / (bandwidth * UPLOAD_CONCURRENCY)).
+--fail-every N makes the first attempt of every Nth part fail to exercise
+per-part retries.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SPLITTER_DIR = os.path.join(BENCHMARK_DIR, '..', '..', 'lambda', 'utils', 'pdf-splitter')
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, SPLITTER_DIR)
+
+from local_s3 import LocalS3Client  # noqa: E402
+from synthetic_pdf import make_pdf  # noqa: E402
+import app  # noqa: E402
+import upload_pipeline  # noqa: E402
+
+BUCKET = 'benchmark-documents'
+SOURCE_KEY = 'manuals/benchmark.pdf'
+PAGE_BYTES = 512 * 1024
+
+
+class FlakyS3Client(LocalS3Client):
+    """LocalS3Client whose first attempt of every Nth part fails"""
+
+    def __init__(self, root: str, upload_mb_per_second: float, fail_every: int):
+        super().__init__(root, upload_mb_per_second)
+        self.fail_every = fail_every
+        self.attempts = {}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, **kwargs) -> dict:
+        with self.lock:
+            attempt = self.attempts[(UploadId, PartNumber)] = self.attempts.get((UploadId, PartNumber), 0) + 1
+        if self.fail_every and PartNumber % self.fail_every == 0 and attempt == 1:
+            self._count('UploadPartFailed')
+            raise ConnectionError('Simulated connection reset')
+        return super().upload_part(Bucket, Key, UploadId, PartNumber, **kwargs)
+
+
+def time_split_only(pdf_bytes: bytes) -> float:
+    start_time = time.time()
+    for chunk in app.iter_split_chunks(BytesIO(pdf_bytes), app.MAX_FILE_SIZE_BYTES):
+        upload_pipeline.release_chunk(chunk)
+    return time.time() - start_time
+
+
+def time_sequential(s3, pdf_bytes: bytes) -> float:
+    """Previous behavior: split everything, then one put_object per chunk"""
+    start_time = time.time()
+    chunks = list(app.iter_split_chunks(BytesIO(pdf_bytes), app.MAX_FILE_SIZE_BYTES))
+    for i, chunk in enumerate(chunks):
+        s3.put_object(
+            Bucket=BUCKET,
+            Key=upload_pipeline.chunk_object_key('sequential/benchmark.pdf', i),
+            Body=chunk['stream'].getvalue(),
+            ContentType='application/pdf'
+        )
+    return time.time() - start_time
+
+
+def time_pipelined(s3, pdf_bytes: bytes) -> tuple:
+    app.s3_client = s3
+    start_time = time.time()
+    chunk_keys = app.split_and_upload(BytesIO(pdf_bytes), BUCKET, SOURCE_KEY, {})
+    return time.time() - start_time, len(chunk_keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=200)
+    parser.add_argument('--upload-mbps', type=float, default=25.0)
+    parser.add_argument('--fail-every', type=int, default=0)
+    args = parser.parse_args()
+
+    upload_pipeline.RETRY_BASE_DELAY_SECONDS = 0.05
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = os.path.join(work_dir, 'synthetic.pdf')
+        make_pdf(pdf_path, pages=args.size_mb * 1024 * 1024 // PAGE_BYTES, page_bytes=PAGE_BYTES)
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+
+        split_seconds = time_split_only(pdf_bytes)
+        sequential_seconds = time_sequential(LocalS3Client(os.path.join(work_dir, 's3-seq'), args.upload_mbps),
+                                             pdf_bytes)
+        s3 = FlakyS3Client(os.path.join(work_dir, 's3-pipe'), args.upload_mbps, args.fail_every)
+        pipelined_seconds, chunk_count = time_pipelined(s3, pdf_bytes)
+
+    print(json.dumps({
+        'inputMb': args.size_mb,
+        'uploadMbps': args.upload_mbps,
+        'uploadConcurrency': upload_pipeline.UPLOAD_CONCURRENCY,
+        'chunks': chunk_count,
+        'splitOnlySeconds': round(split_seconds, 2),
+        'sequentialSeconds': round(sequential_seconds, 2),
+        'pipelinedSeconds': round(pipelined_seconds, 2),
+        'requests': s3.calls
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+EleKnowledge-AI Benchmarks - PDF Splitter Benchmark Suite
+Run the splitter handler against synthetic corpora and a local S3 stand-in
+
+Usage:
+    python suite_benchmark.py [--case text-2000 --case image-60] [--output results.json]
+                              [--compare baseline.json] [--no-tracemalloc]
+    python suite_benchmark.py --list
+
+Each case runs in a fresh subprocess and reports wall time, pages/sec,
+peak RSS (VmHWM / ru_maxrss), chunk count and the chunks' fill ratio
+versus the case's size limit. A second run under tracemalloc reports the peak
+Python heap (tracemalloc slows the run, so it is timed separately).
+--compare flags cases that got slower, bigger or more memory hungry than
+a previous results file by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SPLITTER_DIR = os.path.join(BENCHMARK_DIR, '..', '..', 'lambda', 'utils', 'pdf-splitter')
+sys.path.insert(0, BENCHMARK_DIR)
+
+from memory_benchmark import peak_rss_mb  # noqa: E402
+from synthetic_pdf import make_bloated_pdf, make_image_pdf, make_text_pdf  # noqa: E402
+
+BUCKET = 'benchmark-documents'
+SOURCE_KEY = 'manuals/benchmark.pdf'
+
+# name: (generator, keyword arguments, size limit in MB)
+# Text corpora are small at realistic page densities, so their limit is
+# scaled down to exercise splitting; the others use the real 45 MB limit.
+CASES = {
+    'text-10': (make_text_pdf, {'pages': 10, 'text_bytes': 8 * 1024}, 0.01),
+    'text-2000': (make_text_pdf, {'pages': 2000, 'text_bytes': 8 * 1024}, 1),
+    'dense-text-500': (make_text_pdf, {'pages': 500, 'text_bytes': 32 * 1024}, 1),
+    'image-60': (make_image_pdf, {'pages': 60}, 45),
+    'image-200': (make_image_pdf, {'pages': 200}, 45),
+    'shared-font-300': (make_bloated_pdf, {'pages': 300, 'text_bytes': 4096, 'font_bytes': 256 * 1024}, 45),
+}
+
+# Metrics compared by --compare (higher is worse)
+REGRESSION_METRICS = ('seconds', 'peakRssMb', 'peakHeapMb', 'chunks')
+
+
+def run_case(pdf_path: str, limit_mb: float, use_tracemalloc: bool) -> dict:
+    """Run the splitter handler once in this process (subprocess entry point)"""
+    sys.path.insert(0, SPLITTER_DIR)
+    from pypdf import PdfReader
+    from local_s3 import LocalS3Client
+    import app
+
+    with tempfile.TemporaryDirectory() as root:
+        s3 = LocalS3Client(root)
+        s3.put_file(BUCKET, SOURCE_KEY, pdf_path)
+        app.s3_client = s3
+        app.MAX_FILE_SIZE_BYTES = int(limit_mb * 1024 * 1024)
+
+        if use_tracemalloc:
+            tracemalloc.start()
+        start_time = time.perf_counter()
+        response = app.lambda_handler({'Records': [{'s3': {'bucket': {'name': BUCKET},
+                                                           'object': {'key': SOURCE_KEY}}}]}, None)
+        seconds = time.perf_counter() - start_time
+        if use_tracemalloc:
+            heap_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return {'peakHeapMb': round(heap_peak / 1024 / 1024, 1)}
+
+        result = json.loads(response['body'])['results'][0]
+        chunk_sizes = [s3.head_object(Bucket=BUCKET, Key=key)['ContentLength'] for key in result.get('chunks', [])]
+        pages = len(PdfReader(pdf_path).pages)
+        limit = app.MAX_FILE_SIZE_BYTES
+        return {
+            'status': result['status'],
+            'limitMb': limit_mb,
+            'mode': 'streaming' if os.path.getsize(pdf_path) > app.STREAMING_THRESHOLD_BYTES else 'memory',
+            'pages': pages,
+            'seconds': round(seconds, 2),
+            'pagesPerSecond': round(pages / seconds, 1),
+            'peakRssMb': round(peak_rss_mb(), 1),
+            'chunks': len(chunk_sizes),
+            'outputMb': round(sum(chunk_sizes) / 1024 / 1024, 1),
+            'fillRatioAvg': round(sum(chunk_sizes) / len(chunk_sizes) / limit, 3) if chunk_sizes else None,
+            'fillRatioMin': round(min(chunk_sizes) / limit, 3) if chunk_sizes else None,
+            'fillRatioMax': round(max(chunk_sizes) / limit, 3) if chunk_sizes else None
+        }
+
+
+def run_in_subprocess(pdf_path: str, limit_mb: float, use_tracemalloc: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, '--run', pdf_path, str(limit_mb), '1' if use_tracemalloc else '0'],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """Cases whose REGRESSION_METRICS grew by more than `tolerance` versus the baseline"""
+    with open(baseline_path) as f:
+        baseline = {case['case']: case for case in json.load(f)['cases']}
+
+    regressions = []
+    for case in results:
+        before = baseline.get(case['case'])
+        if not before:
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = before.get(metric), case.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append({'case': case['case'], 'metric': metric, 'baseline': old, 'current': new,
+                                    'changePercent': round((new / old - 1) * 100, 1)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help='Case to run (repeatable)')
+    parser.add_argument('--list', action='store_true', help='List the cases and exit')
+    parser.add_argument('--output', help='Results JSON (default: results/<timestamp>.json here)')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    parser.add_argument('--limit-mb', type=float, help="Override every case's size limit")
+    parser.add_argument('--no-tracemalloc', action='store_true')
+    parser.add_argument('--run', nargs=3, metavar=('PDF', 'LIMIT_MB', 'TRACEMALLOC'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_case(args.run[0], float(args.run[1]), args.run[2] == '1')))
+        return
+    if args.list:
+        for name, (generator, kwargs, limit_mb) in CASES.items():
+            print(f"{name}: {generator.__name__}({', '.join(f'{k}={v}' for k, v in kwargs.items())}), "
+                  f"limit {limit_mb} MB")
+        return
+
+    results = []
+    for name in args.case or list(CASES):
+        generator, kwargs, limit_mb = CASES[name]
+        limit_mb = args.limit_mb or limit_mb
+        with tempfile.TemporaryDirectory() as work_dir:
+            pdf_path = os.path.join(work_dir, f"{name}.pdf")
+            generator(pdf_path, **kwargs)
+            case = {'case': name, 'inputMb': round(os.path.getsize(pdf_path) / 1024 / 1024, 1)}
+            case.update(run_in_subprocess(pdf_path, limit_mb, False))
+            if not args.no_tracemalloc:
+                case.update(run_in_subprocess(pdf_path, limit_mb, True))
+        results.append(case)
+        print(json.dumps(case))
+
+    report = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpuCount': os.cpu_count(),
+        'cases': results
+    }
+    if args.compare:
+        report['regressions'] = compare(results, args.compare, args.tolerance)
+        print(f"Regressions versus {args.compare}: {json.dumps(report['regressions'], indent=2)}")
+
+    output_path = args.output or os.path.join(BENCHMARK_DIR, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
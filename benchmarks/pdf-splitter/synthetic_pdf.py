@@ -0,0 +1,194 @@
+"""
+EleKnowledge-AI Benchmarks - Synthetic PDF Generator
+Build PDFs of a given shape without external tools
+"""
+import hashlib
+import os
+import random
+import zlib
+from io import BytesIO
+from pypdf import PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject, StreamObject
+
+FONT_PROGRAM_SEED = b'synthetic-font-program'
+WORDS = (b'breaker relay inspection torque terminal voltage maintenance cabinet grounding insulation '
+         b'procedure warning replace verify sensor panel cable motor switch fuse').split()
+DISTINCT_PAGES = 64
+
+
+def make_stream(data: bytes, **entries) -> StreamObject:
+    """Create a stream object with raw (already encoded) data"""
+    stream = StreamObject()
+    stream._data = data
+    for name, value in entries.items():
+        stream[NameObject(f"/{name}")] = value
+    return stream
+
+
+def make_pdf(path: str, pages: int, page_bytes: int, shared_bytes: int = 0):
+    """
+    Write a PDF whose pages each carry `page_bytes` of incompressible
+    content and (optionally) share one `shared_bytes` form XObject
+    """
+    writer = PdfWriter()
+
+    resources = DictionaryObject()
+    if shared_bytes:
+        shared = make_stream(
+            os.urandom(shared_bytes),
+            Type=NameObject('/XObject'),
+            Subtype=NameObject('/Form'),
+            BBox=ArrayObject([NumberObject(0), NumberObject(0), NumberObject(612), NumberObject(792)])
+        )
+        resources[NameObject('/XObject')] = DictionaryObject({NameObject('/X0'): writer._add_object(shared)})
+
+    for _ in range(pages):
+        page = writer.add_blank_page(612, 792)
+        # Comment line keeps the random payload inert for renderers
+        content = b'q /X0 Do Q\n%' + os.urandom(page_bytes // 2).hex().encode() + b'\n'
+        page[NameObject('/Contents')] = writer._add_object(make_stream(content))
+        page[NameObject('/Resources')] = resources
+
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def make_bloated_pdf(path: str, pages: int, text_bytes: int, font_bytes: int, thumb_bytes: int = 0):
+    """
+    Write a PDF with the waste the lossless optimizer removes: the same
+    font program embedded once per page, an unused font per page,
+    uncompressed text content, page thumbnails and an XMP metadata stream
+    """
+    writer = PdfWriter()
+    # Deterministic, incompressible font program (identical on every page)
+    font_program = b''.join(
+        hashlib.sha256(FONT_PROGRAM_SEED + i.to_bytes(4, 'big')).digest()
+        for i in range(font_bytes // 32 + 1)
+    )[:font_bytes]
+
+    def font(name: str):
+        descriptor = DictionaryObject({
+            NameObject('/Type'): NameObject('/FontDescriptor'),
+            NameObject('/FontName'): NameObject(f'/{name}'),
+            NameObject('/FontFile2'): writer._add_object(make_stream(font_program))
+        })
+        return writer._add_object(DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/TrueType'),
+            NameObject('/BaseFont'): NameObject(f'/{name}'),
+            NameObject('/FontDescriptor'): writer._add_object(descriptor)
+        }))
+
+    line = b'BT /F1 10 Tf 72 720 Td (Maintenance procedure step) Tj ET\n'
+    for _ in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject('/Contents')] = writer._add_object(make_stream(line * (text_bytes // len(line))))
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({
+                NameObject('/F1'): font('SyntheticSans'),
+                NameObject('/F2'): font('SyntheticUnused')
+            })
+        })
+        if thumb_bytes:
+            page[NameObject('/Thumb')] = writer._add_object(make_stream(os.urandom(thumb_bytes)))
+
+    writer.root_object[NameObject('/Metadata')] = writer._add_object(
+        make_stream(b'<x:xmpmeta xmlns:x="adobe:ns:meta/">' + b' ' * 4096 + b'</x:xmpmeta>',
+                    Type=NameObject('/Metadata'), Subtype=NameObject('/XML'))
+    )
+
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def make_scanned_pdf(path: str, pages: int, dpi: int = 600, quality: int = 90, noise: float = 48.0):
+    """
+    Write a scan-like PDF: one full-page grayscale JPEG per page (Letter
+    size at `dpi`), built with Pillow's PDF writer
+    """
+    from PIL import Image, ImageDraw
+
+    size = (int(8.5 * dpi), int(11 * dpi))
+    images = []
+    for page_num in range(pages):
+        image = Image.effect_noise(size, noise).point(lambda v: 160 + v // 4)
+        draw = ImageDraw.Draw(image)
+        for line in range(40):
+            y = int((1 + line * 0.24) * dpi)
+            draw.rectangle([dpi, y, int(7.5 * dpi), y + dpi // 20], fill=(page_num * 7 + line) % 60)
+        images.append(image)
+    images[0].save(path, 'PDF', save_all=True, append_images=images[1:], resolution=dpi, quality=quality)
+
+
+def _text_content(rng: random.Random, text_bytes: int) -> bytes:
+    lines = [b'BT /F1 9 Tf 11 TL 40 760 Td']
+    size = 0
+    while size < text_bytes:
+        line = b' '.join(rng.choice(WORDS) for _ in range(12))
+        lines.append(b'(' + line + b') Tj T*')
+        size += len(line) + 8
+    lines.append(b'ET')
+    return b'\n'.join(lines)
+
+
+def make_text_pdf(path: str, pages: int, text_bytes: int):
+    """
+    Write a text-heavy PDF: Flate-compressed text content (`text_bytes`
+    before compression) on every page, one shared standard font
+
+    Page texts rotate through DISTINCT_PAGES variants so generation stays
+    fast; a page number line keeps every content stream unique (identical
+    streams would be merged by the optimizer).
+    """
+    writer = PdfWriter()
+    rng = random.Random(pages)
+    variants = [_text_content(rng, text_bytes) for _ in range(min(pages, DISTINCT_PAGES))]
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica')
+    }))
+    resources = DictionaryObject({NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})})
+
+    for page_num in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject('/Contents')] = writer._add_object(
+            make_stream(zlib.compress(b'BT /F1 9 Tf 40 20 Td (Page %d) Tj ET\n' % (page_num + 1) +
+                                      variants[page_num % len(variants)]),
+                        Filter=NameObject('/FlateDecode'))
+        )
+        page[NameObject('/Resources')] = resources
+
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def make_image_pdf(path: str, pages: int, image_px: int = 1200, quality: int = 85):
+    """
+    Write an image-heavy PDF: one distinct full-page grayscale noise JPEG
+    per page, embedded as an image XObject
+    """
+    from PIL import Image
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        buffer = BytesIO()
+        Image.effect_noise((image_px, int(image_px * 11 / 8.5)), 64).save(buffer, 'JPEG', quality=quality)
+        image = make_stream(
+            buffer.getvalue(),
+            Type=NameObject('/XObject'),
+            Subtype=NameObject('/Image'),
+            Width=NumberObject(image_px),
+            Height=NumberObject(int(image_px * 11 / 8.5)),
+            ColorSpace=NameObject('/DeviceGray'),
+            BitsPerComponent=NumberObject(8),
+            Filter=NameObject('/DCTDecode')
+        )
+        page = writer.add_blank_page(612, 792)
+        page[NameObject('/Contents')] = writer._add_object(make_stream(b'q 612 0 0 792 0 0 cm /Im0 Do Q'))
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/XObject'): DictionaryObject({NameObject('/Im0'): writer._add_object(image)})
+        })
+
+    with open(path, 'wb') as f:
+        writer.write(f)
@@ -0,0 +1,61 @@
+"""
+EleKnowledge-AI Benchmarks - PDF Splitter Text Extraction Benchmark
+Measure per-page text extraction throughput (pages per second) for
+different worker process counts
+
+Usage:
+    python text_benchmark.py --pages 400 --workers 1 --workers 2 --workers 4
+
+Throughput should scale with the worker count up to the number of vCPUs
+(os.cpu_count(); a 3008 MB Lambda function has 2).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SPLITTER_DIR = os.path.join(BENCHMARK_DIR, '..', '..', 'lambda', 'utils', 'pdf-splitter')
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, SPLITTER_DIR)
+
+from synthetic_pdf import make_bloated_pdf  # noqa: E402
+from text_sidecar import extract_page_texts  # noqa: E402
+
+TEXT_BYTES = 8 * 1024
+FONT_BYTES = 16 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--workers', type=int, action='append')
+    args = parser.parse_args()
+    worker_counts = args.workers or sorted({1, 2, os.cpu_count() or 1})
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = os.path.join(work_dir, 'synthetic.pdf')
+        make_bloated_pdf(pdf_path, pages=args.pages, text_bytes=TEXT_BYTES, font_bytes=FONT_BYTES)
+        with open(pdf_path, 'rb') as f:
+            pdf_stream = BytesIO(f.read())
+
+    runs = []
+    for workers in worker_counts:
+        start_time = time.perf_counter()
+        texts = extract_page_texts(pdf_stream, args.pages, workers)
+        elapsed = time.perf_counter() - start_time
+        runs.append({
+            'workers': workers,
+            'seconds': round(elapsed, 2),
+            'pagesPerSecond': round(args.pages / elapsed, 1),
+            'textMb': round(sum(len(text) for text in texts) / 1024 / 1024, 2)
+        })
+
+    print(json.dumps({'pages': args.pages, 'cpuCount': os.cpu_count(), 'runs': runs}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -391,7 +391,9 @@ export default function ChatPage() {
         config: err.config,
         url: err.config?.url
       });
-      setError(`エラーが発生しました: ${err.response?.data?.message || err.message || 'Unknown error'}`);
+      // 問い合わせ時に伝えてもらうリクエストID（トレース検索用）
+      const requestId = err.response?.headers?.['x-request-id'];
+      setError(`エラーが発生しました: ${err.response?.data?.message || err.message || 'Unknown error'}${requestId ? `（リクエストID: ${requestId}）` : ''}`);
       // ユーザーメッセージは残す
     } finally {
       setLoading(false);
@@ -323,9 +323,13 @@ else {
     
     # Lambda
     Write-Host "Lambda Functions:" -ForegroundColor Cyan
-    Write-Host "  Signup: $($outputs.SignupFunctionArn)"
-    Write-Host "  Login: $($outputs.LoginFunctionArn)"
-    Write-Host "  Verify: $($outputs.VerifyFunctionArn)"
+    if ($outputs.ContainsKey("AuthFunctionArn")) {
+        Write-Host "  Auth (all routes): $($outputs.AuthFunctionArn)"
+    } else {
+        Write-Host "  Signup: $($outputs.SignupFunctionArn)"
+        Write-Host "  Login: $($outputs.LoginFunctionArn)"
+        Write-Host "  Verify: $($outputs.VerifyFunctionArn)"
+    }
     Write-Host ""
 }
 
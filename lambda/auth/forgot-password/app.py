@@ -2,120 +2,19 @@
 EleKnowledge-AI Forgot Password Lambda Function
 Cognito Forgot Password Request
 """
-import json
-import os
-import boto3
-from botocore.exceptions import ClientError
-
-# Initialize AWS clients
-cognito_client = boto3.client('cognito-idp')
-
-# Environment variables
-USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
-CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
+from auth_operations import handle
 
 
 def lambda_handler(event, context):
     """
     Handle forgot password request
-    
+
     Expected event body:
     {
         "email": "user@example.com"
     }
+
+    Thin entry point: the operation lives in the auth layer
+    (auth_operations.py), shared with the consolidated auth function.
     """
-    
-    # CORS headers
-    headers = {
-        'Content-Type': 'application/json',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-        'Access-Control-Allow-Methods': 'POST,OPTIONS'
-    }
-    
-    # Handle CORS preflight request
-    if event.get('httpMethod') == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({})
-        }
-    
-    try:
-        # Parse request body
-        if isinstance(event.get('body'), str):
-            body = json.loads(event['body'])
-        else:
-            body = event.get('body', {})
-        
-        email = body.get('email')
-        
-        # Validate input
-        if not email:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({
-                    'error': 'ValidationError',
-                    'message': 'Email is required'
-                })
-            }
-        
-        # Initiate forgot password process
-        cognito_client.forgot_password(
-            ClientId=CLIENT_ID,
-            Username=email
-        )
-        
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                'message': 'Password reset code sent to your email address',
-                'email': email
-            })
-        }
-        
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        error_message = e.response['Error']['Message']
-        
-        # Handle specific Cognito errors
-        if error_code == 'UserNotFoundException':
-            return {
-                'statusCode': 404,
-                'headers': headers,
-                'body': json.dumps({
-                    'error': 'UserNotFoundError',
-                    'message': 'User account does not exist'
-                })
-            }
-        elif error_code == 'LimitExceededException':
-            return {
-                'statusCode': 429,
-                'headers': headers,
-                'body': json.dumps({
-                    'error': 'TooManyRequestsError',
-                    'message': 'Too many password reset requests. Please try again later.'
-                })
-            }
-        else:
-            return {
-                'statusCode': 500,
-                'headers': headers,
-                'body': json.dumps({
-                    'error': error_code,
-                    'message': error_message
-                })
-            }
-    
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({
-                'error': 'InternalServerError',
-                'message': 'An unexpected error occurred'
-            })
-        }
+    return handle('forgot-password', event, context)
@@ -0,0 +1,20 @@
+"""
+EleKnowledge-AI Token Refresh Lambda Function
+Cognito REFRESH_TOKEN_AUTH (new tokens without a password login)
+"""
+from auth_operations import handle
+
+
+def lambda_handler(event, context):
+    """
+    Handle token refresh
+
+    Expected event body:
+    {
+        "refreshToken": "eyJxx..."
+    }
+
+    Thin entry point: the operation lives in the auth layer
+    (auth_operations.py), shared with the consolidated auth function.
+    """
+    return handle('refresh', event, context)
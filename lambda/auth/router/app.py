@@ -0,0 +1,21 @@
+"""
+EleKnowledge-AI Auth Lambda Function
+All auth routes in one function (one warm container pool and one set of
+Cognito / DynamoDB clients instead of one per route)
+"""
+from auth_operations import route
+
+
+def lambda_handler(event, context):
+    """
+    Handle every /auth/* route
+
+    Routes:
+    - POST /auth/signup
+    - POST /auth/login
+    - POST /auth/refresh
+    - POST /auth/verify
+    - POST /auth/forgot-password
+    - POST /auth/confirm-password-reset
+    """
+    return route(event, context)
@@ -4,20 +4,78 @@ Session and Message Management
 """
 import json
 import os
+import re
 import boto3
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from botocore.exceptions import ClientError
 from decimal import Decimal
+from auth_tokens import AuthError, authenticate, in_group, prefetch_jwks
+from export import export_user_history, write_export_status, read_export_status
+from document_links import sign_document_key, sign_source_documents, signing_window
+from message_codec import decode_message_item
+from tracing import annotate, instrument, traced
+from warmup import warmable
 
 # Initialize AWS clients
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+s3_client = boto3.client('s3', region_name='us-east-1')
+lambda_client = boto3.client('lambda', region_name='us-east-1')
+
+# Span per AWS call, grouped by request ID (see tracing)
+instrument(dynamodb, s3_client, lambda_client)
 
 # Environment variables
 CHATLOGS_TABLE_NAME = os.environ.get('CHATLOGS_TABLE')
+STATS_TABLE_NAME = os.environ.get('STATS_TABLE')
+EXPORTS_BUCKET = os.environ.get('EXPORTS_BUCKET')
+DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET')
+ADMIN_GROUP = os.environ.get('ADMIN_GROUP', 'admins')
 
-# DynamoDB table
+# DynamoDB tables
 chatlogs_table = dynamodb.Table(CHATLOGS_TABLE_NAME)
+stats_table = dynamodb.Table(STATS_TABLE_NAME) if STATS_TABLE_NAME else None
+
+# Attribute projections (reserved words: timestamp, ttl, role, content)
+SESSION_LIST_PROJECTION = 'sessionId, #ts, title, #ttl'
+SUMMARY_MESSAGE_PROJECTION = 'sessionId, messageId, #role, #content, contentEncoding, #ts, feedback, #ttl'
+PROJECTION_ATTRIBUTE_NAMES = {
+    '#ts': 'timestamp',
+    '#ttl': 'ttl',
+    '#role': 'role',
+    '#content': 'content'
+}
+
+
+# Version items written by the RAG function (see touch_version_items)
+MESSAGE_ID_PREFIX = 'msg_'
+META_MESSAGE_ID = '#meta'
+USER_META_PREFIX = 'user#'
+
+# Token usage roll-ups of chatlog-aggregator (see usage_counters)
+USAGE_MAX_DAYS = 31
+USAGE_DEFAULT_DAYS = 7
+USAGE_TOKEN_COUNTERS = ('inputTokens', 'outputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens')
+USAGE_TIMINGS = ('retrieveMs', 'generateMs', 'totalMs')
+
+# Warm-up calls (see warmup): a read of an item that does not exist (both tables
+# share the DynamoDB connection pool), a presign for citation links
+WARMUP_SESSION_ID = '#warmup'
+WARMUP_TARGETS = {
+    'dynamodb': lambda: chatlogs_table.get_item(Key={'sessionId': WARMUP_SESSION_ID, 'messageId': META_MESSAGE_ID}),
+    's3': lambda: s3_client.generate_presigned_url('get_object', Params={'Bucket': DOCUMENTS_BUCKET, 'Key': 'warmup'},
+                                                   ExpiresIn=60),
+    'jwks': prefetch_jwks
+}
+
+
+def projection_attribute_names(projection: str) -> dict:
+    """Return only the ExpressionAttributeNames used by a projection"""
+    return {
+        placeholder: name
+        for placeholder, name in PROJECTION_ATTRIBUTE_NAMES.items()
+        if placeholder in projection
+    }
 
 
 # Custom JSON encoder for Decimal
@@ -36,12 +94,77 @@ def calculate_days_until_deletion(ttl: int) -> int:
     return days_remaining
 
 
+def get_version_etag(partition_key: str, variant: str = '') -> str:
+    """
+    Build an ETag from a version item (single small GetItem)
+    
+    Returns:
+        str: Quoted ETag, or None if no version item exists (legacy data)
+    """
+    response = chatlogs_table.get_item(
+        Key={'sessionId': partition_key, 'messageId': META_MESSAGE_ID},
+        ProjectionExpression='version',
+        ConsistentRead=True
+    )
+    item = response.get('Item')
+    if not item or 'version' not in item:
+        return None
+    
+    suffix = f"-{variant}" if variant else ''
+    return f'"v{int(item["version"])}{suffix}"'
+
+
+def get_session_owner(session_id: str) -> str:
+    """userId of a session (stored on every message), or None if it has no messages"""
+    response = chatlogs_table.query(
+        KeyConditionExpression='sessionId = :sid AND begins_with(messageId, :prefix)',
+        ProjectionExpression='userId',
+        ExpressionAttributeValues={':sid': session_id, ':prefix': MESSAGE_ID_PREFIX},
+        Limit=1,
+        ConsistentRead=True
+    )
+    items = response.get('Items', [])
+    return items[0].get('userId') if items else None
+
+
+def bump_version(partition_key: str):
+    """Increment an existing version item so cached ETags become stale"""
+    try:
+        chatlogs_table.update_item(
+            Key={'sessionId': partition_key, 'messageId': META_MESSAGE_ID},
+            UpdateExpression='ADD version :one',
+            ConditionExpression='attribute_exists(sessionId)',
+            ExpressionAttributeValues={':one': 1}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def etag_matches(request_headers: dict, etag: str) -> bool:
+    """Check If-None-Match header (weak comparison) against an ETag"""
+    if not etag:
+        return False
+    
+    if_none_match = request_headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    
+    if if_none_match.strip() == '*':
+        return True
+    
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
 def get_sessions_by_user(user_id: str, limit: int = 50) -> list:
     """Get all sessions for a user"""
     try:
         response = chatlogs_table.query(
             IndexName='userId-timestamp-index',
             KeyConditionExpression='userId = :uid',
+            ProjectionExpression=SESSION_LIST_PROJECTION,
+            ExpressionAttributeNames=projection_attribute_names(SESSION_LIST_PROJECTION),
             ExpressionAttributeValues={':uid': user_id},
             ScanIndexForward=False,
             Limit=limit * 10  # Get more messages to find unique sessions
@@ -59,7 +182,7 @@ def get_sessions_by_user(user_id: str, limit: int = 50) -> list:
                     'createdAt': msg['timestamp'],
                     'lastMessageTime': msg['timestamp'],
                     'messageCount': 1,
-                    'title': msg.get('content', 'Untitled')[:50],
+                    'title': msg.get('title', 'Untitled'),
                     'ttl': msg.get('ttl', 0)
                 }
             else:
@@ -83,22 +206,40 @@ def get_sessions_by_user(user_id: str, limit: int = 50) -> list:
         raise
 
 
-def get_session_messages(session_id: str, limit: int = 100) -> list:
-    """Get all messages in a session"""
+def get_session_messages(session_id: str, limit: int = 100, summary: bool = False) -> list:
+    """
+    Get all messages in a session
+    
+    Args:
+        session_id: Session ID
+        limit: Maximum number of messages
+        summary: If True, omit citations / sourceDocuments (role and content only)
+    """
     try:
-        response = chatlogs_table.query(
-            KeyConditionExpression='sessionId = :sid',
-            ExpressionAttributeValues={':sid': session_id},
-            ScanIndexForward=True,  # Oldest first
-            Limit=limit
-        )
+        query_kwargs = {
+            'KeyConditionExpression': 'sessionId = :sid AND begins_with(messageId, :prefix)',
+            'ExpressionAttributeValues': {':sid': session_id, ':prefix': MESSAGE_ID_PREFIX},
+            'ScanIndexForward': True,  # Oldest first
+            'Limit': limit,
+            # Must not lag behind the (consistently read) version item used for the ETag
+            'ConsistentRead': True
+        }
+        
+        if summary:
+            query_kwargs['ProjectionExpression'] = SUMMARY_MESSAGE_PROJECTION
+            query_kwargs['ExpressionAttributeNames'] = projection_attribute_names(SUMMARY_MESSAGE_PROJECTION)
+        
+        response = chatlogs_table.query(**query_kwargs)
         
         messages = response.get('Items', [])
         
-        # Calculate days until deletion for each message
+        # Decode, calculate days until deletion and sign document links for each message
         for msg in messages:
+            decode_message_item(msg)
             if 'ttl' in msg:
                 msg['daysUntilDeletion'] = calculate_days_until_deletion(msg['ttl'])
+            if msg.get('sourceDocuments'):
+                msg['sourceDocuments'] = sign_source_documents(s3_client, DOCUMENTS_BUCKET, msg['sourceDocuments'])
         
         return messages
         
@@ -108,21 +249,38 @@ def get_session_messages(session_id: str, limit: int = 100) -> list:
 
 
 def delete_session(session_id: str) -> int:
-    """Delete all messages in a session"""
+    """Delete all messages (and the version item) in a session"""
     try:
-        # Get all messages
-        messages = get_session_messages(session_id)
-        
-        # Delete each message
+        # Message keys, page by page (no other attributes are needed for deletion)
+        query_kwargs = {
+            'KeyConditionExpression': 'sessionId = :sid',
+            'ProjectionExpression': 'messageId, userId',
+            'ExpressionAttributeValues': {':sid': session_id}
+        }
         deleted_count = 0
-        for msg in messages:
-            chatlogs_table.delete_item(
-                Key={
-                    'sessionId': session_id,
-                    'messageId': msg['messageId']
-                }
-            )
-            deleted_count += 1
+        user_id = None
+        while True:
+            response = chatlogs_table.query(**query_kwargs)
+            
+            # Delete each message
+            for msg in response.get('Items', []):
+                chatlogs_table.delete_item(
+                    Key={
+                        'sessionId': session_id,
+                        'messageId': msg['messageId']
+                    }
+                )
+                if msg['messageId'].startswith(MESSAGE_ID_PREFIX):
+                    deleted_count += 1
+                    user_id = user_id or msg.get('userId')
+            
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        
+        # Session list of the owner has changed
+        if user_id:
+            bump_version(f"{USER_META_PREFIX}{user_id}")
         
         return deleted_count
         
@@ -144,6 +302,9 @@ def update_message_feedback(session_id: str, message_id: str, feedback: str) ->
                 ':feedback': feedback
             }
         )
+        
+        # Message list of the session has changed
+        bump_version(session_id)
         return True
         
     except ClientError as e:
@@ -151,6 +312,149 @@ def update_message_feedback(session_id: str, message_id: str, feedback: str) ->
         raise
 
 
+def get_stats(day: str, document_name: str = None, rankings: bool = True) -> dict:
+    """
+    Get precomputed statistics (maintained by chatlog-aggregator)
+    
+    Reads a fixed number of items regardless of chat log volume.
+    Without rankings, only counts are returned (no query text of other users).
+    """
+    keys = [{'pk': f"day#{day}", 'sk': 'queries'}]
+    if rankings:
+        keys.append({'pk': f"top-queries#{day}", 'sk': 'top'})
+        keys.append({'pk': 'top-bad-documents', 'sk': 'top'})
+    if document_name:
+        keys.append({'pk': f"doc#{document_name}", 'sk': 'feedback'})
+    
+    try:
+        response = dynamodb.batch_get_item(
+            RequestItems={STATS_TABLE_NAME: {'Keys': keys}}
+        )
+        items = {
+            item['pk']: item
+            for item in response.get('Responses', {}).get(STATS_TABLE_NAME, [])
+        }
+        
+        def ranking(pk: str) -> list:
+            entries = items.get(pk, {}).get('entries', {})
+            ranked = sorted(entries.items(), key=lambda x: x[1], reverse=True)
+            return [{'name': name, 'count': int(count)} for name, count in ranked]
+        
+        stats = {
+            'day': day,
+            'queryCount': int(items.get(f"day#{day}", {}).get('queryCount', 0))
+        }
+        if rankings:
+            stats['topQueries'] = ranking(f"top-queries#{day}")
+            stats['worstDocuments'] = ranking('top-bad-documents')
+        
+        if document_name:
+            feedback = items.get(f"doc#{document_name}", {})
+            stats['document'] = {
+                'documentName': document_name,
+                'good': int(feedback.get('good', 0)),
+                'bad': int(feedback.get('bad', 0))
+            }
+        
+        return stats
+        
+    except ClientError as e:
+        print(f"Error getting stats: {e}")
+        raise
+
+
+def summarize_usage(items: list) -> dict:
+    """Sum usage counter items into totals with average stage timings"""
+    answers = sum(int(item.get('answerCount', 0)) for item in items)
+    summary = {'answers': answers}
+    for name in USAGE_TOKEN_COUNTERS:
+        summary[name] = sum(int(item.get(name, 0)) for item in items)
+    summary['costUsd'] = round(float(sum(item.get('costUsd', 0) for item in items)), 6)
+    for name in USAGE_TIMINGS:
+        total = sum(int(item.get(name, 0)) for item in items)
+        summary[f"average{name[0].upper()}{name[1:]}"] = round(total / answers) if answers else None
+    return summary
+
+
+def get_usage(user_id: str, start_day: str, end_day: str, include_all: bool = False) -> dict:
+    """
+    Token usage and cost of a user and, with include_all, of all users
+    per day (maintained by chatlog-aggregator)
+    
+    Reads one Query for the user's days and one BatchGetItem for the
+    daily totals, regardless of chat log volume.
+    """
+    start = datetime.strptime(start_day, '%Y-%m-%d')
+    days = [(start + timedelta(days=i)).strftime('%Y-%m-%d')
+            for i in range((datetime.strptime(end_day, '%Y-%m-%d') - start).days + 1)]
+    
+    try:
+        response = stats_table.query(
+            KeyConditionExpression='pk = :pk AND sk BETWEEN :start AND :end',
+            ExpressionAttributeValues={':pk': f"usage-user#{user_id}", ':start': start_day, ':end': end_day}
+        )
+        user_items = {item['sk']: item for item in response.get('Items', [])}
+        
+        day_items = None
+        if include_all:
+            response = dynamodb.batch_get_item(
+                RequestItems={STATS_TABLE_NAME: {'Keys': [{'pk': f"usage-day#{day}", 'sk': 'total'} for day in days]}}
+            )
+            day_items = {
+                item['pk'][len('usage-day#'):]: item
+                for item in response.get('Responses', {}).get(STATS_TABLE_NAME, [])
+            }
+    except ClientError as e:
+        print(f"Error getting usage: {e}")
+        raise
+    
+    def per_day(items: dict) -> dict:
+        return {
+            'totals': summarize_usage(list(items.values())),
+            'days': [{'day': day, **summarize_usage([items[day]])} for day in days if day in items]
+        }
+    
+    usage = {'from': start_day, 'to': end_day, 'user': per_day(user_items)}
+    if include_all:
+        usage['all'] = per_day(day_items)
+    return usage
+
+
+def start_export_job(user_id: str, function_name: str) -> str:
+    """Register an export job and run it asynchronously in this function"""
+    job_id = f"export_{int(time.time() * 1000)}"
+    write_export_status(s3_client, EXPORTS_BUCKET, user_id, job_id, {
+        'jobId': job_id,
+        'status': 'running',
+        'startedAt': datetime.now().isoformat()
+    })
+    
+    lambda_client.invoke(
+        FunctionName=function_name,
+        InvocationType='Event',
+        Payload=json.dumps({'exportJob': {'userId': user_id, 'jobId': job_id}})
+    )
+    return job_id
+
+
+def run_export_job(job: dict) -> dict:
+    """Run an export job (asynchronous invocation) and record its result"""
+    user_id = job['userId']
+    job_id = job['jobId']
+    
+    try:
+        summary = export_user_history(chatlogs_table, s3_client, EXPORTS_BUCKET, user_id, job_id)
+        status = {'jobId': job_id, 'status': 'completed', 'completedAt': datetime.now().isoformat(), **summary}
+    except Exception as e:
+        print(f"Error exporting chat history: {e}")
+        status = {'jobId': job_id, 'status': 'failed', 'message': 'Export failed'}
+    
+    write_export_status(s3_client, EXPORTS_BUCKET, user_id, job_id, status)
+    return status
+
+
+@warmable(WARMUP_TARGETS)
+@traced
 def lambda_handler(event, context):
     """
     Handle chat management operations
@@ -160,23 +464,63 @@ def lambda_handler(event, context):
     - GET /chat/sessions/{sessionId} - Get session details
     - DELETE /chat/sessions/{sessionId} - Delete session
     - GET /chat/sessions/{sessionId}/messages - Get session messages
+      (?view=summary returns role/content only, without sourceDocuments)
     - PUT /chat/messages/{messageId}/feedback - Update message feedback
+    - GET /chat/stats - Get feedback / query statistics (?day=YYYY-MM-DD&document=name)
+      (query / document rankings for members of the admin group only)
+    - GET /chat/usage - Get token usage and cost of the user (and of all users
+      for members of the admin group)
+      (?from=YYYY-MM-DD&to=YYYY-MM-DD, at most 31 days, default: last 7 days)
+    - GET /chat/citations?key=... - Resolve a source document key to a signed URL
+    - POST /chat/exports - Start NDJSON export of a user's chat history
+    - GET /chat/exports/{jobId} - Get export status and download link
+    
+    GET routes return an ETag and answer If-None-Match with 304 Not Modified.
+    Every response carries the request ID of its trace (X-Request-Id).
+    
+    Every route requires a Cognito token (Authorization: Bearer ...), verified
+    locally; user-scoped routes act on its sub. A userId parameter, where
+    older clients still send one, must match it. Session routes answer 404
+    for sessions of other users.
     """
     
     # CORS headers
     headers = {
         'Content-Type': 'application/json',
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match,X-Request-Id',
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+        'Access-Control-Expose-Headers': 'ETag'
     }
     
+    # Cache validation headers for GET responses (always revalidate)
+    def cache_headers(etag: str) -> dict:
+        if not etag:
+            return headers
+        return {**headers, 'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    
+    # SECURITY: sessions of other users are reported as missing, not forbidden
+    def session_not_found() -> dict:
+        return {
+            'statusCode': 404,
+            'headers': headers,
+            'body': json.dumps({
+                'error': 'NotFound',
+                'message': 'Session not found'
+            })
+        }
+    
+    # Asynchronous export job (invoked by POST /chat/exports)
+    if 'exportJob' in event:
+        return run_export_job(event['exportJob'])
+    
     try:
         # Get route info
         http_method = event.get('httpMethod', event.get('requestContext', {}).get('http', {}).get('method'))
         path = event.get('path', event.get('rawPath', ''))
         path_parameters = event.get('pathParameters', {})
         query_parameters = event.get('queryStringParameters', {}) or {}
+        request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
         
         # Parse body if present
         body = {}
@@ -186,25 +530,48 @@ def lambda_handler(event, context):
             else:
                 body = event['body']
         
+        # Authenticate (verified locally against the user pool's JWKS)
+        try:
+            claims = authenticate(event)
+        except AuthError as e:
+            return {
+                'statusCode': 401,
+                'headers': headers,
+                'body': json.dumps({
+                    'error': 'AuthenticationError',
+                    'message': str(e)
+                })
+            }
+        
+        user_id = claims['sub']
+        annotate('userId', user_id)
+        
+        requested_user_id = query_parameters.get('userId') or body.get('userId')
+        if requested_user_id and requested_user_id != user_id:
+            return {
+                'statusCode': 403,
+                'headers': headers,
+                'body': json.dumps({
+                    'error': 'Forbidden',
+                    'message': 'userId does not match the authenticated user'
+                })
+            }
+        
         # Route: GET /chat/sessions - List user sessions
         if http_method == 'GET' and path == '/chat/sessions':
-            user_id = query_parameters.get('userId')
-            
-            if not user_id:
+            etag = get_version_etag(f"{USER_META_PREFIX}{user_id}")
+            if etag_matches(request_headers, etag):
                 return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({
-                        'error': 'ValidationError',
-                        'message': 'userId is required'
-                    })
+                    'statusCode': 304,
+                    'headers': cache_headers(etag),
+                    'body': ''
                 }
             
             sessions = get_sessions_by_user(user_id)
             
             return {
                 'statusCode': 200,
-                'headers': headers,
+                'headers': cache_headers(etag),
                 'body': json.dumps({'sessions': sessions}, cls=DecimalEncoder, ensure_ascii=False)
             }
         
@@ -222,11 +589,25 @@ def lambda_handler(event, context):
                     })
                 }
             
-            messages = get_session_messages(session_id)
+            if get_session_owner(session_id) != user_id:
+                return session_not_found()
+            
+            summary = query_parameters.get('view') == 'summary'
+            
+            # Full view embeds signed document URLs: a new signing window changes the ETag
+            etag = get_version_etag(session_id, 'summary' if summary else f"w{signing_window()}")
+            if etag_matches(request_headers, etag):
+                return {
+                    'statusCode': 304,
+                    'headers': cache_headers(etag),
+                    'body': ''
+                }
+            
+            messages = get_session_messages(session_id, summary=summary)
             
             return {
                 'statusCode': 200,
-                'headers': headers,
+                'headers': cache_headers(etag),
                 'body': json.dumps({'messages': messages}, cls=DecimalEncoder, ensure_ascii=False)
             }
         
@@ -234,6 +615,9 @@ def lambda_handler(event, context):
         elif http_method == 'DELETE' and path_parameters.get('sessionId'):
             session_id = path_parameters.get('sessionId')
             
+            if get_session_owner(session_id) != user_id:
+                return session_not_found()
+            
             deleted_count = delete_session(session_id)
             
             return {
@@ -245,6 +629,144 @@ def lambda_handler(event, context):
                 })
             }
         
+        # Route: GET /chat/stats - Get precomputed statistics
+        elif http_method == 'GET' and path == '/chat/stats':
+            day = query_parameters.get('day') or datetime.now().strftime('%Y-%m-%d')
+            
+            try:
+                datetime.strptime(day, '%Y-%m-%d')
+            except ValueError:
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'error': 'ValidationError',
+                        'message': 'day must be in YYYY-MM-DD format'
+                    })
+                }
+            
+            # SECURITY: rankings contain query text of other users (admins only)
+            stats = get_stats(day, query_parameters.get('document'), rankings=in_group(claims, ADMIN_GROUP))
+            
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': json.dumps(stats, cls=DecimalEncoder, ensure_ascii=False)
+            }
+        
+        # Route: GET /chat/usage - Get token usage and cost
+        elif http_method == 'GET' and path == '/chat/usage':
+            end_day = query_parameters.get('to') or datetime.now().strftime('%Y-%m-%d')
+            try:
+                start_day = query_parameters.get('from') or (
+                    datetime.strptime(end_day, '%Y-%m-%d') - timedelta(days=USAGE_DEFAULT_DAYS - 1)
+                ).strftime('%Y-%m-%d')
+                span = (datetime.strptime(end_day, '%Y-%m-%d') - datetime.strptime(start_day, '%Y-%m-%d')).days
+            except ValueError:
+                span = None
+            
+            if span is None or not 0 <= span < USAGE_MAX_DAYS:
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'error': 'ValidationError',
+                        'message': f'from / to must be YYYY-MM-DD, from <= to, at most {USAGE_MAX_DAYS} days'
+                    })
+                }
+            
+            # SECURITY: totals of all users for members of the admin group only
+            usage = get_usage(user_id, start_day, end_day, include_all=in_group(claims, ADMIN_GROUP))
+            
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': json.dumps(usage, cls=DecimalEncoder, ensure_ascii=False)
+            }
+        
+        # Route: GET /chat/citations - Resolve document key to a signed URL
+        elif http_method == 'GET' and path == '/chat/citations':
+            document_key = query_parameters.get('key', '')
+            
+            # SECURITY: only plain keys inside the documents bucket can be signed
+            if not document_key or document_key.startswith('/') or '..' in document_key.split('/'):
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'error': 'ValidationError',
+                        'message': 'valid key is required'
+                    })
+                }
+            
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': json.dumps({
+                    'documentKey': document_key,
+                    'url': sign_document_key(s3_client, DOCUMENTS_BUCKET, document_key)
+                }, ensure_ascii=False)
+            }
+        
+        # Route: POST /chat/exports - Start chat history export
+        elif http_method == 'POST' and path == '/chat/exports':
+            # SECURITY: userId becomes part of the S3 key
+            if '/' in user_id:
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'error': 'ValidationError',
+                        'message': 'invalid userId'
+                    })
+                }
+            
+            job_id = start_export_job(user_id, context.function_name)
+            
+            return {
+                'statusCode': 202,
+                'headers': headers,
+                'body': json.dumps({
+                    'message': 'Export started',
+                    'jobId': job_id
+                })
+            }
+        
+        # Route: GET /chat/exports/{jobId} - Get export status
+        elif http_method == 'GET' and path_parameters.get('jobId'):
+            job_id = path_parameters.get('jobId')
+            
+            # SECURITY: jobId / userId become part of the S3 key
+            if '/' in user_id or not re.fullmatch(r'export_\d+', job_id):
+                return {
+                    'statusCode': 400,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'error': 'ValidationError',
+                        'message': 'valid jobId is required'
+                    })
+                }
+            
+            try:
+                status = read_export_status(s3_client, EXPORTS_BUCKET, user_id, job_id)
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+                    raise
+                return {
+                    'statusCode': 404,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'error': 'NotFound',
+                        'message': 'Export job not found'
+                    })
+                }
+            
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': json.dumps(status, ensure_ascii=False)
+            }
+        
         # Route: PUT /chat/messages/{messageId}/feedback - Update feedback
         elif http_method == 'PUT' and '/feedback' in path:
             message_id = path_parameters.get('messageId')
@@ -271,6 +793,9 @@ def lambda_handler(event, context):
                     })
                 }
             
+            if get_session_owner(session_id) != user_id:
+                return session_not_found()
+            
             update_message_feedback(session_id, message_id, feedback)
             
             return {
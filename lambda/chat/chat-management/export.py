@@ -0,0 +1,221 @@
+"""
+EleKnowledge-AI Chat History Export
+Stream a user's full chat history to S3 as gzip-compressed NDJSON
+"""
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from decimal import Decimal
+from message_codec import decode_message_item
+
+# Export settings
+EXPORT_PREFIX = 'tmp/exports'  # tmp/ is expired by the uploads bucket lifecycle rule
+PART_SIZE_BYTES = 8 * 1024 * 1024  # S3 multipart minimum is 5 MB
+EXPORT_CONCURRENCY = 4
+PRESIGNED_URL_EXPIRES = 3600
+MESSAGE_ID_PREFIX = 'msg_'
+
+
+def export_object_key(user_id: str, job_id: str) -> str:
+    """S3 key of the NDJSON export"""
+    return f"{EXPORT_PREFIX}/{user_id}/{job_id}.ndjson.gz"
+
+
+def export_status_key(user_id: str, job_id: str) -> str:
+    """S3 key of the export job status document"""
+    return f"{EXPORT_PREFIX}/{user_id}/{job_id}.status.json"
+
+
+def to_json_value(obj):
+    """json.dumps default for DynamoDB types"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.hex()
+    if isinstance(obj, set):
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class MultipartUploadWriter:
+    """
+    File-like object that streams written bytes to an S3 multipart upload
+
+    At most one part (PART_SIZE_BYTES) is held in memory at a time.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, content_type: str = 'application/gzip'):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.buffer = bytearray()
+        self.parts = []
+        self.bytes_written = 0
+        response = s3_client.create_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            ContentType=content_type
+        )
+        self.upload_id = response['UploadId']
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self.buffer) >= PART_SIZE_BYTES:
+            self._upload_part(bytes(self.buffer[:PART_SIZE_BYTES]))
+            del self.buffer[:PART_SIZE_BYTES]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _upload_part(self, body: bytes):
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+    def complete(self):
+        """Upload the remaining bytes (the last part may be < 5 MB) and finish"""
+        if self.buffer or not self.parts:
+            self._upload_part(bytes(self.buffer))
+            self.buffer.clear()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
+
+    def abort(self):
+        self.s3_client.abort_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id
+        )
+
+
+def iter_user_session_ids(chatlogs_table, user_id: str):
+    """Yield every session ID of a user (paginated GSI query, keys only)"""
+    seen = set()
+    query_kwargs = {
+        'IndexName': 'userId-timestamp-index',
+        'KeyConditionExpression': 'userId = :uid',
+        'ProjectionExpression': 'sessionId',
+        'ExpressionAttributeValues': {':uid': user_id}
+    }
+    while True:
+        response = chatlogs_table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            if item['sessionId'] not in seen:
+                seen.add(item['sessionId'])
+                yield item['sessionId']
+        if 'LastEvaluatedKey' not in response:
+            return
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def query_session_messages(chatlogs_table, session_id: str) -> list:
+    """Get all messages of a session (paginated, oldest first)"""
+    messages = []
+    query_kwargs = {
+        'KeyConditionExpression': 'sessionId = :sid AND begins_with(messageId, :prefix)',
+        'ExpressionAttributeValues': {':sid': session_id, ':prefix': MESSAGE_ID_PREFIX},
+        'ScanIndexForward': True
+    }
+    while True:
+        response = chatlogs_table.query(**query_kwargs)
+        messages.extend(decode_message_item(item) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return messages
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def iter_messages_bounded(chatlogs_table, session_ids, concurrency: int = EXPORT_CONCURRENCY):
+    """
+    Query sessions in parallel while keeping at most `concurrency`
+    sessions in flight; yields messages in session order
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = deque()
+        for session_id in session_ids:
+            in_flight.append(executor.submit(query_session_messages, chatlogs_table, session_id))
+            if len(in_flight) >= concurrency:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def export_user_history(chatlogs_table, s3_client, bucket: str, user_id: str, job_id: str) -> dict:
+    """
+    Export all chat messages of a user as gzip NDJSON (one message per line)
+
+    Returns:
+        dict: Export summary (objectKey, sessionCount, messageCount, bytes, durationMs)
+    """
+    start_time = time.time()
+    key = export_object_key(user_id, job_id)
+    writer = MultipartUploadWriter(s3_client, bucket, key)
+
+    session_count = 0
+    message_count = 0
+    session_ids = iter_user_session_ids(chatlogs_table, user_id)
+
+    def counted(ids):
+        nonlocal session_count
+        for session_id in ids:
+            session_count += 1
+            yield session_id
+
+    try:
+        with gzip.GzipFile(fileobj=writer, mode='wb') as gz:
+            for message in iter_messages_bounded(chatlogs_table, counted(session_ids)):
+                line = json.dumps(message, default=to_json_value, ensure_ascii=False)
+                gz.write(line.encode('utf-8') + b'\n')
+                message_count += 1
+        writer.complete()
+    except Exception:
+        writer.abort()
+        raise
+
+    return {
+        'objectKey': key,
+        'sessionCount': session_count,
+        'messageCount': message_count,
+        'bytes': writer.bytes_written,
+        'durationMs': int((time.time() - start_time) * 1000)
+    }
+
+
+def write_export_status(s3_client, bucket: str, user_id: str, job_id: str, status: dict):
+    """Store the export job status document"""
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=export_status_key(user_id, job_id),
+        Body=json.dumps(status, ensure_ascii=False).encode('utf-8'),
+        ContentType='application/json'
+    )
+
+
+def read_export_status(s3_client, bucket: str, user_id: str, job_id: str) -> dict:
+    """Read the export job status document and sign the download link when done"""
+    response = s3_client.get_object(Bucket=bucket, Key=export_status_key(user_id, job_id))
+    status = json.loads(response['Body'].read())
+
+    if status.get('status') == 'completed':
+        status['downloadUrl'] = s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket, 'Key': status['objectKey']},
+            ExpiresIn=PRESIGNED_URL_EXPIRES
+        )
+    return status
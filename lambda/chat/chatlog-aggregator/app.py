@@ -0,0 +1,251 @@
+"""
+EleKnowledge-AI Chat Log Aggregator Lambda Function
+DynamoDB Stream consumer that maintains precomputed statistics
+(feedback per document, queries per day, top queries, token usage and cost
+per day and per user)
+"""
+import json
+import os
+import sys
+import unicodedata
+import boto3
+from collections import Counter, defaultdict
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from message_codec import decode_message_item
+
+# Environment variables
+STATS_TABLE_NAME = os.environ.get('STATS_TABLE')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+
+# DynamoDB table
+stats_table = dynamodb.Table(STATS_TABLE_NAME) if STATS_TABLE_NAME else None
+
+# Aggregation settings
+MESSAGE_ID_PREFIX = 'msg_'
+TOP_N = 20
+MAX_QUERY_LENGTH = 200
+LEADERBOARD_RETRIES = 3
+FEEDBACK_VALUES = ('good', 'bad')
+# Summed per answer (usage map of assistant messages, see RAG build_usage)
+USAGE_COUNTERS = ('inputTokens', 'outputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens', 'costUsd')
+USAGE_TIMINGS = ('retrieveMs', 'generateMs', 'totalMs')
+
+deserializer = TypeDeserializer()
+
+
+def deserialize_image(image: dict) -> dict:
+    """Convert a stream image (DynamoDB JSON) to a plain, decoded dict"""
+    item = {k: deserializer.deserialize(v) for k, v in (image or {}).items()}
+    return decode_message_item(item)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for counting (NFKC, lower case, collapsed whitespace)"""
+    normalized = unicodedata.normalize('NFKC', query or '').lower()
+    normalized = ' '.join(normalized.split())
+    normalized = normalized.rstrip('?？。.!！')
+    return normalized[:MAX_QUERY_LENGTH]
+
+
+def document_names(item: dict) -> set:
+    """Unique document names referenced by an assistant message"""
+    return {
+        doc.get('documentName')
+        for doc in item.get('sourceDocuments', [])
+        if doc.get('documentName')
+    }
+
+
+def aggregate_records(records: list) -> dict:
+    """
+    Reduce a batch of stream records to counter deltas (no AWS calls)
+
+    Returns:
+        dict: {
+            'dailyQueries': Counter({day: n}),
+            'queries': Counter({(day, normalizedQuery): n}),
+            'documentFeedback': defaultdict(Counter) {documentName: {'good': n, 'bad': n}},
+            'usage': defaultdict(Counter) {(pk, sk): {counter: n}}
+        }
+    """
+    deltas = {
+        'dailyQueries': Counter(),
+        'queries': Counter(),
+        'documentFeedback': defaultdict(Counter),
+        'usage': defaultdict(Counter)
+    }
+
+    for record in records:
+        event_name = record.get('eventName')
+        stream_data = record.get('dynamodb', {})
+        new_image = deserialize_image(stream_data.get('NewImage'))
+        old_image = deserialize_image(stream_data.get('OldImage'))
+
+        # Skip version items and other non-message items
+        if not str(new_image.get('messageId', '')).startswith(MESSAGE_ID_PREFIX):
+            continue
+
+        # New user question → query counters
+        if event_name == 'INSERT' and new_image.get('role') == 'user':
+            day = str(new_image.get('timestamp', ''))[:10]
+            query = normalize_query(new_image.get('content', ''))
+            if day and query:
+                deltas['dailyQueries'][day] += 1
+                deltas['queries'][(day, query)] += 1
+
+        # New answer → token usage per day and per user and day
+        elif event_name == 'INSERT' and new_image.get('role') == 'assistant' and new_image.get('usage'):
+            day = str(new_image.get('timestamp', ''))[:10]
+            if day:
+                counters = usage_counters(new_image['usage'])
+                deltas['usage'][(f"usage-day#{day}", 'total')].update(counters)
+                if new_image.get('userId'):
+                    deltas['usage'][(f"usage-user#{new_image['userId']}", day)].update(counters)
+
+        # Feedback set or changed → per-document feedback counters
+        elif event_name == 'MODIFY':
+            old_feedback = old_image.get('feedback')
+            new_feedback = new_image.get('feedback')
+            if old_feedback == new_feedback:
+                continue
+
+            for doc_name in document_names(new_image):
+                if old_feedback in FEEDBACK_VALUES:
+                    deltas['documentFeedback'][doc_name][old_feedback] -= 1
+                if new_feedback in FEEDBACK_VALUES:
+                    deltas['documentFeedback'][doc_name][new_feedback] += 1
+
+    return deltas
+
+
+def usage_counters(usage: dict) -> Counter:
+    """Counters of one answer's usage map (timings are summed for averages)"""
+    counters = Counter({'answerCount': 1})
+    for name in USAGE_COUNTERS:
+        if usage.get(name):
+            counters[name] = usage[name]
+    for name in USAGE_TIMINGS:
+        if usage.get('timings', {}).get(name):
+            counters[name] = usage['timings'][name]
+    return counters
+
+
+def add_counters(key: dict, counters: dict) -> dict:
+    """Atomically add counters to a stats item and return the new values"""
+    names = {}
+    values = {}
+    clauses = []
+    for i, (attribute, amount) in enumerate(counters.items()):
+        names[f"#a{i}"] = attribute
+        values[f":v{i}"] = amount
+        clauses.append(f"#a{i} :v{i}")
+
+    response = stats_table.update_item(
+        Key=key,
+        UpdateExpression='ADD ' + ', '.join(clauses),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        ReturnValues='UPDATED_NEW'
+    )
+    return response.get('Attributes', {})
+
+
+def update_leaderboard(pk: str, candidates: dict):
+    """
+    Merge {name: count} candidates into a top-N leaderboard item
+
+    Optimistic locking on 'version' keeps concurrent shards from
+    overwriting each other's entries.
+    """
+    for _ in range(LEADERBOARD_RETRIES):
+        response = stats_table.get_item(Key={'pk': pk, 'sk': 'top'}, ConsistentRead=True)
+        item = response.get('Item', {})
+        version = int(item.get('version', 0))
+
+        entries = {name: int(count) for name, count in item.get('entries', {}).items()}
+        entries.update(candidates)
+        top = dict(sorted(entries.items(), key=lambda x: x[1], reverse=True)[:TOP_N])
+        top = {name: count for name, count in top.items() if count > 0}
+
+        try:
+            stats_table.put_item(
+                Item={'pk': pk, 'sk': 'top', 'entries': top, 'version': version + 1},
+                ConditionExpression='attribute_not_exists(pk) OR version = :version',
+                ExpressionAttributeValues={':version': version}
+            )
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    print(f"Leaderboard update gave up after {LEADERBOARD_RETRIES} conflicts: {pk}")
+
+
+def apply_deltas(deltas: dict):
+    """Write counter deltas and refresh leaderboards"""
+    for day, count in deltas['dailyQueries'].items():
+        add_counters({'pk': f"day#{day}", 'sk': 'queries'}, {'queryCount': count})
+
+    top_query_candidates = defaultdict(dict)
+    for (day, query), count in deltas['queries'].items():
+        updated = add_counters({'pk': f"query#{day}", 'sk': query}, {'queryCount': count})
+        top_query_candidates[day][query] = int(updated['queryCount'])
+
+    for day, candidates in top_query_candidates.items():
+        update_leaderboard(f"top-queries#{day}", candidates)
+
+    bad_document_candidates = {}
+    for doc_name, counters in deltas['documentFeedback'].items():
+        counters = {k: v for k, v in counters.items() if v}
+        if not counters:
+            continue
+        updated = add_counters({'pk': f"doc#{doc_name}", 'sk': 'feedback'}, counters)
+        if 'bad' in updated:
+            bad_document_candidates[doc_name] = int(updated['bad'])
+
+    if bad_document_candidates:
+        update_leaderboard('top-bad-documents', bad_document_candidates)
+
+    for (pk, sk), counters in deltas['usage'].items():
+        add_counters({'pk': pk, 'sk': sk}, dict(counters))
+
+
+def lambda_handler(event, context):
+    """
+    Handle a DynamoDB Stream batch from the chatlogs table
+
+    Counters are statistics: a retried batch may be counted twice.
+    """
+    records = event.get('Records', [])
+    deltas = aggregate_records(records)
+    apply_deltas(deltas)
+
+    summary = {
+        'records': len(records),
+        'days': len(deltas['dailyQueries']),
+        'queries': len(deltas['queries']),
+        'documents': len(deltas['documentFeedback']),
+        'usageItems': len(deltas['usage'])
+    }
+    print(json.dumps(summary))
+
+    return summary
+
+
+if __name__ == '__main__':
+    # Local dry run (shared layer on the path):
+    # PYTHONPATH=../../layers/shared/python python app.py events/sample-stream-batch.json
+    with open(sys.argv[1], encoding='utf-8') as f:
+        recorded_event = json.load(f)
+
+    result = aggregate_records(recorded_event.get('Records', []))
+    print(json.dumps({
+        'dailyQueries': dict(result['dailyQueries']),
+        'queries': {f"{day} {query}": n for (day, query), n in result['queries'].items()},
+        'documentFeedback': {doc: dict(c) for doc, c in result['documentFeedback'].items()},
+        'usage': {f"{pk} {sk}": {name: float(n) for name, n in c.items()} for (pk, sk), c in result['usage'].items()}
+    }, ensure_ascii=False, indent=2))
@@ -0,0 +1,442 @@
+"""
+EleKnowledge-AI Auth Layer
+Auth operations shared by the consolidated auth function and the
+per-route entry points
+
+One module holds the Cognito / DynamoDB clients, the CORS headers and the
+Cognito error mapping of every operation:
+
+- route(event, context): consolidated function, dispatches on the path
+  (/auth/login -> 'login'); one warm container pool serves every route
+- handle(operation, event, context): per-route functions
+  (lambda/auth/<operation>/app.py)
+
+Both answer warm-up invocations ({"warmup": true}, see the warmup layer).
+"""
+import base64
+import json
+import os
+import time
+import boto3
+from botocore.exceptions import ClientError
+from rate_limit import check_rate_limit, warm_up_connection
+from warmup import is_warmup_event, warmable
+
+# Environment variables
+USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
+CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
+USERS_TABLE_NAME = os.environ.get('USERS_TABLE')
+
+# Initialize AWS clients
+cognito_client = boto3.client('cognito-idp')
+dynamodb = boto3.resource('dynamodb')
+
+# DynamoDB table
+users_table = dynamodb.Table(USERS_TABLE_NAME) if USERS_TABLE_NAME else None
+
+# CORS headers
+HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS'
+}
+
+USER_NOT_FOUND = (404, 'UserNotFoundError', 'User account does not exist')
+INVALID_PASSWORD = (400, 'InvalidPasswordError',
+                    'Password does not meet requirements: 8+ characters, uppercase, lowercase, number, symbol')
+
+# Warm-up calls (see warmup): an unauthenticated Cognito call with an invalid
+# token, and reads of items that do not exist (auth_operations and rate_limit
+# each have their own DynamoDB client and connection pool)
+WARMUP_KEY = '#warmup'
+WARMUP_TARGETS = {
+    'cognito-idp': lambda: cognito_client.get_user(AccessToken=WARMUP_KEY),
+    'dynamodb-rate-limits': warm_up_connection
+}
+if users_table:
+    WARMUP_TARGETS['dynamodb-users'] = lambda: users_table.get_item(Key={'userId': WARMUP_KEY})
+
+
+def response(status_code: int, body: dict, headers: dict = None) -> dict:
+    return {
+        'statusCode': status_code,
+        'headers': headers or HEADERS,
+        'body': json.dumps(body)
+    }
+
+
+def error_response(status_code: int, error: str, message: str, headers: dict = None) -> dict:
+    return response(status_code, {'error': error, 'message': message}, headers)
+
+
+def rate_limited(action: str, event: dict, email: str) -> dict:
+    """429 response if the request is over the action's rate limit (checked before any Cognito call)"""
+    retry_after = check_rate_limit(action, event, email)
+    if not retry_after:
+        return None
+    return error_response(429, 'TooManyRequests', f'Too many requests, please retry in {retry_after} seconds',
+                          {**HEADERS, 'Retry-After': str(retry_after), 'Access-Control-Expose-Headers': 'Retry-After'})
+
+
+def id_token_claims(id_token: str) -> dict:
+    """
+    Claims of an ID token returned by initiate_auth
+
+    The token comes straight from Cognito over TLS, so its payload is read
+    without a signature check (API handlers verify tokens with the shared
+    auth_tokens module).
+    """
+    payload = id_token.split('.')[1]
+    return json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+
+
+def signup(event: dict, body: dict, context) -> dict:
+    """
+    Handle user signup
+
+    Expected event body:
+    {
+        "email": "user@example.com",
+        "password": "SecurePassword123!",
+        "name": "User Name" (optional)
+    }
+    """
+    email = body.get('email')
+    password = body.get('password')
+    name = body.get('name', '')
+
+    # Validate input
+    if not email or not password:
+        return error_response(400, 'ValidationError', 'Email and password are required')
+
+    limited = rate_limited('signup', event, email)
+    if limited:
+        return limited
+
+    # Create user in Cognito
+    user_attributes = [
+        {'Name': 'email', 'Value': email}
+    ]
+
+    if name:
+        user_attributes.append({'Name': 'name', 'Value': name})
+
+    cognito_response = cognito_client.sign_up(
+        ClientId=CLIENT_ID,
+        Username=email,
+        Password=password,
+        UserAttributes=user_attributes
+    )
+
+    user_sub = cognito_response['UserSub']
+
+    # Store user info in DynamoDB
+    users_table.put_item(
+        Item={
+            'userId': user_sub,
+            'email': email,
+            'username': name if name else email.split('@')[0],
+            'createdAt': context.request_time_epoch if hasattr(context, 'request_time_epoch') else None,
+            'role': 'user'
+        }
+    )
+
+    return response(201, {
+        'message': 'User registered successfully. Please check your email for verification code.',
+        'userId': user_sub,
+        'email': email
+    })
+
+
+def login(event: dict, body: dict, context) -> dict:
+    """
+    Handle user login
+
+    Expected event body:
+    {
+        "email": "user@example.com",
+        "password": "SecurePassword123!"
+    }
+    """
+    email = body.get('email')
+    password = body.get('password')
+
+    # Validate input
+    if not email or not password:
+        return error_response(400, 'ValidationError', 'Email and password are required')
+
+    limited = rate_limited('login', event, email)
+    if limited:
+        return limited
+
+    # Authenticate with Cognito
+    auth_response = cognito_client.initiate_auth(
+        ClientId=CLIENT_ID,
+        AuthFlow='USER_PASSWORD_AUTH',
+        AuthParameters={
+            'USERNAME': email,
+            'PASSWORD': password
+        }
+    )
+
+    # The user's sub is in the ID token (no get_user round trip)
+    user_sub = id_token_claims(auth_response['AuthenticationResult']['IdToken'])['sub']
+
+    # Update last login time in DynamoDB
+    try:
+        users_table.update_item(
+            Key={'userId': user_sub},
+            UpdateExpression='SET lastLoginAt = :timestamp',
+            ExpressionAttributeValues={
+                ':timestamp': int(time.time())
+            }
+        )
+    except Exception as update_error:
+        print(f"Failed to update last login: {str(update_error)}")
+
+    # Return tokens and user info
+    return response(200, {
+        'message': 'Login successful',
+        'tokens': {
+            'accessToken': auth_response['AuthenticationResult']['AccessToken'],
+            'idToken': auth_response['AuthenticationResult']['IdToken'],
+            'refreshToken': auth_response['AuthenticationResult']['RefreshToken'],
+            'expiresIn': auth_response['AuthenticationResult']['ExpiresIn']
+        },
+        'user': {
+            'userId': user_sub,
+            'email': email
+        }
+    })
+
+
+def refresh(event: dict, body: dict, context) -> dict:
+    """
+    Handle token refresh
+
+    Expected event body:
+    {
+        "refreshToken": "eyJxx..."
+    }
+
+    Unlike login, no get_user call and no Users table write is made:
+    one Cognito call per refresh.
+    """
+    refresh_token = body.get('refreshToken')
+
+    # Validate input
+    if not refresh_token:
+        return error_response(400, 'ValidationError', 'refreshToken is required')
+
+    # Refresh with Cognito
+    auth_response = cognito_client.initiate_auth(
+        ClientId=CLIENT_ID,
+        AuthFlow='REFRESH_TOKEN_AUTH',
+        AuthParameters={
+            'REFRESH_TOKEN': refresh_token
+        }
+    )
+
+    result = auth_response['AuthenticationResult']
+    tokens = {
+        'accessToken': result['AccessToken'],
+        'idToken': result['IdToken'],
+        'expiresIn': result['ExpiresIn']
+    }
+    # A new refresh token is only returned when refresh token rotation is enabled
+    if result.get('RefreshToken'):
+        tokens['refreshToken'] = result['RefreshToken']
+
+    claims = id_token_claims(result['IdToken'])
+
+    # Return tokens and user info
+    return response(200, {
+        'message': 'Token refresh successful',
+        'tokens': tokens,
+        'user': {
+            'userId': claims['sub'],
+            'email': claims.get('email')
+        }
+    })
+
+
+def verify(event: dict, body: dict, context) -> dict:
+    """
+    Handle email verification
+
+    Expected event body:
+    {
+        "email": "user@example.com",
+        "code": "123456"
+    }
+    """
+    email = body.get('email')
+    code = body.get('code')
+
+    # Validate input
+    if not email or not code:
+        return error_response(400, 'ValidationError', 'Email and verification code are required')
+
+    limited = rate_limited('verify', event, email)
+    if limited:
+        return limited
+
+    # Confirm signup with verification code
+    cognito_client.confirm_sign_up(
+        ClientId=CLIENT_ID,
+        Username=email,
+        ConfirmationCode=code
+    )
+
+    return response(200, {
+        'message': 'Email verified successfully. You can now log in.',
+        'email': email
+    })
+
+
+def forgot_password(event: dict, body: dict, context) -> dict:
+    """
+    Handle forgot password request
+
+    Expected event body:
+    {
+        "email": "user@example.com"
+    }
+    """
+    email = body.get('email')
+
+    # Validate input
+    if not email:
+        return error_response(400, 'ValidationError', 'Email is required')
+
+    limited = rate_limited('forgot-password', event, email)
+    if limited:
+        return limited
+
+    # Initiate forgot password process
+    cognito_client.forgot_password(
+        ClientId=CLIENT_ID,
+        Username=email
+    )
+
+    return response(200, {
+        'message': 'Password reset code sent to your email address',
+        'email': email
+    })
+
+
+def confirm_password_reset(event: dict, body: dict, context) -> dict:
+    """
+    Handle password reset confirmation
+
+    Expected event body:
+    {
+        "email": "user@example.com",
+        "code": "123456",
+        "newPassword": "NewSecurePass123!"
+    }
+    """
+    email = body.get('email')
+    code = body.get('code')
+    new_password = body.get('newPassword')
+
+    # Validate input
+    if not email or not code or not new_password:
+        return error_response(400, 'ValidationError', 'Email, confirmation code, and new password are required')
+
+    # Confirm forgot password and set new password
+    cognito_client.confirm_forgot_password(
+        ClientId=CLIENT_ID,
+        Username=email,
+        ConfirmationCode=code,
+        Password=new_password
+    )
+
+    return response(200, {
+        'message': 'Password has been successfully reset. You can now log in with your new password.',
+        'email': email
+    })
+
+
+# operation: (function, {Cognito error code: (status, error, message)})
+OPERATIONS = {
+    'signup': (signup, {
+        'UsernameExistsException': (409, 'UserExistsError', 'An account with this email already exists'),
+        'InvalidPasswordException': INVALID_PASSWORD
+    }),
+    'login': (login, {
+        'NotAuthorizedException': (401, 'AuthenticationError', 'Incorrect email or password'),
+        'UserNotFoundException': USER_NOT_FOUND,
+        'UserNotConfirmedException': (403, 'UserNotConfirmedError', 'Please verify your email before logging in')
+    }),
+    'refresh': (refresh, {
+        'NotAuthorizedException': (401, 'AuthenticationError',
+                                   'Refresh token is invalid or expired, please log in again'),
+        'UserNotFoundException': USER_NOT_FOUND
+    }),
+    'verify': (verify, {
+        'CodeMismatchException': (400, 'InvalidCodeError', 'Invalid verification code'),
+        'ExpiredCodeException': (400, 'ExpiredCodeError', 'Verification code has expired. Please request a new code.'),
+        'UserNotFoundException': USER_NOT_FOUND,
+        'NotAuthorizedException': (403, 'AlreadyConfirmedError', 'User is already confirmed')
+    }),
+    'forgot-password': (forgot_password, {
+        'UserNotFoundException': USER_NOT_FOUND,
+        'LimitExceededException': (429, 'TooManyRequestsError',
+                                   'Too many password reset requests. Please try again later.')
+    }),
+    'confirm-password-reset': (confirm_password_reset, {
+        'CodeMismatchException': (400, 'InvalidCodeError', 'Invalid confirmation code'),
+        'ExpiredCodeException': (400, 'ExpiredCodeError',
+                                 'Confirmation code has expired. Please request a new password reset.'),
+        'UserNotFoundException': USER_NOT_FOUND,
+        'InvalidPasswordException': INVALID_PASSWORD,
+        'LimitExceededException': (429, 'TooManyAttemptsError', 'Too many failed attempts. Please try again later.')
+    })
+}
+
+
+@warmable(WARMUP_TARGETS)
+def handle(operation: str, event: dict, context) -> dict:
+    """Run one auth operation with the shared CORS and error handling (warm-up events return early)"""
+    # Handle CORS preflight request
+    if event.get('httpMethod') == 'OPTIONS':
+        return response(200, {})
+
+    function, cognito_errors = OPERATIONS[operation]
+    try:
+        # Parse request body
+        if isinstance(event.get('body'), str):
+            body = json.loads(event['body'])
+        else:
+            body = event.get('body') or {}
+
+        return function(event, body, context)
+
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        error_message = e.response['Error']['Message']
+
+        # Handle specific Cognito errors
+        if error_code in cognito_errors:
+            return error_response(*cognito_errors[error_code])
+        return error_response(500, error_code, error_message)
+
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        return error_response(500, 'InternalServerError', 'An unexpected error occurred')
+
+
+def route(event: dict, context) -> dict:
+    """
+    Dispatch an API Gateway event on its path (/auth/<operation>)
+
+    Routes: /auth/signup, /auth/login, /auth/refresh, /auth/verify,
+    /auth/forgot-password, /auth/confirm-password-reset
+    """
+    path = event.get('path') or event.get('rawPath') or ''
+    operation = path.rstrip('/').rsplit('/', 1)[-1]
+    if operation not in OPERATIONS and not is_warmup_event(event):
+        return error_response(404, 'NotFound', 'Route not found')
+    return handle(operation, event, context)
@@ -0,0 +1,160 @@
+"""
+EleKnowledge-AI Auth Layer
+Per-IP and per-account rate limiting of the auth endpoints
+
+Each rule allows `limit` requests per `window` seconds for one client IP
+or one account (the email, stored hashed):
+
+1. An in-container token bucket per key rejects a hot client (e.g. a retry
+   loop landing on the same warm container) without any network call.
+2. An atomic counter per key and window in the rate limit table
+   (ADD with a condition, expires via TTL) enforces the limit across
+   all containers.
+
+Requests over a limit get a Retry-After before any Cognito call. If the
+table itself fails, requests are let through (fail open): the limiter
+must never lock users out on its own.
+"""
+import hashlib
+import json
+import math
+import os
+import time
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Environment variables
+RATE_LIMIT_TABLE_NAME = os.environ.get('RATE_LIMIT_TABLE')
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb')
+
+# DynamoDB table
+rate_limit_table = dynamodb.Table(RATE_LIMIT_TABLE_NAME) if RATE_LIMIT_TABLE_NAME else None
+
+# action: {scope: (limit, window seconds)}
+# Per-IP limits are generous: a site's technicians may share one NAT address
+DEFAULT_RATE_LIMITS = {
+    'login': {'ip': (200, 60), 'account': (5, 60)},
+    'signup': {'ip': (20, 60), 'account': (3, 300)},
+    'verify': {'ip': (60, 60), 'account': (5, 300)},
+    'forgot-password': {'ip': (20, 60), 'account': (3, 900)}
+}
+
+
+def _load_rate_limits() -> dict:
+    """DEFAULT_RATE_LIMITS with overrides, e.g. RATE_LIMITS='{"login": {"ip": [300, 60]}}'"""
+    rate_limits = {action: dict(rules) for action, rules in DEFAULT_RATE_LIMITS.items()}
+    for action, rules in json.loads(os.environ.get('RATE_LIMITS') or '{}').items():
+        rate_limits.setdefault(action, {}).update({scope: tuple(rule) for scope, rule in rules.items()})
+    return rate_limits
+
+
+RATE_LIMITS = _load_rate_limits()
+
+LOCAL_BUCKETS_MAX_ENTRIES = 10000
+
+# Per-container token buckets: {key: [tokens, updated_at, blocked_until]}
+_buckets = {}
+
+
+def client_ip(event: dict) -> str:
+    """Source IP of a REST (v1) or HTTP (v2) API Gateway event"""
+    request_context = event.get('requestContext') or {}
+    return (request_context.get('identity', {}).get('sourceIp')
+            or request_context.get('http', {}).get('sourceIp'))
+
+
+def _local_buckets(rules: list, now: float) -> list:
+    """Container buckets of (key, limit, window) rules, emptying the cache first when it is full"""
+    new_keys = sum(1 for key, _, _ in rules if key not in _buckets)
+    if len(_buckets) + new_keys > LOCAL_BUCKETS_MAX_ENTRIES:
+        _buckets.clear()
+    return [_buckets.setdefault(key, [float(limit), now, 0]) for key, limit, window in rules]
+
+
+def _take_local_token(bucket: list, limit: int, window: int, now: float) -> float:
+    """
+    Take a token from a container bucket
+
+    Returns:
+        float: 0 if a token was taken, otherwise seconds until the next one
+    """
+    if now < bucket[2]:
+        return bucket[2] - now
+
+    rate = limit / window
+    bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * rate)
+    bucket[1] = now
+    if bucket[0] < 1:
+        return (1 - bucket[0]) / rate
+    bucket[0] -= 1
+    return 0
+
+
+def _count_request(key: str, limit: int, window: int, now: float) -> float:
+    """
+    Count a request in the shared counter of the current window
+
+    Returns:
+        float: 0 if under the limit, otherwise seconds until the window ends
+    """
+    window_start = int(now) // window * window
+    try:
+        rate_limit_table.update_item(
+            Key={'pk': f"{key}#{window_start}"},
+            UpdateExpression='ADD hits :one SET expiresAt = if_not_exists(expiresAt, :expires)',
+            ConditionExpression='attribute_not_exists(hits) OR hits < :limit',
+            ExpressionAttributeValues={':one': 1, ':limit': limit, ':expires': window_start + window * 2}
+        )
+        return 0
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return window_start + window - now
+        print(f"Rate limit counter unavailable, allowing request: {e}")
+        return 0
+    except BotoCoreError as e:
+        print(f"Rate limit counter unavailable, allowing request: {e}")
+        return 0
+
+
+def warm_up_connection():
+    """Read an item that does not exist, opening this client's connection (warm-up invocations)"""
+    if rate_limit_table:
+        rate_limit_table.get_item(Key={'pk': '#warmup'})
+
+
+def check_rate_limit(action: str, event: dict, account: str = None) -> int:
+    """
+    Count a request against the limits of an auth action
+
+    Args:
+        action: Key of RATE_LIMITS ('login', 'signup', ...)
+        account: Email of the account the request targets, if known
+
+    Returns:
+        int: 0 if the request may proceed, otherwise the Retry-After seconds
+    """
+    subjects = {'ip': client_ip(event)}
+    if account:
+        subjects['account'] = hashlib.sha256(account.strip().lower().encode('utf-8')).hexdigest()[:32]
+
+    rules = [(f"{action}#{scope}#{subjects[scope]}", limit, window)
+             for scope, (limit, window) in RATE_LIMITS.get(action, {}).items() if subjects.get(scope)]
+    now = time.time()
+    # Held by reference: the cache may be emptied by other requests meanwhile
+    buckets = _local_buckets(rules, now)
+
+    wait = max([_take_local_token(bucket, limit, window, now)
+                for bucket, (key, limit, window) in zip(buckets, rules)], default=0)
+    if not wait and rate_limit_table:
+        for bucket, (key, limit, window) in zip(buckets, rules):
+            wait = _count_request(key, limit, window, now)
+            if wait:
+                # Reject further requests of this key here until the window ends
+                bucket[2] = now + wait
+                break
+
+    if wait:
+        print(f"Rate limited {action}: {[key for key, _, _ in rules]} retry after {math.ceil(wait)}s")
+    return math.ceil(wait)
@@ -0,0 +1,165 @@
+"""
+EleKnowledge-AI Shared Layer
+Local verification of Cognito ID and access tokens
+
+Tokens are verified in-process against the user pool's JWKS, fetched once
+per container. A token signed with an unknown key ID (key rotation)
+refetches the JWKS, at most once per JWKS_REFRESH_SECONDS. RS256
+signatures (RSASSA-PKCS1-v1_5 with SHA-256) are checked with plain
+modular exponentiation, so the layer needs no crypto package.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import urllib.request
+
+# Environment variables
+USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
+CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Verification settings
+JWKS_REFRESH_SECONDS = 300
+JWKS_TIMEOUT_SECONDS = 3
+CLOCK_SKEW_SECONDS = 60
+TOKEN_USES = ('id', 'access')
+
+# DER prefix of the SHA-256 DigestInfo in an RSASSA-PKCS1-v1_5 signature
+SHA256_DIGEST_INFO = bytes.fromhex('3031300d060960864801650304020105000420')
+
+# Per-container cache: {kid: (modulus, exponent)}
+_jwks = {}
+_jwks_fetched_at = 0
+
+
+class AuthError(Exception):
+    """The request carries no valid token of the user pool"""
+
+
+def issuer() -> str:
+    return f"https://cognito-idp.{AWS_REGION}.amazonaws.com/{USER_POOL_ID}"
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def _b64url_int(segment: str) -> int:
+    return int.from_bytes(_b64url_decode(segment), 'big')
+
+
+def _fetch_jwks():
+    global _jwks, _jwks_fetched_at
+    with urllib.request.urlopen(f"{issuer()}/.well-known/jwks.json", timeout=JWKS_TIMEOUT_SECONDS) as response:
+        keys = json.loads(response.read())['keys']
+    _jwks = {key['kid']: (_b64url_int(key['n']), _b64url_int(key['e']))
+             for key in keys if key.get('kty') == 'RSA'}
+    _jwks_fetched_at = time.time()
+    print(f"Fetched JWKS of {USER_POOL_ID}: {len(_jwks)} keys")
+
+
+def prefetch_jwks():
+    """Fetch the JWKS ahead of the first request (warm-up invocations)"""
+    if not _jwks:
+        _fetch_jwks()
+
+
+def get_public_key(kid: str) -> tuple:
+    """(modulus, exponent) of a signing key, refetching the JWKS for unknown key IDs"""
+    if kid not in _jwks and time.time() - _jwks_fetched_at >= JWKS_REFRESH_SECONDS:
+        try:
+            _fetch_jwks()
+        except Exception as e:
+            raise AuthError(f"JWKS unavailable: {e}")
+    if kid not in _jwks:
+        raise AuthError('Unknown signing key')
+    return _jwks[kid]
+
+
+def rsa_sha256_verify(public_key: tuple, message: bytes, signature: bytes) -> bool:
+    """Verify an RSASSA-PKCS1-v1_5 SHA-256 signature"""
+    modulus, exponent = public_key
+    size = (modulus.bit_length() + 7) // 8
+    signature_int = int.from_bytes(signature, 'big')
+    if len(signature) != size or signature_int >= modulus:
+        return False
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    # Compare the whole encoded block instead of parsing it
+    expected = b'\x00\x01' + b'\xff' * (size - len(digest_info) - 3) + b'\x00' + digest_info
+    return hmac.compare_digest(pow(signature_int, exponent, modulus).to_bytes(size, 'big'), expected)
+
+
+def verify_token(token: str, token_use: str = None) -> dict:
+    """
+    Verify a Cognito JWT and return its claims
+
+    Checks the RS256 signature, issuer, validity period (exp, iat, nbf),
+    token_use and the app client (aud of ID tokens, client_id of access
+    tokens).
+
+    Args:
+        token_use: 'id' or 'access' to accept only that kind (default: both)
+
+    Raises:
+        AuthError: If the token is invalid
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.split('.')
+        header = json.loads(_b64url_decode(header_segment))
+        claims = json.loads(_b64url_decode(payload_segment))
+        signature = _b64url_decode(signature_segment)
+    except (ValueError, AttributeError):
+        raise AuthError('Malformed token')
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise AuthError('Malformed token')
+
+    if header.get('alg') != 'RS256':
+        raise AuthError('Unsupported token algorithm')
+    if not isinstance(header.get('kid'), str):
+        raise AuthError('Malformed token')
+    public_key = get_public_key(header['kid'])
+    if not rsa_sha256_verify(public_key, f"{header_segment}.{payload_segment}".encode('ascii'), signature):
+        raise AuthError('Invalid token signature')
+
+    if claims.get('iss') != issuer():
+        raise AuthError('Token issued by another user pool')
+    now = time.time()
+    if not isinstance(claims.get('exp'), (int, float)) or claims['exp'] + CLOCK_SKEW_SECONDS < now:
+        raise AuthError('Token expired')
+    for claim in ('iat', 'nbf'):
+        if claim in claims and (not isinstance(claims[claim], (int, float))
+                                or claims[claim] - CLOCK_SKEW_SECONDS > now):
+            raise AuthError('Token not yet valid')
+    if claims.get('token_use') not in ((token_use,) if token_use else TOKEN_USES):
+        raise AuthError('Wrong token type')
+    audience = claims.get('aud') if claims['token_use'] == 'id' else claims.get('client_id')
+    if audience != CLIENT_ID:
+        raise AuthError('Token issued to another app client')
+    if not claims.get('sub'):
+        raise AuthError('Token has no subject')
+    return claims
+
+
+def authenticate(event: dict) -> dict:
+    """
+    Claims of the bearer token in the Authorization header of an API
+    Gateway event
+
+    Raises:
+        AuthError: If the header is missing or the token is invalid
+    """
+    request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    authorization = request_headers.get('authorization') or ''
+    token = authorization[7:] if authorization[:7].lower() == 'bearer ' else authorization
+    if not token:
+        raise AuthError('Authorization header is required')
+    return verify_token(token.strip())
+
+
+def in_group(claims: dict, group: str) -> bool:
+    """Whether verified token claims list the user in a user pool group"""
+    groups = claims.get('cognito:groups')
+    return isinstance(groups, list) and group in groups
@@ -0,0 +1,77 @@
+"""
+EleKnowledge-AI Shared Layer
+Source document references and lazily signed download URLs
+
+URLs are reused within fixed signing windows of URL_CACHE_SECONDS: a URL
+signed in a window stays valid at least 10 minutes past its end. Cached
+responses that embed URLs put signing_window() into their ETag, so a
+revalidation in a later window gets fresh links instead of a 304.
+"""
+import time
+
+# Presigned URL settings
+PRESIGNED_URL_EXPIRES = 3600  # 1 hour
+URL_CACHE_SECONDS = 3000  # Signing window: a URL is reused only within the window it was signed in
+URL_CACHE_MAX_ENTRIES = 1000
+
+# Per-container cache: {(bucket, key): (signed_url, signing window)}
+_url_cache = {}
+
+
+def document_key_from_uri(doc_uri: str, bucket: str) -> str:
+    """
+    Convert a Knowledge Base source URI (s3://bucket/key) to an S3 key
+
+    Returns:
+        str: Object key, or None if the URI is not in the given bucket
+    """
+    prefix = f"s3://{bucket}/"
+    if not bucket or not doc_uri.startswith(prefix):
+        return None
+    return doc_uri[len(prefix):]
+
+
+def signing_window(now: float = None) -> int:
+    """Index of the current URL signing window"""
+    return int((time.time() if now is None else now) // URL_CACHE_SECONDS)
+
+
+def sign_document_key(s3_client, bucket: str, key: str) -> str:
+    """Generate (or reuse, within the current signing window) a presigned GET URL for a document"""
+    cache_key = (bucket, key)
+    window = signing_window()
+
+    cached = _url_cache.get(cache_key)
+    if cached and cached[1] == window:
+        return cached[0]
+
+    signed_url = s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key},
+        ExpiresIn=PRESIGNED_URL_EXPIRES
+    )
+
+    if len(_url_cache) >= URL_CACHE_MAX_ENTRIES:
+        _url_cache.clear()
+    _url_cache[cache_key] = (signed_url, window)
+    return signed_url
+
+
+def sign_source_documents(s3_client, bucket: str, source_documents: list) -> list:
+    """
+    Add a signed 'sourceUri' to stored source documents for API responses
+
+    Documents stored before keys were introduced already carry a
+    'sourceUri' and are returned unchanged.
+    """
+    signed_documents = []
+    for doc in source_documents or []:
+        doc = dict(doc)
+        key = doc.get('documentKey')
+        if key and bucket:
+            try:
+                doc['sourceUri'] = sign_document_key(s3_client, bucket, key)
+            except Exception as e:
+                print(f"Error generating signed URL: {e}")
+        signed_documents.append(doc)
+    return signed_documents
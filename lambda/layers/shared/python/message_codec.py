@@ -0,0 +1,83 @@
+"""
+EleKnowledge-AI Shared Layer
+Transparent compression of large chat message attributes in DynamoDB
+
+Encoded items carry a version marker per attribute:
+- content:         Binary (zlib of UTF-8 text),  contentEncoding = 'zlib-v1'
+- sourceDocuments: Binary (zlib of JSON),        sourceDocumentsEncoding = 'zlib-json-v1'
+"""
+import json
+import zlib
+from decimal import Decimal
+
+# Encoding settings
+COMPRESSION_THRESHOLD_BYTES = 1024  # Smaller values gain little after Binary overhead
+COMPRESSION_LEVEL = 6
+CONTENT_ENCODING = 'zlib-v1'
+SOURCE_DOCUMENTS_ENCODING = 'zlib-json-v1'
+
+
+def _to_bytes(value) -> bytes:
+    """Accept bytes or boto3 Binary (resource API / stream deserializer)"""
+    return bytes(value.value) if hasattr(value, 'value') else bytes(value)
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_message_item(item: dict, compress_source_documents: bool = True) -> dict:
+    """
+    Compress large attributes of a message item before put_item
+
+    Returns:
+        dict: New item (the input item is not modified)
+    """
+    encoded = dict(item)
+
+    content = item.get('content')
+    if isinstance(content, str):
+        raw = content.encode('utf-8')
+        if len(raw) > COMPRESSION_THRESHOLD_BYTES:
+            compressed = zlib.compress(raw, COMPRESSION_LEVEL)
+            if len(compressed) < len(raw):
+                encoded['content'] = compressed
+                encoded['contentEncoding'] = CONTENT_ENCODING
+
+    source_documents = item.get('sourceDocuments')
+    if compress_source_documents and isinstance(source_documents, list):
+        raw = json.dumps(source_documents, default=_json_default, ensure_ascii=False).encode('utf-8')
+        if len(raw) > COMPRESSION_THRESHOLD_BYTES:
+            encoded['sourceDocuments'] = zlib.compress(raw, COMPRESSION_LEVEL)
+            encoded['sourceDocumentsEncoding'] = SOURCE_DOCUMENTS_ENCODING
+
+    return encoded
+
+
+def decode_message_item(item: dict) -> dict:
+    """
+    Restore compressed attributes of a message item (in place)
+
+    Items without encoding markers are returned unchanged.
+    """
+    encoding = item.pop('contentEncoding', None)
+    if encoding and 'content' in item:
+        if encoding != CONTENT_ENCODING:
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+        item['content'] = zlib.decompress(_to_bytes(item['content'])).decode('utf-8')
+
+    encoding = item.pop('sourceDocumentsEncoding', None)
+    if encoding and 'sourceDocuments' in item:
+        if encoding != SOURCE_DOCUMENTS_ENCODING:
+            raise ValueError(f"Unsupported sourceDocuments encoding: {encoding}")
+        raw = zlib.decompress(_to_bytes(item['sourceDocuments']))
+        item['sourceDocuments'] = json.loads(raw, parse_float=Decimal)
+
+    return item
+
+
+def is_encoded(item: dict) -> bool:
+    """True if any attribute of the item is stored compressed"""
+    return 'contentEncoding' in item or 'sourceDocumentsEncoding' in item
@@ -0,0 +1,329 @@
+"""
+EleKnowledge-AI Shared Layer
+Request-scoped tracing of API handlers and the AWS calls they make
+
+- traced(handler): wraps a lambda_handler. The request ID comes from the
+  X-Request-Id header or the API Gateway request ID, and is returned in
+  the X-Request-Id response header so users can quote it.
+- instrument(*clients): opens a span around every API call of boto3
+  clients / resources through botocore's before-parameter-build /
+  after-call / after-call-error events (operation, table / bucket / model,
+  HTTP status, error code, retries, AWS request ID). Presigned URLs are
+  signed locally and get no span.
+- annotate(key, value): attaches e.g. the user or session to the trace.
+
+A trace is exported once per request by TRACE_EXPORTER:
+- stdout (default): one JSON line in the function log, searchable with
+  CloudWatch Logs Insights (filter requestId = '...')
+- xray: segment documents to the X-Ray daemon (Lambda active tracing),
+  nested under the function's segment; annotations are searchable
+- otlp: OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT (e.g. a collector
+  extension on localhost:4318)
+- none
+
+The current trace is a context variable, so concurrent invocations in one
+process (the local load test) are kept apart. Exporting never fails a request.
+"""
+import contextvars
+import functools
+import json
+import os
+import re
+import secrets
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+
+# Environment variables
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'stdout')
+OTLP_ENDPOINT = os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318')
+XRAY_DAEMON_ADDRESS = os.environ.get('AWS_XRAY_DAEMON_ADDRESS', '127.0.0.1:2000')
+SERVICE_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'eleknowledge-local')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Tracing settings
+REQUEST_ID_HEADER = 'X-Request-Id'
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._:-]{1,128}')
+MAX_SPANS = 500
+# API parameter: span attribute
+SPAN_PARAMETERS = {'TableName': 'table', 'Bucket': 'bucket', 'modelId': 'model', 'knowledgeBaseId': 'knowledgeBase'}
+OTLP_TIMEOUT_SECONDS = 2
+
+# Current trace: {'requestId', 'traceId', 'name', 'start', 'annotations', 'spans', 'dropped'}
+_trace = contextvars.ContextVar('eleknowledge_trace', default=None)
+_lock = threading.Lock()
+
+
+def _request_id(event: dict, context) -> str:
+    """X-Request-Id header (if well-formed), else the API Gateway or Lambda request ID"""
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    header_value = (headers.get(REQUEST_ID_HEADER.lower()) or '').strip()
+    if REQUEST_ID_PATTERN.fullmatch(header_value):
+        return header_value
+    return ((event.get('requestContext') or {}).get('requestId')
+            or getattr(context, 'aws_request_id', None)
+            or str(uuid.uuid4()))
+
+
+def _xray_trace_header() -> dict:
+    """Root / Parent / Sampled of Lambda's X-Ray trace (active tracing only)"""
+    header = os.environ.get('_X_AMZN_TRACE_ID', '')
+    return dict(part.split('=', 1) for part in header.split(';') if '=' in part)
+
+
+def current_request_id() -> str:
+    trace = _trace.get()
+    return trace['requestId'] if trace else None
+
+
+def annotate(key: str, value):
+    """Attach a searchable attribute (user, session, ...) to the current trace"""
+    trace = _trace.get()
+    if trace is not None:
+        trace['annotations'][key] = value
+
+
+def _start_span(params, model, context, **kwargs):
+    trace = _trace.get()
+    # generate_presigned_url builds the request but never sends it (no after-call)
+    if trace is None or context.get('is_presign_request'):
+        return
+    span = {
+        'id': secrets.token_hex(8),
+        'name': f"{model.service_model.service_id.hyphenize()}.{model.name}",
+        'start': time.time(),
+        'end': None,
+        'attributes': {attribute: params[name] for name, attribute in SPAN_PARAMETERS.items() if name in params}
+    }
+    with _lock:
+        if len(trace['spans']) < MAX_SPANS:
+            trace['spans'].append(span)
+            # Request context of the call, passed on to after-call
+            context['trace_span'] = span
+        else:
+            trace['dropped'] += 1
+
+
+def _end_span(http_response, parsed, context, **kwargs):
+    span = context.get('trace_span')
+    if not span:
+        return
+    span['end'] = time.time()
+    metadata = (parsed or {}).get('ResponseMetadata', {})
+    span['attributes'].update({
+        'httpStatus': getattr(http_response, 'status_code', None),
+        'awsRequestId': metadata.get('RequestId'),
+        'retries': metadata.get('RetryAttempts', 0)
+    })
+    error_code = (parsed or {}).get('Error', {}).get('Code')
+    if error_code:
+        span['attributes']['error'] = error_code
+
+
+def _fail_span(exception, context, **kwargs):
+    span = context.get('trace_span')
+    if not span:
+        return
+    # No response: connection error, timeout, ... (retries exhausted)
+    span['end'] = time.time()
+    span['attributes']['error'] = type(exception).__name__
+
+
+def instrument(*clients):
+    """Trace every API call of boto3 clients or resources"""
+    for client in clients:
+        client = getattr(client.meta, 'client', client)
+        client.meta.events.register('before-parameter-build', _start_span, unique_id='eleknowledge-trace-start')
+        client.meta.events.register('after-call', _end_span, unique_id='eleknowledge-trace-end')
+        client.meta.events.register('after-call-error', _fail_span, unique_id='eleknowledge-trace-fail')
+
+
+def _start(event: dict, context) -> dict:
+    xray = _xray_trace_header()
+    trace = {
+        'requestId': _request_id(event, context),
+        'traceId': xray.get('Root') or f"1-{int(time.time()):08x}-{secrets.token_hex(12)}",
+        'parentId': xray.get('Parent'),
+        'sampled': xray.get('Sampled', '1') == '1',
+        'name': f"{event.get('httpMethod') or 'invoke'} {event.get('resource') or event.get('path') or ''}".strip(),
+        'id': secrets.token_hex(8),
+        'start': time.time(),
+        'annotations': {},
+        'spans': [],
+        'dropped': 0
+    }
+    _trace.set(trace)
+    return trace
+
+
+def _finish(trace: dict, status_code) -> dict:
+    _trace.set(None)
+    trace['end'] = time.time()
+    trace['statusCode'] = status_code
+    for span in trace['spans']:
+        # Never sent (e.g. parameter validation failed): not a fault of the call
+        if span['end'] is None:
+            span['end'] = trace['end']
+            span['attributes']['incomplete'] = True
+    return trace
+
+
+def _ms(start: float, end: float) -> float:
+    return round((end - start) * 1000, 1)
+
+
+def export_stdout(trace: dict):
+    print(json.dumps({
+        'trace': trace['name'],
+        'requestId': trace['requestId'],
+        'traceId': trace['traceId'],
+        'statusCode': trace['statusCode'],
+        'durationMs': _ms(trace['start'], trace['end']),
+        'annotations': trace['annotations'],
+        'spans': [{'name': span['name'], 'offsetMs': _ms(trace['start'], span['start']),
+                   'durationMs': _ms(span['start'], span['end']), **span['attributes']}
+                  for span in trace['spans']],
+        'droppedSpans': trace['dropped']
+    }, default=str, ensure_ascii=False))
+
+
+def _is_client_error(span: dict) -> bool:
+    return 400 <= (span['attributes'].get('httpStatus') or 0) < 500
+
+
+def export_xray(trace: dict):
+    """Send the request and its calls as subsegments of the function segment (UDP, fire and forget)"""
+    if not trace['sampled']:
+        return
+    host, port = XRAY_DAEMON_ADDRESS.rsplit(':', 1)
+    root = {
+        'name': trace['name'] or 'handler',
+        'id': trace['id'],
+        'trace_id': trace['traceId'],
+        'start_time': trace['start'],
+        'end_time': trace['end'],
+        # Annotations are indexed for search; values must be strings, numbers or booleans
+        'annotations': {re.sub(r'\W', '_', k): v for k, v in {
+            'request_id': trace['requestId'], 'status_code': trace['statusCode'], **trace['annotations']
+        }.items() if isinstance(v, (str, int, float, bool))},
+        'fault': bool(trace['statusCode'] and trace['statusCode'] >= 500),
+        'error': bool(trace['statusCode'] and 400 <= trace['statusCode'] < 500)
+    }
+    if trace['parentId']:
+        root.update({'type': 'subsegment', 'parent_id': trace['parentId']})
+    documents = [root] + [{
+        'name': span['name'],
+        'id': span['id'],
+        'trace_id': trace['traceId'],
+        'parent_id': trace['id'],
+        'type': 'subsegment',
+        'namespace': 'aws',
+        'start_time': span['start'],
+        'end_time': span['end'],
+        'aws': {'operation': span['name'].split('.', 1)[1], 'region': AWS_REGION,
+                'request_id': span['attributes'].get('awsRequestId'),
+                'table_name': span['attributes'].get('table'),
+                'retries': span['attributes'].get('retries')},
+        'http': {'response': {'status': span['attributes'].get('httpStatus')}},
+        # error: 4xx answer of the service, fault: 5xx or no answer at all
+        'error': 'error' in span['attributes'] and _is_client_error(span),
+        'fault': 'error' in span['attributes'] and not _is_client_error(span)
+    } for span in trace['spans']]
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for document in documents:
+            payload = '{"format": "json", "version": 1}\n' + json.dumps(document, default=str)
+            sock.sendto(payload.encode('utf-8'), (host, int(port)))
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{'key': key, 'value': {'intValue': str(value)} if isinstance(value, int) and not isinstance(value, bool)
+             else {'stringValue': str(value)}}
+            for key, value in attributes.items() if value is not None]
+
+
+def export_otlp(trace: dict):
+    """POST the trace as OTLP/HTTP JSON"""
+    trace_id = trace['traceId'].replace('1-', '', 1).replace('-', '')[:32].rjust(32, '0')
+
+    def span_document(span_id, parent_id, name, kind, start, end, attributes, error):
+        document = {
+            'traceId': trace_id,
+            'spanId': span_id,
+            'name': name,
+            'kind': kind,
+            'startTimeUnixNano': str(int(start * 1e9)),
+            'endTimeUnixNano': str(int(end * 1e9)),
+            'attributes': _otlp_attributes(attributes),
+            'status': {'code': 2 if error else 1}
+        }
+        if parent_id:
+            document['parentSpanId'] = parent_id
+        return document
+
+    status_code = trace['statusCode']
+    spans = [span_document(trace['id'], None, trace['name'] or 'handler', 2, trace['start'], trace['end'],
+                           {'request.id': trace['requestId'], 'http.response.status_code': status_code,
+                            **trace['annotations']},
+                           bool(status_code and status_code >= 500))]
+    spans += [span_document(span['id'], trace['id'], span['name'], 3, span['start'], span['end'],
+                            {f"aws.{key}": value for key, value in span['attributes'].items()},
+                            'error' in span['attributes'])
+              for span in trace['spans']]
+
+    body = json.dumps({'resourceSpans': [{
+        'resource': {'attributes': _otlp_attributes({'service.name': SERVICE_NAME, 'cloud.region': AWS_REGION})},
+        'scopeSpans': [{'scope': {'name': 'eleknowledge.tracing'}, 'spans': spans}]
+    }]}).encode('utf-8')
+    request = urllib.request.Request(f"{OTLP_ENDPOINT.rstrip('/')}/v1/traces", data=body,
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=OTLP_TIMEOUT_SECONDS) as response:
+        response.read()
+
+
+EXPORTERS = {
+    'stdout': export_stdout,
+    'xray': export_xray,
+    'otlp': export_otlp,
+    'none': None
+}
+
+
+def export(trace: dict):
+    exporter = EXPORTERS.get(TRACE_EXPORTER, export_stdout)
+    if not exporter:
+        return
+    try:
+        exporter(trace)
+    except Exception as e:
+        print(f"Trace export failed ({TRACE_EXPORTER}): {e}")
+
+
+def with_request_id(response, request_id: str):
+    """Add X-Request-Id (readable by the browser) to an API Gateway proxy response"""
+    if not isinstance(response, dict) or 'statusCode' not in response:
+        return response
+    headers = dict(response.get('headers') or {})
+    headers[REQUEST_ID_HEADER] = request_id
+    exposed = [h.strip() for h in headers.get('Access-Control-Expose-Headers', '').split(',') if h.strip()]
+    if REQUEST_ID_HEADER not in exposed:
+        headers['Access-Control-Expose-Headers'] = ','.join(exposed + [REQUEST_ID_HEADER])
+    return {**response, 'headers': headers}
+
+
+def traced(handler):
+    """Trace a lambda_handler: one trace per invocation, request ID in the response"""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        trace = _start(event if isinstance(event, dict) else {}, context)
+        request_id = trace['requestId']
+        response = None
+        try:
+            response = handler(event, context)
+            return with_request_id(response, request_id)
+        finally:
+            status_code = response.get('statusCode') if isinstance(response, dict) else None
+            export(_finish(trace, status_code))
+    return wrapper
@@ -0,0 +1,157 @@
+"""
+EleKnowledge-AI Warm-up Layer
+Warm-up invocations of the API functions (shared by the phase 1 auth and
+phase 2 RAG / chat stacks, each publishing its own copy of this layer)
+
+warmable(targets) wraps a handler. A warm-up event ({"warmup": true} from
+the function's schedule, or a plain EventBridge scheduled event) does what
+the first real request of a container would otherwise pay for, then
+returns without running the handler:
+- one cheap call per AWS endpoint (a read of a key that does not exist,
+  a URL presign, ...), which resolves credentials and endpoints, loads
+  the operation models and leaves a pooled TLS connection open
+- for services where every call is billed or would be logged as a failed
+  call (Bedrock Retrieve, InvokeModel), only prepare_client: the operation
+  models are loaded, the connection opens with the first request
+- handler caches, e.g. the Cognito JWKS
+
+Targets run in parallel; an error response of the service still counts as
+warmed (the request reached the endpoint). With provisioned concurrency the
+same warm-up runs during init (AWS_LAMBDA_INITIALIZATION_TYPE), before the
+container takes traffic. A schedule only reaches one container per tick.
+
+Metrics (CloudWatch embedded metric format, dimension Function):
+- WarmupMs, WarmupErrors per Trigger (schedule, init)
+- RequestMs of API requests per ContainerState:
+  cold (first request, never warmed), warmed (last invocation was a warm-up),
+  idle (nothing for IDLE_SECONDS, pooled connections likely closed), warm
+Comparing RequestMs of cold / idle with warmed shows what the warm-up saves.
+"""
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+# Environment variables
+FUNCTION_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+INITIALIZATION_TYPE = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE', 'on-demand')
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'EleKnowledge-AI/Lambda')
+
+# Warm-up settings
+WARMUP_EVENT_KEY = 'warmup'
+IDLE_SECONDS = 60
+
+# Per-container state
+_last_invocation_at = None
+_last_invocation_was_warmup = False
+
+
+def is_warmup_event(event) -> bool:
+    if not isinstance(event, dict):
+        return False
+    return bool(event.get(WARMUP_EVENT_KEY)) or event.get('detail-type') == 'Scheduled Event'
+
+
+def emit_metrics(metrics: dict, dimensions: dict, properties: dict = None):
+    """Print one embedded metric format record: {name: (value, unit)}"""
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, (value, unit) in metrics.items()]
+            }]
+        },
+        **dimensions,
+        **{name: value for name, (value, unit) in metrics.items()},
+        **(properties or {})
+    }, default=str))
+
+
+def prepare_client(client, *operation_names):
+    """Load a client's operation models (input and output shapes) without calling the service"""
+    service_model = client.meta.service_model
+    for operation_name in operation_names:
+        operation_model = service_model.operation_model(operation_name)
+        for shape in (operation_model.input_shape, operation_model.output_shape):
+            if shape is not None:
+                shape.members
+
+
+def _run_target(call) -> dict:
+    start = time.perf_counter()
+    result = {}
+    try:
+        call()
+    except ClientError as e:
+        # Reached the endpoint: the connection is pooled all the same
+        result['response'] = e.response['Error']['Code']
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def warm_up(targets: dict, trigger: str = 'schedule') -> dict:
+    """Run every warm-up call ({name: callable}) in parallel and record the cost"""
+    global _last_invocation_at, _last_invocation_was_warmup
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(len(targets), 1)) as executor:
+        results = dict(zip(targets, executor.map(_run_target, targets.values())))
+    duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    errors = sum(1 for result in results.values() if 'error' in result)
+
+    _last_invocation_at = time.time()
+    _last_invocation_was_warmup = True
+    emit_metrics({'WarmupMs': (duration_ms, 'Milliseconds'), 'WarmupErrors': (errors, 'Count')},
+                 {'Function': FUNCTION_NAME, 'Trigger': trigger},
+                 {'targets': results})
+    return {'warmup': True, 'trigger': trigger, 'durationMs': duration_ms, 'targets': results}
+
+
+def _container_state(now: float) -> str:
+    if _last_invocation_at is None:
+        return 'cold'
+    if now - _last_invocation_at > IDLE_SECONDS:
+        return 'idle'
+    return 'warmed' if _last_invocation_was_warmup else 'warm'
+
+
+def warmable(targets: dict):
+    """
+    Answer warm-up events of a handler with warm_up(targets)
+
+    The handler's last two arguments are (event, context), so both
+    lambda_handler(event, context) and handle(operation, event, context)
+    can be wrapped. Decorating a handler during provisioned concurrency
+    init warms up the container right away.
+    """
+    if INITIALIZATION_TYPE == 'provisioned-concurrency':
+        warm_up(targets, 'init')
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            global _last_invocation_at, _last_invocation_was_warmup
+            event = args[-2]
+            if is_warmup_event(event):
+                return warm_up(targets)
+
+            start = time.time()
+            state = _container_state(start)
+            idle_seconds = round(start - _last_invocation_at) if _last_invocation_at else None
+            try:
+                return handler(*args)
+            finally:
+                _last_invocation_at = time.time()
+                _last_invocation_was_warmup = False
+                # API requests only (not async jobs), the latency users see
+                if isinstance(event, dict) and event.get('httpMethod'):
+                    emit_metrics({'RequestMs': (round((_last_invocation_at - start) * 1000, 1), 'Milliseconds')},
+                                 {'Function': FUNCTION_NAME, 'ContainerState': state},
+                                 {'idleSeconds': idle_seconds})
+        return wrapper
+    return decorator
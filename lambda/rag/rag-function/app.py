@@ -6,9 +6,15 @@ import json
 import os
 import boto3
 import time
+import uuid
 from datetime import datetime
 from decimal import Decimal
 from botocore.exceptions import ClientError
+from auth_tokens import AuthError, authenticate, prefetch_jwks
+from document_links import document_key_from_uri, sign_source_documents
+from message_codec import encode_message_item, decode_message_item
+from tracing import annotate, instrument, traced
+from warmup import prepare_client, warmable
 
 
 # Environment variables
@@ -17,19 +23,54 @@ BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID')
 CHATLOGS_TABLE_NAME = os.environ.get('DYNAMODB_CHATLOGS_TABLE')
 DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+# USD per million tokens of BEDROCK_MODEL_ID, e.g. '{"input": 3, "output": 15, "cacheRead": 0.3, "cacheWrite": 3.75}'
+BEDROCK_PRICING = json.loads(os.environ.get('BEDROCK_PRICING') or '{}')
 
 # Initialize AWS clients with region from environment
 bedrock_agent = boto3.client('bedrock-agent-runtime', region_name=AWS_REGION)
 bedrock_runtime = boto3.client('bedrock-runtime', region_name=AWS_REGION)
 dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+s3_client = boto3.client('s3', region_name=AWS_REGION)
+
+# Span per AWS call, grouped by request ID (see tracing)
+instrument(bedrock_agent, bedrock_runtime, dynamodb, s3_client)
 
 # DynamoDB table
 chatlogs_table = dynamodb.Table(CHATLOGS_TABLE_NAME)
 
+# Version items for conditional GET in chat-management (ETag)
+# - {sessionId: <session>, messageId: '#meta'}: per-session message list version
+# - {sessionId: 'user#<userId>', messageId: '#meta'}: per-user session list version
+MESSAGE_ID_PREFIX = 'msg_'
+SESSION_ID_PREFIX = 'session_'
+META_MESSAGE_ID = '#meta'
+USER_META_PREFIX = 'user#'
+
+# Claude Sonnet 4 on-demand pricing (USD per million tokens), overridden by BEDROCK_PRICING
+DEFAULT_PRICING = {'input': 3.0, 'output': 15.0, 'cacheRead': 0.3, 'cacheWrite': 3.75}
+
+# Warm-up calls, one per endpoint (see warmup): a read of an item that does not
+# exist and a presign
+WARMUP_SESSION_ID = '#warmup'
+WARMUP_TARGETS = {
+    'dynamodb': lambda: chatlogs_table.get_item(Key={'sessionId': WARMUP_SESSION_ID, 'messageId': META_MESSAGE_ID}),
+    # Every Retrieve / InvokeModel is billed or fails: prepare the clients only (no call)
+    'bedrock-agent-runtime': lambda: prepare_client(bedrock_agent, 'Retrieve'),
+    'bedrock-runtime': lambda: prepare_client(bedrock_runtime, 'InvokeModel'),
+    's3': lambda: s3_client.generate_presigned_url('get_object', Params={'Bucket': DOCUMENTS_BUCKET, 'Key': 'warmup'},
+                                                   ExpiresIn=60),
+    'jwks': prefetch_jwks
+}
+
 
 def generate_message_id():
-    """Generate unique message ID using timestamp"""
-    return f"msg_{int(time.time() * 1000)}"
+    """
+    Generate unique message ID using timestamp
+
+    The random part keeps messages saved in the same millisecond from
+    overwriting each other; the timestamp keeps them in order.
+    """
+    return f"{MESSAGE_ID_PREFIX}{int(time.time() * 1000)}_{uuid.uuid4().hex[:12]}"
 
 
 def generate_session_title(query: str) -> str:
@@ -42,7 +83,7 @@ def generate_session_title(query: str) -> str:
 
 
 def save_message_to_dynamodb(session_id: str, user_id: str, role: str, content: str, 
-                             citations: list = None, source_documents: list = None):
+                             citations: list = None, source_documents: list = None, usage: dict = None):
     """Save message to DynamoDB with TTL"""
     message_id = generate_message_id()
     ttl_timestamp = int(time.time()) + (30 * 24 * 60 * 60)  # 30 days
@@ -53,6 +94,8 @@ def save_message_to_dynamodb(session_id: str, user_id: str, role: str, content:
         'userId': user_id,
         'role': role,
         'content': content,
+        # GSI（userId-timestamp-index）に射影するセッション一覧用の短いタイトル
+        'title': generate_session_title(content),
         'timestamp': datetime.now().isoformat(),
         'ttl': ttl_timestamp
     }
@@ -63,10 +106,53 @@ def save_message_to_dynamodb(session_id: str, user_id: str, role: str, content:
     if source_documents:
         item['sourceDocuments'] = source_documents
     
-    chatlogs_table.put_item(Item=item)
+    if usage:
+        item['usage'] = usage
+    
+    # Large content / sourceDocuments are stored compressed (see message_codec)
+    chatlogs_table.put_item(Item=encode_message_item(item))
     return message_id
 
 
+def touch_version_items(session_id: str, user_id: str, message_count: int):
+    """
+    Bump session / user version items after new messages are stored
+    
+    chat-management answers If-None-Match from these items, so a stale
+    version must never survive a failed update: on error the items are
+    removed, which disables 304 responses until the next successful write.
+    """
+    ttl_timestamp = int(time.time()) + (30 * 24 * 60 * 60)  # 30 days
+    session_key = {'sessionId': session_id, 'messageId': META_MESSAGE_ID}
+    user_key = {'sessionId': f"{USER_META_PREFIX}{user_id}", 'messageId': META_MESSAGE_ID}
+    
+    try:
+        chatlogs_table.update_item(
+            Key=session_key,
+            UpdateExpression='SET lastMessageTime = :now, #ttl = :ttl ADD messageCount :count, version :one',
+            ExpressionAttributeNames={'#ttl': 'ttl'},
+            ExpressionAttributeValues={
+                ':now': datetime.now().isoformat(),
+                ':ttl': ttl_timestamp,
+                ':count': message_count,
+                ':one': 1
+            }
+        )
+        chatlogs_table.update_item(
+            Key=user_key,
+            UpdateExpression='SET #ttl = :ttl ADD version :one',
+            ExpressionAttributeNames={'#ttl': 'ttl'},
+            ExpressionAttributeValues={':ttl': ttl_timestamp, ':one': 1}
+        )
+    except ClientError as e:
+        print(f"Error updating version items: {e}")
+        for key in (session_key, user_key):
+            try:
+                chatlogs_table.delete_item(Key=key)
+            except ClientError as delete_error:
+                print(f"Error removing version item: {delete_error}")
+
+
 def query_knowledge_base(query: str, filters: dict = None) -> dict:
     """
     Query Knowledge Base with optional metadata filters
@@ -131,7 +217,7 @@ def query_knowledge_base(query: str, filters: dict = None) -> dict:
         raise
 
 
-def generate_response_with_claude(query: str, kb_results: dict, chat_history: list = None) -> str:
+def generate_response_with_claude(query: str, kb_results: dict, chat_history: list = None) -> tuple:
     """
     Generate response using Claude 4 with Knowledge Base results
     
@@ -141,7 +227,7 @@ def generate_response_with_claude(query: str, kb_results: dict, chat_history: li
         chat_history: Previous conversation history
     
     Returns:
-        str: Generated response
+        tuple: (generated response, Bedrock usage block)
     """
     try:
         # Extract search results
@@ -204,7 +290,7 @@ def generate_response_with_claude(query: str, kb_results: dict, chat_history: li
         response_body = json.loads(response['body'].read())
         assistant_message = response_body['content'][0]['text']
         
-        return assistant_message
+        return assistant_message, response_body.get('usage', {})
         
     except ClientError as e:
         print(f"Claude 4 generation error: {e}")
@@ -215,59 +301,124 @@ def extract_citations(kb_results: dict) -> tuple:
     """
     Extract citations and source documents from KB results
     
+    Source documents are deduplicated per document (highest score wins)
+    and store only the S3 key; download URLs are signed when read
+    (see document_links.sign_source_documents).
+    
     Returns:
         tuple: (citations list, source documents list)
     """
     citations = []
-    source_documents = []
-    s3_client = boto3.client('s3', region_name=AWS_REGION)
+    documents_by_ref = {}
     
     for result in kb_results.get('retrievalResults', [])[:10]:
         metadata = result.get('metadata', {})
         doc_uri = metadata.get('x-amz-bedrock-kb-source-uri', '')
         
-        if doc_uri:
-            doc_name = doc_uri.split('/')[-1]
-            citations.append(doc_name)
-            
-            # S3 URIをHTTPS署名付きURLに変換
-            signed_url = doc_uri
-            try:
-                if DOCUMENTS_BUCKET and doc_uri.startswith('s3://'):
-                    key = doc_uri.replace(f's3://{DOCUMENTS_BUCKET}/', '')
-                    signed_url = s3_client.generate_presigned_url(
-                        'get_object',
-                        Params={'Bucket': DOCUMENTS_BUCKET, 'Key': key},
-                        ExpiresIn=2592000  # 30日間（秒）
-                    )
-            except Exception as e:
-                print(f"Error generating signed URL: {e}")
-            
-            source_doc = {
-                'documentName': doc_name,
-                'title': metadata.get('title'),  # メタデータからtitleを取得
-                'sourceUri': signed_url,
-                'documentType': metadata.get('document', 'unknown'),  # document-type → document に修正
-                'product': metadata.get('product', ''),
-                'model': metadata.get('model', ''),
-                'relevance': Decimal(str(result.get('score', 0.0)))
-            }
-            source_documents.append(source_doc)
+        if not doc_uri:
+            continue
+        
+        relevance = Decimal(str(result.get('score', 0.0)))
+        
+        # 同一文書の複数チャンクは1件にまとめ、最大スコアを採用
+        existing = documents_by_ref.get(doc_uri)
+        if existing:
+            existing['relevance'] = max(existing['relevance'], relevance)
+            continue
+        
+        doc_name = doc_uri.split('/')[-1]
+        citations.append(doc_name)
+        
+        source_doc = {
+            'documentName': doc_name,
+            'documentType': metadata.get('document', 'unknown'),  # document-type → document に修正
+            'relevance': relevance
+        }
+        
+        # 署名付きURLではなくS3キーのみ保存（URLは読み取り時に署名）
+        document_key = document_key_from_uri(doc_uri, DOCUMENTS_BUCKET)
+        if document_key:
+            source_doc['documentKey'] = document_key
+        else:
+            source_doc['sourceUri'] = doc_uri
+        
+        # 空の属性は保存しない（アイテムサイズ削減）
+        for attribute, metadata_key in (('title', 'title'), ('product', 'product'), ('model', 'model')):
+            if metadata.get(metadata_key):
+                source_doc[attribute] = metadata[metadata_key]
+        
+        documents_by_ref[doc_uri] = source_doc
+    
+    return citations, list(documents_by_ref.values())
+
+
+def build_usage(bedrock_usage: dict, timings: dict, filters: dict = None) -> dict:
+    """
+    Token counts, estimated cost and stage timings of one answer
+    (stored on the assistant message, rolled up by chatlog-aggregator)
+    
+    Args:
+        bedrock_usage: 'usage' block of the Anthropic Messages response
+        timings: {stage: milliseconds}
+        filters: Metadata filters of the query
+    """
+    tokens = {
+        'inputTokens': int(bedrock_usage.get('input_tokens', 0)),
+        'outputTokens': int(bedrock_usage.get('output_tokens', 0)),
+        'cacheReadInputTokens': int(bedrock_usage.get('cache_read_input_tokens', 0)),
+        'cacheWriteInputTokens': int(bedrock_usage.get('cache_creation_input_tokens', 0))
+    }
+    pricing = {**DEFAULT_PRICING, **BEDROCK_PRICING}
+    cost = (tokens['inputTokens'] * pricing['input'] + tokens['outputTokens'] * pricing['output']
+            + tokens['cacheReadInputTokens'] * pricing['cacheRead']
+            + tokens['cacheWriteInputTokens'] * pricing['cacheWrite']) / 1000000
+    
+    usage = {
+        'modelId': BEDROCK_MODEL_ID,
+        **tokens,
+        # Decimal for DynamoDB; micro-dollar precision is enough for aggregation
+        'costUsd': Decimal(str(round(cost, 6))),
+        'timings': {stage: int(ms) for stage, ms in timings.items()}
+    }
     
-    return citations, source_documents
+    active_filters = {key: value for key, value in (filters or {}).items() if value}
+    if active_filters:
+        usage['filters'] = active_filters
+    
+    return usage
+
+
+def elapsed_ms(start_time: float) -> int:
+    return int((time.perf_counter() - start_time) * 1000)
+
+
+def get_session_owner(session_id: str) -> str:
+    """userId of a session (stored on every message), or None if it has no messages yet"""
+    response = chatlogs_table.query(
+        KeyConditionExpression='sessionId = :sid AND begins_with(messageId, :prefix)',
+        ProjectionExpression='userId',
+        ExpressionAttributeValues={':sid': session_id, ':prefix': MESSAGE_ID_PREFIX},
+        Limit=1,
+        ConsistentRead=True
+    )
+    items = response.get('Items', [])
+    return items[0].get('userId') if items else None
 
 
 def get_chat_history(session_id: str, limit: int = 10) -> list:
     """Get recent chat history for context"""
     try:
         response = chatlogs_table.query(
-            KeyConditionExpression='sessionId = :sid',
-            ExpressionAttributeValues={':sid': session_id},
+            KeyConditionExpression='sessionId = :sid AND begins_with(messageId, :prefix)',
+            # プロンプト構築に必要な属性のみ取得（sourceDocuments等は読まない）
+            ProjectionExpression='#role, #content, contentEncoding',
+            ExpressionAttributeNames={'#role': 'role', '#content': 'content'},
+            ExpressionAttributeValues={':sid': session_id, ':prefix': MESSAGE_ID_PREFIX},
             ScanIndexForward=False,
             Limit=limit
         )
         
-        messages = response.get('Items', [])
+        messages = [decode_message_item(msg) for msg in response.get('Items', [])]
         messages.reverse()  # Oldest first
         return messages
         
@@ -276,14 +427,15 @@ def get_chat_history(session_id: str, limit: int = 10) -> list:
         return []
 
 
+@warmable(WARMUP_TARGETS)
+@traced
 def lambda_handler(event, context):
     """
     Handle RAG query
     
-    Expected event body:
+    Expected event body (the user is the sub of the Authorization token):
     {
         "sessionId": "session_xxxxx" or null (for new session),
-        "userId": "user_xxxxx",
         "query": "User question",
         "filters": {
             "documentType": "manual",
@@ -297,10 +449,12 @@ def lambda_handler(event, context):
     headers = {
         'Content-Type': 'application/json',
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Request-Id',
         'Access-Control-Allow-Methods': 'POST,OPTIONS'
     }
     
+    request_start = time.perf_counter()
+    
     try:
         # Handle CORS preflight requests (OPTIONS)
         http_method = event.get('httpMethod', event.get('requestContext', {}).get('http', {}).get('method'))
@@ -311,6 +465,19 @@ def lambda_handler(event, context):
                 'body': ''
             }
         
+        # Authenticate (verified locally against the user pool's JWKS)
+        try:
+            user_id = authenticate(event)['sub']
+        except AuthError as e:
+            return {
+                'statusCode': 401,
+                'headers': headers,
+                'body': json.dumps({
+                    'error': 'AuthenticationError',
+                    'message': str(e)
+                })
+            }
+        
         # Parse request
         if isinstance(event.get('body'), str):
             body = json.loads(event['body'])
@@ -318,37 +485,74 @@ def lambda_handler(event, context):
             body = event.get('body', {})
         
         session_id = body.get('sessionId')
-        user_id = body.get('userId')
         query = body.get('query')
         filters = body.get('filters', {})
         
         # Validate input
-        if not query or not user_id:
+        if not query:
             return {
                 'statusCode': 400,
                 'headers': headers,
                 'body': json.dumps({
                     'error': 'ValidationError',
-                    'message': 'Query and userId are required'
+                    'message': 'Query is required'
+                })
+            }
+        
+        if body.get('userId') and body['userId'] != user_id:
+            return {
+                'statusCode': 403,
+                'headers': headers,
+                'body': json.dumps({
+                    'error': 'Forbidden',
+                    'message': 'userId does not match the authenticated user'
                 })
             }
         
-        # Generate new session ID if not provided
+        # Generate new session ID if not provided (random part: sessions of
+        # users starting in the same second must not collide)
         if not session_id:
-            session_id = f"session_{int(time.time())}"
+            session_id = f"{SESSION_ID_PREFIX}{int(time.time())}_{uuid.uuid4().hex[:12]}"
+        # SECURITY: history is read from and messages are written to the session,
+        # so an existing one must belong to the caller (404 like chat-management)
+        elif (not session_id.startswith(SESSION_ID_PREFIX)
+              or get_session_owner(session_id) not in (None, user_id)):
+            return {
+                'statusCode': 404,
+                'headers': headers,
+                'body': json.dumps({
+                    'error': 'NotFound',
+                    'message': 'Session not found'
+                })
+            }
+        
+        annotate('userId', user_id)
+        annotate('sessionId', session_id)
+        
+        timings = {}
         
         # Get chat history for context
+        stage_start = time.perf_counter()
         chat_history = get_chat_history(session_id, limit=5)
+        timings['historyMs'] = elapsed_ms(stage_start)
         
         # Query Knowledge Base
+        stage_start = time.perf_counter()
         kb_results = query_knowledge_base(query, filters)
+        timings['retrieveMs'] = elapsed_ms(stage_start)
         
         # Generate response with Claude 4
-        ai_response = generate_response_with_claude(query, kb_results, chat_history)
+        stage_start = time.perf_counter()
+        ai_response, bedrock_usage = generate_response_with_claude(query, kb_results, chat_history)
+        timings['generateMs'] = elapsed_ms(stage_start)
         
         # Extract citations
         citations, source_documents = extract_citations(kb_results)
         
+        # Handler time up to the message writes (which store it)
+        timings['totalMs'] = elapsed_ms(request_start)
+        usage = build_usage(bedrock_usage, timings, filters)
+        
         # Save user message
         user_message_id = save_message_to_dynamodb(
             session_id=session_id,
@@ -364,16 +568,21 @@ def lambda_handler(event, context):
             role='assistant',
             content=ai_response,
             citations=citations,
-            source_documents=source_documents
+            source_documents=source_documents,
+            usage=usage
         )
         
+        # Invalidate ETags of the session and session list
+        touch_version_items(session_id, user_id, message_count=2)
+        
         # Generate session title if new session
         session_title = None
         if not chat_history:
             session_title = generate_session_title(query)
         
-        # Convert Decimal to float for JSON serialization
-        for doc in source_documents:
+        # Sign download URLs for the response and convert Decimal to float
+        response_documents = sign_source_documents(s3_client, DOCUMENTS_BUCKET, source_documents)
+        for doc in response_documents:
             doc['relevance'] = float(doc['relevance'])
         
         return {
@@ -386,7 +595,7 @@ def lambda_handler(event, context):
                 'aiMessageId': ai_message_id,
                 'content': ai_response,
                 'citations': citations,
-                'sourceDocuments': source_documents,
+                'sourceDocuments': response_documents,
                 'timestamp': datetime.now().isoformat()
             }, ensure_ascii=False)
         }
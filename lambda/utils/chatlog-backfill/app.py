@@ -0,0 +1,131 @@
+"""
+EleKnowledge-AI Chat Log Compression Backfill
+Convert existing chatlogs items to the compressed encoding (message_codec)
+using a parallel scan
+
+Usage (local, shared layer on the path):
+    PYTHONPATH=../../layers/shared/python \\
+        python app.py --table EleKnowledge-AI-development-chatlogs --segments 8 [--dry-run]
+"""
+import argparse
+import json
+import os
+import time
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from message_codec import encode_message_item, is_encoded
+
+# Environment variables
+CHATLOGS_TABLE_NAME = os.environ.get('CHATLOGS_TABLE')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Backfill settings
+DEFAULT_SEGMENTS = 8
+MESSAGE_ID_PREFIX = 'msg_'
+
+
+def backfill_segment(table, segment: int, total_segments: int, dry_run: bool = False) -> dict:
+    """
+    Scan one segment and rewrite items whose attributes should be compressed
+
+    Updates are conditional on the item not being encoded yet, so running
+    the tool twice (or concurrently with new writes) is safe.
+    """
+    stats = {'scanned': 0, 'converted': 0, 'skipped': 0, 'bytesBefore': 0, 'bytesAfter': 0}
+    scan_kwargs = {'Segment': segment, 'TotalSegments': total_segments}
+
+    while True:
+        response = table.scan(**scan_kwargs)
+
+        for item in response.get('Items', []):
+            stats['scanned'] += 1
+            if is_encoded(item) or not str(item.get('messageId', '')).startswith(MESSAGE_ID_PREFIX):
+                stats['skipped'] += 1
+                continue
+
+            encoded = encode_message_item(item)
+            if not is_encoded(encoded):
+                stats['skipped'] += 1
+                continue
+
+            stats['bytesBefore'] += len(json.dumps(item, default=str, ensure_ascii=False).encode('utf-8'))
+            stats['bytesAfter'] += sum(
+                len(v) if isinstance(v, bytes) else len(json.dumps(v, default=str, ensure_ascii=False).encode('utf-8'))
+                for v in encoded.values()
+            )
+
+            if dry_run:
+                stats['converted'] += 1
+                continue
+
+            names = {}
+            values = {}
+            assignments = []
+            for i, attribute in enumerate(('content', 'contentEncoding', 'sourceDocuments', 'sourceDocumentsEncoding')):
+                if attribute in encoded and encoded[attribute] is not item.get(attribute):
+                    names[f"#a{i}"] = attribute
+                    values[f":v{i}"] = encoded[attribute]
+                    assignments.append(f"#a{i} = :v{i}")
+
+            try:
+                table.update_item(
+                    Key={'sessionId': item['sessionId'], 'messageId': item['messageId']},
+                    UpdateExpression='SET ' + ', '.join(assignments),
+                    ConditionExpression='attribute_exists(messageId) AND attribute_not_exists(contentEncoding) '
+                                        'AND attribute_not_exists(sourceDocumentsEncoding)',
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values
+                )
+                stats['converted'] += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                stats['skipped'] += 1
+
+        if 'LastEvaluatedKey' not in response:
+            return stats
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def run_backfill(table_name: str, total_segments: int = DEFAULT_SEGMENTS, dry_run: bool = False) -> dict:
+    """Run all scan segments in parallel and sum the results"""
+    start_time = time.time()
+    table = boto3.resource('dynamodb', region_name=AWS_REGION).Table(table_name)
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        futures = [
+            executor.submit(backfill_segment, table, segment, total_segments, dry_run)
+            for segment in range(total_segments)
+        ]
+        results = [future.result() for future in futures]
+
+    summary = {key: sum(result[key] for result in results) for key in results[0]}
+    summary['dryRun'] = dry_run
+    summary['durationSeconds'] = round(time.time() - start_time, 1)
+    return summary
+
+
+def lambda_handler(event, context):
+    """
+    Run the backfill as a one-off Lambda invocation
+
+    Event: {"segments": 8, "dryRun": false}
+    """
+    summary = run_backfill(
+        CHATLOGS_TABLE_NAME,
+        int(event.get('segments', DEFAULT_SEGMENTS)),
+        bool(event.get('dryRun', False))
+    )
+    print(json.dumps(summary))
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compress existing chatlogs items')
+    parser.add_argument('--table', default=CHATLOGS_TABLE_NAME, required=CHATLOGS_TABLE_NAME is None)
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    print(json.dumps(run_backfill(args.table, args.segments, args.dry_run), indent=2))
@@ -0,0 +1,261 @@
+"""
+EleKnowledge-AI Knowledge Base Ingestion Scheduler Lambda
+Coalesce document changes into one ingestion job per data source at a time
+
+Triggered by:
+- EventBridge S3 events (Object Created / Object Deleted) of the documents
+  bucket: the data sources are marked dirty
+- A one-minute schedule: finished jobs are recorded, and a new job is
+  started once changes have been quiet for DEBOUNCE_SECONDS (or have been
+  waiting for MAX_WAIT_SECONDS) and no job is running
+
+State table (pk: dataSourceId):
+    sk 'state': pendingSince, lastChangeAt, pendingChanges, runningJobId,
+        jobStartedAt, jobChanges
+    sk 'job#<startedAt>#<jobId>': status, durationSeconds, changes,
+        statistics (expires after JOB_HISTORY_DAYS)
+"""
+import json
+import os
+import time
+import uuid
+import boto3
+from botocore.exceptions import ClientError
+
+# Environment variables
+STATE_TABLE_NAME = os.environ.get('INGESTION_STATE_TABLE')
+KNOWLEDGE_BASE_ID_PARAMETER = os.environ.get('KNOWLEDGE_BASE_ID_PARAMETER')
+DATA_SOURCE_ID_PARAMETER = os.environ.get('DATA_SOURCE_ID_PARAMETER')
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Initialize AWS clients
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+bedrock_agent = boto3.client('bedrock-agent', region_name=AWS_REGION)
+ssm_client = boto3.client('ssm', region_name=AWS_REGION)
+
+# DynamoDB table
+state_table = dynamodb.Table(STATE_TABLE_NAME) if STATE_TABLE_NAME else None
+
+# Scheduling settings
+DEBOUNCE_SECONDS = int(os.environ.get('DEBOUNCE_SECONDS', '60'))
+MAX_WAIT_SECONDS = int(os.environ.get('MAX_WAIT_SECONDS', '300'))
+CLAIM_TIMEOUT_SECONDS = 120
+JOB_HISTORY_DAYS = 90
+ACTIVE_JOB_STATUSES = ('STARTING', 'IN_PROGRESS', 'STOPPING')
+CLAIM_PREFIX = 'claim#'
+STATE_SK = 'state'
+PLACEHOLDER = 'PLACEHOLDER'
+
+# Only changes to files the Knowledge Base ingests (or their metadata) count
+INGESTED_SUFFIXES = ('.pdf', '.txt', '.md', '.html', '.doc', '.docx', '.csv', '.xls', '.xlsx',
+                     '.metadata.json')
+IGNORED_PATH_PARTS = ('/tmp/', '/processed/')
+
+_knowledge_base_config = None
+
+
+def get_knowledge_base_config() -> tuple:
+    """
+    (knowledge base ID, [data source IDs]) from SSM, cached per container
+
+    Returns (None, []) while the parameters still hold the placeholder
+    (the Knowledge Base is created manually after deployment).
+    """
+    global _knowledge_base_config
+    if _knowledge_base_config is None:
+        response = ssm_client.get_parameters(Names=[KNOWLEDGE_BASE_ID_PARAMETER, DATA_SOURCE_ID_PARAMETER])
+        values = {parameter['Name']: parameter['Value'] for parameter in response['Parameters']}
+        knowledge_base_id = values.get(KNOWLEDGE_BASE_ID_PARAMETER, PLACEHOLDER)
+        data_source_ids = [value.strip() for value in values.get(DATA_SOURCE_ID_PARAMETER, PLACEHOLDER).split(',')
+                           if value.strip() and value.strip() != PLACEHOLDER]
+        if knowledge_base_id == PLACEHOLDER or not data_source_ids:
+            return None, []
+        _knowledge_base_config = (knowledge_base_id, data_source_ids)
+    return _knowledge_base_config
+
+
+def is_ingested_key(key: str) -> bool:
+    """True if a change to this object affects what the Knowledge Base indexes"""
+    lowered = key.lower()
+    return lowered.endswith(INGESTED_SUFFIXES) and not any(part in f"/{lowered}" for part in IGNORED_PATH_PARTS)
+
+
+def mark_changed(data_source_id: str, changes: int, now: int):
+    """Record document changes; the first one since the last job starts the wait"""
+    state_table.update_item(
+        Key={'pk': data_source_id, 'sk': STATE_SK},
+        UpdateExpression='SET lastChangeAt = :now, pendingSince = if_not_exists(pendingSince, :now), '
+                         'updatedAt = :now ADD pendingChanges :changes',
+        ExpressionAttributeValues={':now': now, ':changes': changes}
+    )
+
+
+def get_state(data_source_id: str) -> dict:
+    response = state_table.get_item(Key={'pk': data_source_id, 'sk': STATE_SK}, ConsistentRead=True)
+    return response.get('Item', {})
+
+
+def record_finished_job(data_source_id: str, state: dict, job: dict, now: int) -> dict:
+    """Store the finished job in the history and clear the running job"""
+    duration = (job['updatedAt'] - job['startedAt']).total_seconds()
+    record = {
+        'jobId': job['ingestionJobId'],
+        'status': job['status'],
+        'startedAt': int(job['startedAt'].timestamp()),
+        'endedAt': int(job['updatedAt'].timestamp()),
+        'durationSeconds': int(duration),
+        'changes': int(state.get('jobChanges', 0)),
+        'statistics': job.get('statistics', {}),
+        'failureReasons': job.get('failureReasons', [])[:10]
+    }
+    state_table.put_item(Item={
+        'pk': data_source_id,
+        'sk': f"job#{record['startedAt']}#{record['jobId']}",
+        **record,
+        'expiresAt': now + JOB_HISTORY_DAYS * 24 * 3600
+    })
+    state_table.update_item(
+        Key={'pk': data_source_id, 'sk': STATE_SK},
+        UpdateExpression='SET lastJob = :record, updatedAt = :now REMOVE runningJobId, jobStartedAt, jobChanges',
+        ConditionExpression='runningJobId = :job_id',
+        ExpressionAttributeValues={':record': record, ':now': now, ':job_id': record['jobId']}
+    )
+    print(f"Ingestion job finished: {json.dumps(record, default=str)}")
+    return record
+
+
+def claim_next_job(data_source_id: str, state: dict, now: int) -> str:
+    """
+    Move the pending changes to a new job claim
+
+    The condition makes exactly one concurrent scheduler win, and only if
+    no change arrived since `state` was read (that change then starts the
+    debounce wait again).
+
+    Returns:
+        str: Claim token (also the StartIngestionJob client token), or None
+    """
+    claim = CLAIM_PREFIX + str(uuid.uuid4())
+    try:
+        state_table.update_item(
+            Key={'pk': data_source_id, 'sk': STATE_SK},
+            UpdateExpression='SET runningJobId = :claim, jobStartedAt = :now, jobChanges = pendingChanges, '
+                             'pendingFrom = pendingSince, updatedAt = :now '
+                             'REMOVE pendingSince, lastChangeAt, pendingChanges',
+            ConditionExpression='attribute_not_exists(runningJobId) AND lastChangeAt = :seen',
+            ExpressionAttributeValues={':claim': claim, ':now': now, ':seen': state['lastChangeAt']}
+        )
+        return claim
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+
+
+def start_claimed_job(knowledge_base_id: str, data_source_id: str, claim: str, now: int) -> dict:
+    """
+    Start the ingestion job of a claim (idempotent: the claim is the client
+    token, so a retry after a crash returns the same job)
+
+    A ConflictException (a job started elsewhere, e.g. from the console)
+    puts the claimed changes back as pending.
+    """
+    try:
+        response = bedrock_agent.start_ingestion_job(
+            knowledgeBaseId=knowledge_base_id,
+            dataSourceId=data_source_id,
+            clientToken=claim[len(CLAIM_PREFIX):],
+            description='Coalesced document changes (kb-ingestion-scheduler)'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConflictException':
+            raise
+        state_table.update_item(
+            Key={'pk': data_source_id, 'sk': STATE_SK},
+            UpdateExpression='SET pendingSince = pendingFrom, '
+                             'lastChangeAt = if_not_exists(lastChangeAt, pendingFrom), '
+                             'updatedAt = :now ADD pendingChanges :changes '
+                             'REMOVE runningJobId, jobStartedAt, jobChanges, pendingFrom',
+            ConditionExpression='runningJobId = :claim',
+            ExpressionAttributeValues={':claim': claim, ':now': now,
+                                       ':changes': get_state(data_source_id).get('jobChanges', 0)}
+        )
+        print(f"Another ingestion job is running on {data_source_id}, will retry")
+        return {'action': 'conflict'}
+
+    job_id = response['ingestionJob']['ingestionJobId']
+    state_table.update_item(
+        Key={'pk': data_source_id, 'sk': STATE_SK},
+        UpdateExpression='SET runningJobId = :job_id REMOVE pendingFrom',
+        ConditionExpression='runningJobId = :claim',
+        ExpressionAttributeValues={':claim': claim, ':job_id': job_id}
+    )
+    print(f"Started ingestion job {job_id} on {data_source_id}")
+    return {'action': 'started', 'jobId': job_id}
+
+
+def schedule_data_source(knowledge_base_id: str, data_source_id: str, now: int) -> dict:
+    """Advance one data source: record a finished job, then start the next one if due"""
+    state = get_state(data_source_id)
+    running = state.get('runningJobId')
+
+    if running and running.startswith(CLAIM_PREFIX):
+        # Claimed but the job ID was never stored (crash): finish the start
+        if now - int(state['jobStartedAt']) < CLAIM_TIMEOUT_SECONDS:
+            return {'action': 'starting'}
+        return start_claimed_job(knowledge_base_id, data_source_id, running, now)
+
+    if running:
+        job = bedrock_agent.get_ingestion_job(
+            knowledgeBaseId=knowledge_base_id, dataSourceId=data_source_id, ingestionJobId=running
+        )['ingestionJob']
+        if job['status'] in ACTIVE_JOB_STATUSES:
+            return {'action': 'running', 'jobId': running, 'status': job['status'],
+                    'pendingChanges': int(state.get('pendingChanges', 0))}
+        record_finished_job(data_source_id, state, job, now)
+        state = get_state(data_source_id)
+
+    if 'pendingSince' not in state:
+        return {'action': 'idle'}
+
+    quiet = now - int(state['lastChangeAt'])
+    waited = now - int(state['pendingSince'])
+    if quiet < DEBOUNCE_SECONDS and waited < MAX_WAIT_SECONDS:
+        return {'action': 'debouncing', 'pendingChanges': int(state['pendingChanges']), 'waitedSeconds': waited}
+
+    claim = claim_next_job(data_source_id, state, now)
+    if not claim:
+        return {'action': 'raced'}
+    return start_claimed_job(knowledge_base_id, data_source_id, claim, now)
+
+
+def lambda_handler(event, context):
+    """
+    Handle EventBridge S3 events (mark changes) and scheduled ticks
+    (start / finish ingestion jobs)
+    """
+    knowledge_base_id, data_source_ids = get_knowledge_base_config()
+    if not knowledge_base_id:
+        print("Knowledge Base or data source ID not configured yet, skipping")
+        return {'statusCode': 200, 'body': json.dumps({'message': 'not configured'})}
+
+    now = int(time.time())
+
+    if event.get('source') == 'aws.s3':
+        key = event.get('detail', {}).get('object', {}).get('key', '')
+        if not is_ingested_key(key):
+            return {'statusCode': 200, 'body': json.dumps({'message': 'ignored', 'key': key})}
+        for data_source_id in data_source_ids:
+            mark_changed(data_source_id, 1, now)
+        return {'statusCode': 200, 'body': json.dumps({'message': 'change recorded', 'key': key})}
+
+    results = {}
+    for data_source_id in data_source_ids:
+        try:
+            results[data_source_id] = schedule_data_source(knowledge_base_id, data_source_id, now)
+        except ClientError as e:
+            print(f"Error scheduling ingestion for {data_source_id}: {e}")
+            results[data_source_id] = {'action': 'error', 'error': str(e)}
+
+    print(f"Scheduler tick: {json.dumps(results, default=str)}")
+    return {'statusCode': 200, 'body': json.dumps(results, default=str)}
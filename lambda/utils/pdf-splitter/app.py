@@ -1,29 +1,57 @@
 """
 EleKnowledge-AI PDF Splitter Lambda
 Automatically split large PDFs (>45MB) into smaller chunks
-Triggered by S3 upload events
+Triggered by S3 upload events (via SQS)
 """
 import json
 import os
+import uuid
 import boto3
 from io import BytesIO
-from pypdf import PdfReader, PdfWriter
 from botocore.exceptions import ClientError
+from chunk_writer import iter_split_chunks
+from optimizer import optimize_pdf, write_optimized_pdf
+from image_resampler import resolve_image_settings, settings_profile, write_downsampled_pdf, summarize_stats
+from spool import download_to_file, MappedFile, new_chunk_path, remove_file
+from upload_pipeline import ChunkUploadPipeline
+from text_sidecar import TEXT_SIDECARS_ENABLED, write_text_sidecars, delete_text_sidecars
+from kb_metadata import METADATA_SUFFIX, metadata_sidecar_key, write_part_sidecars
+from manifest import (get_manifest, is_completed, acquire_lease, complete_manifest,
+                      release_lease, delete_manifest)
+from event_records import get_work_items, process_work_items, build_batch_response
 
 s3_client = boto3.client('s3')
 
+# Split manifest table (optional; idempotency and leases are off without it)
+SPLIT_MANIFEST_TABLE_NAME = os.environ.get('SPLIT_MANIFEST_TABLE')
+manifest_table = boto3.resource('dynamodb').Table(SPLIT_MANIFEST_TABLE_NAME) if SPLIT_MANIFEST_TABLE_NAME else None
+
 # File size limits
 MAX_FILE_SIZE_MB = 45
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
+# Files above this size are spooled to /tmp instead of being held in memory
+STREAMING_THRESHOLD_MB = int(os.environ.get('STREAMING_THRESHOLD_MB', '100'))
+STREAMING_THRESHOLD_BYTES = STREAMING_THRESHOLD_MB * 1024 * 1024
+
+# Opt-in: streaming sources up to this size are optimized as a whole before
+# splitting. The optimized copy is held in memory while it is written, so
+# peak memory then grows with the input (0 = chunk-level optimization only)
+STREAMING_OPTIMIZE_MAX_MB = int(os.environ.get('STREAMING_OPTIMIZE_MAX_MB', '0'))
+STREAMING_OPTIMIZE_MAX_BYTES = STREAMING_OPTIMIZE_MAX_MB * 1024 * 1024
+
 
-def get_file_size(bucket: str, key: str) -> int:
-    """Get S3 object size in bytes"""
+def get_object_head(bucket: str, key: str) -> dict:
+    """Get S3 object size, ETag and user metadata with a single HEAD request"""
     try:
         response = s3_client.head_object(Bucket=bucket, Key=key)
-        return response['ContentLength']
+        return {
+            'size': response['ContentLength'],
+            'etag': response.get('ETag'),
+            'metadata': response.get('Metadata', {})
+        }
     except ClientError as e:
-        print(f"Error getting file size: {e}")
+        print(f"Error getting object info: {e}")
         raise
 
 
@@ -38,90 +66,138 @@ def download_pdf_from_s3(bucket: str, key: str) -> BytesIO:
         raise
 
 
-def get_object_metadata(bucket: str, key: str) -> dict:
-    """Get S3 object metadata"""
-    try:
-        response = s3_client.head_object(Bucket=bucket, Key=key)
-        return response.get('Metadata', {})
-    except ClientError as e:
-        print(f"Error getting metadata: {e}")
-        return {}
+def split_and_upload(pdf_stream, bucket: str, key: str, metadata: dict, source_path: str = None) -> list:
+    """
+    Split a PDF and upload the chunks while later chunks are still being
+    written (see upload_pipeline), then write the per-page text sidecars
+    (see text_sidecar)
+    
+    Args:
+        source_path: File mapped as pdf_stream (streaming mode): chunks are
+            spooled to /tmp too
+    
+    Returns:
+        list: Chunk records (key, sha256, size, startPage, endPage) in page order
+    """
+    with ChunkUploadPipeline(s3_client, bucket, key, metadata) as pipeline:
+        for chunk in iter_split_chunks(pdf_stream, MAX_FILE_SIZE_BYTES, bool(source_path)):
+            pipeline.submit(chunk)
+        chunks = pipeline.results()
+    
+    uploaded = sum(1 for chunk in chunks if chunk.pop('uploaded'))
+    print(f"Split into {len(chunks)} chunks{' (streaming)' if source_path else ''}, "
+          f"{uploaded} uploaded, {len(chunks) - uploaded} unchanged")
+    
+    if TEXT_SIDECARS_ENABLED:
+        print(f"Text sidecars: {json.dumps(write_text_sidecars(s3_client, chunks, pdf_stream, source_path))}")
+    return chunks
 
 
-def split_pdf(pdf_stream: BytesIO, max_size_bytes: int) -> list:
+def rewrite_source(source_path: str, write) -> tuple:
     """
-    Split PDF into chunks under max_size_bytes
-    
+    Write a transformed copy of a spooled source with write(source, output)
+
     Returns:
-        list: List of PdfWriter objects
+        tuple: (path of the copy (caller removes it), stats returned by write)
+    """
+    output_path = new_chunk_path()
+    try:
+        with MappedFile(source_path) as source, open(output_path, 'wb') as output:
+            stats = write(source, output)
+    except Exception:
+        remove_file(output_path)
+        raise
+    return output_path, stats
+
+
+def split_and_upload_streaming(bucket: str, key: str, head: dict, image_settings: dict = None) -> tuple:
     """
-    reader = PdfReader(pdf_stream)
-    total_pages = len(reader.pages)
+    Split a large PDF with roughly constant memory use
     
-    chunks = []
-    current_writer = PdfWriter()
-    current_size = 0
+    The source is downloaded to /tmp in ranged parts and memory-mapped for
+    the reader; chunks are written to temporary files and streamed to S3.
+    With image_settings, a downsampled copy is written to /tmp first and
+    split instead of the source. Without, sources up to
+    STREAMING_OPTIMIZE_MAX_MB (opt-in) are losslessly optimized to /tmp
+    first, so files that then fit the limit are not split.
     
-    for page_num in range(total_pages):
-        page = reader.pages[page_num]
-        
-        # Create temporary writer to estimate page size
-        temp_writer = PdfWriter()
-        temp_writer.add_page(page)
-        temp_stream = BytesIO()
-        temp_writer.write(temp_stream)
-        page_size = temp_stream.tell()
-        
-        # Check if adding this page exceeds limit
-        if current_size + page_size > max_size_bytes and len(current_writer.pages) > 0:
-            # Save current chunk and start new one
-            chunks.append(current_writer)
-            current_writer = PdfWriter()
-            current_size = 0
+    Returns:
+        tuple: (chunk records, image downsampling report or None)
+    """
+    source_path = download_to_file(s3_client, bucket, key, head['size'], head['etag'])
+    image_report = None
+    try:
+        if image_settings:
+            resampled_path, stats = rewrite_source(
+                source_path, lambda source, output: write_downsampled_pdf(source, image_settings, output))
+            remove_file(source_path)
+            source_path = resampled_path
+            image_report = summarize_stats(stats, head['size'], os.path.getsize(source_path))
+            print(f"Downsampled images: {json.dumps({k: v for k, v in image_report.items() if k != 'pageMs'})}")
+        elif head['size'] <= STREAMING_OPTIMIZE_MAX_BYTES:
+            optimized_path, stats = rewrite_source(source_path, write_optimized_pdf)
+            optimized_size = os.path.getsize(optimized_path)
+            print(f"Optimized to {optimized_size / 1024 / 1024:.2f} MB: {json.dumps(stats)}")
+            if optimized_size < head['size']:
+                remove_file(source_path)
+                source_path = optimized_path
+            else:
+                remove_file(optimized_path)
         
-        # Add page to current writer
-        current_writer.add_page(page)
-        current_size += page_size
+        with MappedFile(source_path) as pdf_stream:
+            return split_and_upload(pdf_stream, bucket, key, head['metadata'], source_path), image_report
+    finally:
+        remove_file(source_path)
+
+
+def split_and_upload_in_memory(bucket: str, key: str, head: dict, image_settings: dict = None) -> tuple:
+    """
+    Split a PDF held in memory after optimizing the whole document
     
-    # Add last chunk
-    if len(current_writer.pages) > 0:
-        chunks.append(current_writer)
+    Returns:
+        tuple: (chunk records, image downsampling report or None)
+    """
+    # Download PDF
+    pdf_stream = download_pdf_from_s3(bucket, key)
+    image_report = None
     
-    return chunks
+    if image_settings:
+        # Lossy: downsampled images (plus the lossless optimizations)
+        output = BytesIO()
+        stats = write_downsampled_pdf(pdf_stream, image_settings, output)
+        pdf_stream = output
+        image_report = summarize_stats(stats, head['size'], output.tell())
+        print(f"Downsampled images: {json.dumps({k: v for k, v in image_report.items() if k != 'pageMs'})}")
+    else:
+        # Lossless optimization first; some files then fit without splitting
+        optimized, stats = optimize_pdf(pdf_stream)
+        print(f"Optimized to {optimized.tell() / 1024 / 1024:.2f} MB: {json.dumps(stats)}")
+        if optimized.tell() < head['size']:
+            pdf_stream = optimized
+    
+    # Split PDF and upload chunks (pipelined)
+    return split_and_upload(pdf_stream, bucket, key, head['metadata']), image_report
 
 
-def upload_pdf_chunk(bucket: str, base_key: str, chunk_index: int, 
-                     pdf_writer: PdfWriter, metadata: dict) -> str:
-    """Upload PDF chunk to S3"""
-    try:
-        # Generate new key
-        key_parts = base_key.rsplit('.', 1)
-        if len(key_parts) == 2:
-            new_key = f"{key_parts[0]}_part{chunk_index + 1}.{key_parts[1]}"
-        else:
-            new_key = f"{base_key}_part{chunk_index + 1}"
-        
-        # Write PDF to bytes
-        pdf_stream = BytesIO()
-        pdf_writer.write(pdf_stream)
-        pdf_stream.seek(0)
-        pdf_bytes = pdf_stream.read()
-        
-        # Upload to S3 with metadata
-        s3_client.put_object(
+def delete_stale_parts(bucket: str, key: str, previous_chunks: list, keep_keys: list) -> list:
+    """
+    Delete the parts of the previous split (and their sidecars) that the
+    current version no longer has
+
+    Only keys recorded in the previous manifest are deleted: other
+    <name>_partN.pdf objects in the folder may be the users' own files.
+    """
+    stale_keys = [chunk['key'] for chunk in previous_chunks if chunk['key'] not in keep_keys]
+    delete_keys = stale_keys + [metadata_sidecar_key(part_key) for part_key in stale_keys]
+    for i in range(0, len(delete_keys), 1000):
+        s3_client.delete_objects(
             Bucket=bucket,
-            Key=new_key,
-            Body=pdf_bytes,
-            ContentType='application/pdf',
-            Metadata=metadata
+            Delete={'Objects': [{'Key': part_key} for part_key in delete_keys[i:i + 1000]], 'Quiet': True}
         )
-        
-        print(f"Uploaded chunk {chunk_index + 1}: {new_key} ({len(pdf_bytes) / 1024 / 1024:.2f} MB)")
-        return new_key
-        
-    except ClientError as e:
-        print(f"Error uploading chunk: {e}")
-        raise
+    if stale_keys:
+        delete_text_sidecars(s3_client, stale_keys)
+        print(f"Deleted {len(stale_keys)} stale parts of {key}")
+    return stale_keys
 
 
 def tag_original_file(bucket: str, key: str):
@@ -141,95 +217,142 @@ def tag_original_file(bucket: str, key: str):
         print(f"Error tagging file: {e}")
 
 
-def lambda_handler(event, context):
+def process_object(bucket: str, key: str) -> dict:
     """
-    Handle S3 upload event and split large PDFs
+    Split one uploaded PDF if it exceeds the size limit
     
-    Event triggered by:
-    - S3 ObjectCreated event
-    - For .pdf files only
-    - In eleknowledge-documents bucket
+    Returns:
+        dict: Result (key, status 'split' | 'updated' | 'skipped', details)
     """
+    # Edited source metadata sidecar: refresh the parts' sidecars
+    if key.endswith('.pdf' + METADATA_SUFFIX) and '_part' not in key:
+        source_key = key[:-len(METADATA_SUFFIX)]
+        manifest = get_manifest(manifest_table, source_key) if manifest_table else None
+        if not manifest or manifest.get('status') != 'completed':
+            return {'key': key, 'status': 'skipped', 'reason': 'source not split'}
+        head = get_object_head(bucket, source_key)
+        written = write_part_sidecars(s3_client, bucket, source_key, manifest['chunks'], head['metadata'])
+        return {'key': key, 'status': 'updated', 'metadataSidecars': written}
+    
+    # Skip if not PDF
+    if not key.lower().endswith('.pdf'):
+        print(f"Skipping non-PDF file: {key}")
+        return {'key': key, 'status': 'skipped', 'reason': 'not a PDF'}
+    
+    # Skip if already a split file (contains '_part')
+    if '_part' in key:
+        print(f"Skipping split file: {key}")
+        return {'key': key, 'status': 'skipped', 'reason': 'split part'}
+    
+    # Skip if in processed/ or tmp/ directory
+    if '/processed/' in key or '/tmp/' in key:
+        print(f"Skipping processed/tmp file: {key}")
+        return {'key': key, 'status': 'skipped', 'reason': 'processed/tmp file'}
+    
+    # Check file size
+    head = get_object_head(bucket, key)
+    file_size = head['size']
+    file_size_mb = file_size / 1024 / 1024
+    
+    print(f"Processing file: {key} ({file_size_mb:.2f} MB)")
+    
+    # Lossy image downsampling (per folder rule or file metadata)
+    image_settings = resolve_image_settings(key, head['metadata'])
+    profile = settings_profile(image_settings)
+    
+    # Skip versions that were already split with the same settings
+    # (duplicate deliveries, identical re-uploads)
+    manifest = get_manifest(manifest_table, key) if manifest_table else None
+    if is_completed(manifest, head['etag'], profile):
+        print(f"Already split (ETag {head['etag']}), skipping")
+        write_part_sidecars(s3_client, bucket, key, manifest['chunks'], head['metadata'])
+        return {'key': key, 'status': 'skipped', 'reason': 'already split',
+                'chunks': [chunk['key'] for chunk in manifest['chunks']]}
+    
+    # If file is under limit, no action needed (except removing parts of a larger old version)
+    if file_size <= MAX_FILE_SIZE_BYTES:
+        print(f"File size OK, no splitting needed")
+        removed = []
+        if manifest:
+            removed = delete_stale_parts(bucket, key, manifest.get('chunks', []), [])
+            delete_manifest(manifest_table, key)
+        return {'key': key, 'status': 'skipped', 'reason': 'under size limit', 'size': file_size_mb,
+                'removedParts': removed}
+    
+    # Only one worker splits a source key at a time
+    owner = str(uuid.uuid4())
+    if manifest_table and not acquire_lease(manifest_table, key, head['etag'], profile, owner):
+        current = get_manifest(manifest_table, key) or {}
+        if current.get('processingEtag') == head['etag'] or is_completed(current, head['etag'], profile):
+            print(f"Another worker is splitting this version of {key}, skipping")
+            return {'key': key, 'status': 'skipped', 'reason': 'in progress elsewhere'}
+        # Another version is in progress: fail so the message is retried after it
+        raise RuntimeError(f"{key} is being split by another worker (ETag {current.get('processingEtag')})")
+    
+    # File exceeds limit - split it
+    print(f"File exceeds {MAX_FILE_SIZE_MB}MB, splitting...")
     
     try:
-        # Parse S3 event
-        for record in event.get('Records', []):
-            bucket = record['s3']['bucket']['name']
-            key = record['s3']['object']['key']
-            
-            # Skip if not PDF
-            if not key.lower().endswith('.pdf'):
-                print(f"Skipping non-PDF file: {key}")
-                continue
-            
-            # Skip if already a split file (contains '_part')
-            if '_part' in key:
-                print(f"Skipping split file: {key}")
-                continue
-            
-            # Skip if in processed/ or tmp/ directory
-            if '/processed/' in key or '/tmp/' in key:
-                print(f"Skipping processed/tmp file: {key}")
-                continue
-            
-            # Check file size
-            file_size = get_file_size(bucket, key)
-            file_size_mb = file_size / 1024 / 1024
-            
-            print(f"Processing file: {key} ({file_size_mb:.2f} MB)")
-            
-            # If file is under limit, no action needed
-            if file_size <= MAX_FILE_SIZE_BYTES:
-                print(f"File size OK, no splitting needed")
-                continue
-            
-            # File exceeds limit - split it
-            print(f"File exceeds {MAX_FILE_SIZE_MB}MB, splitting...")
-            
-            # Get metadata
-            metadata = get_object_metadata(bucket, key)
-            
-            # Download PDF
-            pdf_stream = download_pdf_from_s3(bucket, key)
-            
-            # Split PDF
-            chunks = split_pdf(pdf_stream, MAX_FILE_SIZE_BYTES)
-            
-            print(f"Split into {len(chunks)} chunks")
-            
-            # Upload chunks
-            chunk_keys = []
-            for i, chunk in enumerate(chunks):
-                chunk_key = upload_pdf_chunk(bucket, key, i, chunk, metadata)
-                chunk_keys.append(chunk_key)
-            
-            # Tag original file
-            tag_original_file(bucket, key)
-            
-            print(f"Successfully split {key} into {len(chunks)} parts")
-            
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'message': 'PDF split successfully',
-                    'originalFile': key,
-                    'originalSize': file_size_mb,
-                    'chunks': chunk_keys,
-                    'chunkCount': len(chunks)
-                })
-            }
+        if file_size > STREAMING_THRESHOLD_BYTES:
+            # Streaming mode: source on disk (mmap), chunks spooled to /tmp
+            chunks, image_report = split_and_upload_streaming(bucket, key, head, image_settings)
+        else:
+            chunks, image_report = split_and_upload_in_memory(bucket, key, head, image_settings)
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'No files to process'})
-        }
+        chunk_keys = [chunk['key'] for chunk in chunks]
+        removed = delete_stale_parts(bucket, key, (manifest or {}).get('chunks', []), chunk_keys)
+        write_part_sidecars(s3_client, bucket, key, chunks, head['metadata'])
         
+        if manifest_table:
+            complete_manifest(manifest_table, key, head['etag'], profile, owner, chunks)
     except Exception as e:
-        print(f"Error processing file: {str(e)}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'error': 'InternalServerError',
-                'message': str(e)
-            })
-        }
+        if manifest_table:
+            release_lease(manifest_table, key, owner, str(e))
+        raise
+    
+    # Tag original file
+    tag_original_file(bucket, key)
+    
+    print(f"Successfully split {key} into {len(chunk_keys)} parts")
+    
+    return {
+        'key': key,
+        'status': 'split',
+        'size': file_size_mb,
+        'chunks': chunk_keys,
+        'chunkCount': len(chunk_keys),
+        'removedParts': removed,
+        'imageOptimization': image_report
+    }
+
+
+def lambda_handler(event, context):
+    """
+    Handle S3 upload events and split large PDFs
+    
+    Event triggered by:
+    - SQS queue receiving the documents bucket's ObjectCreated notifications
+      (partial batch failures: only messages whose file failed are retried)
+    - Or an S3 ObjectCreated event directly (.pdf files only)
+    
+    All records in the event are processed, RECORD_CONCURRENCY files at a time.
+    """
+    items = get_work_items(event)
+    results = process_work_items(items, process_object)
+    
+    split_count = sum(1 for result in results if result['status'] == 'split')
+    failed_count = sum(1 for result in results if result['status'] == 'failed')
+    print(f"Processed {len(results)} files: {split_count} split, {failed_count} failed")
+    
+    if any(record.get('eventSource') == 'aws:sqs' for record in event.get('Records', [])):
+        return build_batch_response(results)
+    
+    return {
+        'statusCode': 500 if failed_count else 200,
+        'body': json.dumps({
+            'message': f"Processed {len(results)} files",
+            'splitCount': split_count,
+            'failedCount': failed_count,
+            'results': [{k: v for k, v in result.items() if k != 'messageId'} for result in results]
+        }, ensure_ascii=False)
+    }
@@ -0,0 +1,119 @@
+"""
+EleKnowledge-AI PDF Splitter - Chunk Writer
+Write planned page ranges to new PDFs, verifying each chunk's real size
+"""
+import gc
+import os
+from io import BytesIO
+from pypdf import PdfReader, PdfWriter
+from split_planner import measure_page_objects, plan_page_ranges, estimate_range_size
+from spool import new_chunk_path, remove_file
+from optimizer import optimize_writer
+
+# Re-planning limits (written size / estimated size)
+MIN_SIZE_RATIO = 0.05
+RATIO_SAFETY_MARGIN = 1.1
+
+
+def write_chunk(reader: PdfReader, start: int, end: int, spool: bool = False) -> dict:
+    """
+    Write pages [start, end) of the source PDF to a new, losslessly
+    optimized PDF (see optimizer)
+    
+    Args:
+        spool: Write to a temporary file ('path') instead of memory ('stream')
+    """
+    writer = PdfWriter()
+    for page_num in range(start, end):
+        writer.add_page(reader.pages[page_num])
+    optimize_writer(writer)
+    
+    chunk = {'startPage': start + 1, 'endPage': end}
+    
+    if spool:
+        chunk['path'] = new_chunk_path()
+        with open(chunk['path'], 'wb') as f:
+            writer.write(f)
+        chunk['size'] = os.path.getsize(chunk['path'])
+    else:
+        chunk['stream'] = BytesIO()
+        writer.write(chunk['stream'])
+        chunk['size'] = chunk['stream'].tell()
+    
+    return chunk
+
+
+def write_verified_chunks(reader: PdfReader, start: int, end: int, max_size_bytes: int,
+                          spool: bool = False) -> list:
+    """
+    Write a planned page range and verify its real size
+    
+    Ranges whose final output exceeds the limit (estimation error) are
+    bisected and written again.
+    """
+    chunk = write_chunk(reader, start, end, spool)
+    
+    if chunk['size'] > max_size_bytes and end - start > 1:
+        print(f"Pages {start + 1}-{end} wrote {chunk['size'] / 1024 / 1024:.2f} MB, re-splitting")
+        if 'path' in chunk:
+            remove_file(chunk['path'])
+        middle = (start + end) // 2
+        return (write_verified_chunks(reader, start, middle, max_size_bytes, spool) +
+                write_verified_chunks(reader, middle, end, max_size_bytes, spool))
+    
+    return [chunk]
+
+
+def iter_split_chunks(pdf_stream, max_size_bytes: int, spool: bool = False):
+    """
+    Split PDF into chunks under max_size_bytes, yielding each chunk as
+    soon as it is written
+    
+    Page ranges are planned from a single walk of the object graph
+    (see split_planner), then each chunk is written once and verified.
+    
+    Args:
+        pdf_stream: Seekable source (BytesIO or memory-mapped file)
+        spool: Write chunks to temporary files instead of memory
+    
+    Yields:
+        dict: Chunk (startPage, endPage, size, stream or path)
+    """
+    reader = PdfReader(pdf_stream)
+    
+    # Already under the limit (e.g. after optimize_pdf): one chunk, no planning
+    pdf_stream.seek(0, os.SEEK_END)
+    if pdf_stream.tell() <= max_size_bytes:
+        yield from write_verified_chunks(reader, 0, len(reader.pages), max_size_bytes, spool)
+        return
+    
+    page_objects, object_sizes = measure_page_objects(reader, release_objects=spool)
+    page_ranges = plan_page_ranges(page_objects, object_sizes, max_size_bytes)
+    
+    print(f"Planned {len(page_ranges)} chunks for {len(reader.pages)} pages "
+          f"({len(object_sizes)} objects)")
+    
+    # Estimates are of the unoptimized objects; after each chunk the
+    # remaining pages are re-planned with the observed size ratio so
+    # well-compressing documents end up in fewer chunks
+    size_ratio = 1.0
+    start = 0
+    while start < len(page_objects):
+        end = start + page_ranges[0][1]
+        chunks = write_verified_chunks(reader, start, end, max_size_bytes, spool)
+        yield from chunks
+        
+        estimated = estimate_range_size(page_objects, object_sizes, start, end)
+        written = sum(chunk['size'] for chunk in chunks)
+        size_ratio = min(1.0, max(MIN_SIZE_RATIO, written / estimated * RATIO_SAFETY_MARGIN))
+        start = end
+        if start < len(page_objects):
+            page_ranges = plan_page_ranges(page_objects[start:], object_sizes, int(max_size_bytes / size_ratio),
+                                           report_oversized=False)
+        
+        if spool:
+            # Drop this chunk's parsed objects (incl. stream data) before the
+            # next one; pypdf objects form reference cycles, so collect now
+            # instead of waiting for the GC thresholds
+            reader.resolved_objects.clear()
+            gc.collect()
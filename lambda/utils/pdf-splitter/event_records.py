@@ -0,0 +1,82 @@
+"""
+EleKnowledge-AI PDF Splitter - Event Records
+Normalize S3 notifications (direct or delivered through SQS) into work
+items and run them with bounded concurrency
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_plus
+
+# Files processed in parallel per invocation (each may hold a chunk
+# pipeline's worth of memory, so keep this small)
+RECORD_CONCURRENCY = int(os.environ.get('RECORD_CONCURRENCY', '2'))
+
+
+def parse_s3_records(records: list) -> list:
+    """(bucket, key) pairs of S3 event records; keys arrive URL-encoded"""
+    return [
+        (record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key']))
+        for record in records
+        if 's3' in record
+    ]
+
+
+def get_work_items(event: dict) -> list:
+    """
+    Flatten an S3 or SQS event into work items
+
+    Returns:
+        list: [{'messageId', 'bucket', 'key'} or {'messageId', 'error'}]
+            messageId is None for direct S3 events. An SQS message may
+            carry several S3 records, or none (s3:TestEvent).
+    """
+    items = []
+    for record in event.get('Records', []):
+        if record.get('eventSource') != 'aws:sqs':
+            items.extend({'messageId': None, 'bucket': bucket, 'key': key}
+                         for bucket, key in parse_s3_records([record]))
+            continue
+
+        message_id = record['messageId']
+        try:
+            body = json.loads(record['body'])
+        except (json.JSONDecodeError, TypeError) as e:
+            items.append({'messageId': message_id, 'error': f"Invalid message body: {e}"})
+            continue
+
+        items.extend({'messageId': message_id, 'bucket': bucket, 'key': key}
+                     for bucket, key in parse_s3_records(body.get('Records', [])))
+    return items
+
+
+def process_work_items(items: list, process_object, concurrency: int = RECORD_CONCURRENCY) -> list:
+    """
+    Run process_object(bucket, key) for every item, at most `concurrency`
+    at a time; one failing file does not stop the others
+
+    Returns:
+        list: One result dict per item, in input order
+    """
+    def run(item: dict) -> dict:
+        if 'error' in item:
+            return {'messageId': item['messageId'], 'status': 'failed', 'error': item['error']}
+        try:
+            result = process_object(item['bucket'], item['key'])
+        except Exception as e:
+            print(f"Error processing {item['key']}: {e}")
+            result = {'key': item['key'], 'status': 'failed', 'error': str(e)}
+        result['messageId'] = item['messageId']
+        return result
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items)))) as executor:
+        return list(executor.map(run, items))
+
+
+def build_batch_response(results: list) -> dict:
+    """SQS partial batch response: only messages with a failed file are retried"""
+    failed = sorted({result['messageId'] for result in results
+                     if result['status'] == 'failed' and result['messageId']})
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed]}
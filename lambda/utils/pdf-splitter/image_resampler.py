@@ -0,0 +1,187 @@
+"""
+EleKnowledge-AI PDF Splitter - Lossy Image Downsampling
+Re-encode oversized raster images (scanned pages) to a target DPI and
+JPEG quality before splitting
+
+Enabled per folder (IMAGE_DOWNSAMPLE_RULES) or per file (S3 user
+metadata). The uploaded original is never modified; only the _partN
+copies carry the re-encoded images.
+
+    IMAGE_DOWNSAMPLE_RULES='[{"prefix": "scanned/", "dpi": 150, "quality": 75}]'
+    x-amz-meta-image-target-dpi: 150   (0 disables for this file)
+    x-amz-meta-image-quality: 75
+"""
+import gc
+import json
+import os
+import time
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from optimizer import optimize_writer
+
+# Downsampling settings
+IMAGE_RULES = json.loads(os.environ.get('IMAGE_DOWNSAMPLE_RULES', '[]'))
+METADATA_DPI_KEY = 'image-target-dpi'
+METADATA_QUALITY_KEY = 'image-quality'
+DEFAULT_QUALITY = 75
+MIN_TARGET_DPI = 72
+RESAMPLE_THRESHOLD = 1.2  # Only touch images above target DPI x this
+MIN_IMAGE_BYTES = 64 * 1024
+RELEASE_EVERY_PAGES = 20  # Drop the reader's parsed originals this often
+
+
+def _metadata_int(metadata: dict, name: str) -> int:
+    """Integer value of a user metadata tag, or None if it is missing or not a number"""
+    if name not in metadata:
+        return None
+    try:
+        return int(metadata[name].strip() or 0)
+    except ValueError:
+        print(f"Ignoring non-numeric metadata {name}={metadata[name]!r}")
+        return None
+
+
+def resolve_image_settings(key: str, metadata: dict) -> dict:
+    """
+    Downsampling settings for a source key (None = lossless only)
+
+    Per-file metadata wins over folder rules; the longest matching
+    prefix rule applies. A non-numeric DPI tag is ignored (folder rules
+    apply), a non-numeric quality tag falls back to the default.
+    """
+    metadata_dpi = _metadata_int(metadata, METADATA_DPI_KEY)
+    if metadata_dpi is not None:
+        dpi = metadata_dpi
+        quality = _metadata_int(metadata, METADATA_QUALITY_KEY) or DEFAULT_QUALITY
+    else:
+        rules = [rule for rule in IMAGE_RULES if key.startswith(rule['prefix'])]
+        if not rules:
+            return None
+        rule = max(rules, key=lambda r: len(r['prefix']))
+        dpi = int(rule.get('dpi', 0))
+        quality = int(rule.get('quality', DEFAULT_QUALITY))
+
+    if dpi <= 0:
+        return None
+    return {'dpi': max(dpi, MIN_TARGET_DPI), 'quality': min(max(quality, 1), 95)}
+
+
+def settings_profile(settings: dict) -> str:
+    """Short label of the output profile (stored in the split manifest)"""
+    if not settings:
+        return 'lossless'
+    return f"images-{settings['dpi']}dpi-q{settings['quality']}"
+
+
+def _stream_length(obj) -> int:
+    # Encoded size; pypdf drops /Length from parsed stream dictionaries
+    # and has no public accessor for the raw bytes
+    return len(getattr(obj, '_data', b''))
+
+
+def _is_candidate(obj) -> bool:
+    """Plain 8-bit gray/RGB images without masks (masks, bilevel scans and CMYK are kept)"""
+    return (
+        obj.get('/Subtype') == '/Image'
+        and not obj.get('/ImageMask', False)
+        and obj.get('/BitsPerComponent', 8) == 8
+        and '/SMask' not in obj
+        and '/Mask' not in obj
+        and _stream_length(obj) >= MIN_IMAGE_BYTES
+    )
+
+
+def downsample_page_images(page, settings: dict, stats: dict):
+    """
+    Resample the page's image XObjects above the target DPI
+
+    DPI is estimated from the image size over the page size, which is
+    exact for full-page scans and underestimates (so leaves alone)
+    images drawn smaller than the page.
+    """
+    resources = page.get('/Resources')
+    if resources is None or '/XObject' not in resources.get_object():
+        return
+    page_width_in = float(page.mediabox.width) / 72
+    page_height_in = float(page.mediabox.height) / 72
+
+    for name, ref in resources.get_object()['/XObject'].get_object().items():
+        obj = ref.get_object()
+        if not _is_candidate(obj):
+            continue
+        dpi = max(int(obj['/Width']) / page_width_in, int(obj['/Height']) / page_height_in)
+        if dpi <= settings['dpi'] * RESAMPLE_THRESHOLD:
+            continue
+
+        image_file = page.images[name]
+        image = image_file.image
+        if image.mode not in ('L', 'RGB'):
+            stats['imagesSkipped'] += 1
+            continue
+
+        scale = settings['dpi'] / dpi
+        resized = image.resize(
+            (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+            Image.LANCZOS
+        )
+        before = _stream_length(obj)
+        image_file.replace(resized, quality=settings['quality'])
+        after = _stream_length(image_file.indirect_reference.get_object())
+
+        stats['imagesResampled'] += 1
+        stats['imageBytesBefore'] += before
+        stats['imageBytesAfter'] += after
+
+
+def write_downsampled_pdf(pdf_stream, settings: dict, output) -> dict:
+    """
+    Write a copy of the PDF with downsampled images (then the lossless
+    optimizations) to `output`
+
+    Pages are copied one at a time and the reader's parsed originals are
+    released periodically, so only the re-encoded images accumulate.
+
+    Returns:
+        dict: Stats (image counts and bytes, per-page milliseconds)
+    """
+    reader = PdfReader(pdf_stream)
+    writer = PdfWriter()
+    stats = {
+        'profile': settings_profile(settings),
+        'imagesResampled': 0,
+        'imagesSkipped': 0,
+        'imageBytesBefore': 0,
+        'imageBytesAfter': 0,
+        'pageMs': []
+    }
+
+    for page_num, page in enumerate(reader.pages):
+        start_time = time.perf_counter()
+        downsample_page_images(writer.add_page(page), settings, stats)
+        stats['pageMs'].append(round((time.perf_counter() - start_time) * 1000, 1))
+        if (page_num + 1) % RELEASE_EVERY_PAGES == 0:
+            reader.resolved_objects.clear()
+            gc.collect()
+
+    optimize_writer(writer)
+    writer.write(output)
+    return stats
+
+
+def summarize_stats(stats: dict, size_before: int, size_after: int) -> dict:
+    """Size reduction and per-page timing summary for logs and results"""
+    page_ms = stats['pageMs']
+    slowest = max(range(len(page_ms)), key=page_ms.__getitem__) if page_ms else None
+    return {
+        'profile': stats['profile'],
+        'sizeBeforeMb': round(size_before / 1024 / 1024, 2),
+        'sizeAfterMb': round(size_after / 1024 / 1024, 2),
+        'reductionPercent': round((1 - size_after / size_before) * 100, 1) if size_before else 0,
+        'imagesResampled': stats['imagesResampled'],
+        'imagesSkipped': stats['imagesSkipped'],
+        'pages': len(page_ms),
+        'avgPageMs': round(sum(page_ms) / len(page_ms), 1) if page_ms else 0,
+        'maxPageMs': page_ms[slowest] if page_ms else 0,
+        'slowestPage': slowest + 1 if page_ms else None,
+        'pageMs': page_ms
+    }
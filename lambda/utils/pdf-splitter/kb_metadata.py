@@ -0,0 +1,123 @@
+"""
+EleKnowledge-AI PDF Splitter - Knowledge Base Metadata Sidecars
+Give every _partN object the filterable attributes of its source
+
+The Knowledge Base reads filter attributes from `<file>.metadata.json`,
+not from S3 user metadata. Each part's sidecar inherits the source's
+sidecar (or, without one, attributes derived from the source's S3 user
+metadata) and adds the part and page range:
+
+    manual_part2.pdf.metadata.json
+    {"metadataAttributes": {"document": "manual", "product": "ProductA", ...,
+                            "sourceDocument": "manuals/manual.pdf",
+                            "part": 2, "partCount": 3, "startPage": 51, "endPage": 97}}
+"""
+import hashlib
+import json
+from botocore.exceptions import ClientError
+
+# Sidecar settings
+METADATA_SUFFIX = '.metadata.json'
+SIDECAR_SHA256_METADATA_KEY = 'sidecar-sha256'
+
+# S3 user metadata (x-amz-meta-*) -> Knowledge Base attribute, used when
+# the source has no sidecar of its own
+USER_METADATA_ATTRIBUTES = {
+    'document-type': 'document',
+    'product': 'product',
+    'model': 'model',
+    'title': 'title',
+    'category': 'category',
+    'department': 'department',
+    'version': 'version'
+}
+
+
+def metadata_sidecar_key(key: str) -> str:
+    """Knowledge Base metadata file of an object (manual_part1.pdf -> manual_part1.pdf.metadata.json)"""
+    return key + METADATA_SUFFIX
+
+
+def load_source_attributes(s3_client, bucket: str, source_key: str, user_metadata: dict) -> dict:
+    """
+    Filterable attributes of a source PDF
+
+    The source's own sidecar wins; otherwise the known S3 user metadata
+    keys are mapped. The title defaults to the file name.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=metadata_sidecar_key(source_key))
+        attributes = json.loads(response['Body'].read()).get('metadataAttributes', {})
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        attributes = {
+            attribute: user_metadata[name]
+            for name, attribute in USER_METADATA_ATTRIBUTES.items()
+            if user_metadata.get(name)
+        }
+    except json.JSONDecodeError as e:
+        print(f"Ignoring invalid metadata sidecar of {source_key}: {e}")
+        attributes = {}
+
+    attributes.setdefault('title', source_key.rsplit('/', 1)[-1].rsplit('.', 1)[0])
+    return attributes
+
+
+def build_part_sidecar(attributes: dict, source_key: str, chunk: dict, part: int, part_count: int) -> bytes:
+    """Sidecar body of one part"""
+    return json.dumps({
+        'metadataAttributes': {
+            **attributes,
+            'sourceDocument': source_key,
+            'part': part,
+            'partCount': part_count,
+            'startPage': int(chunk['startPage']),
+            'endPage': int(chunk['endPage'])
+        }
+    }, ensure_ascii=False, sort_keys=True).encode('utf-8')
+
+
+def _sidecar_sha256(s3_client, bucket: str, key: str) -> str:
+    try:
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+    return response.get('Metadata', {}).get(SIDECAR_SHA256_METADATA_KEY)
+
+
+def write_part_sidecars(s3_client, bucket: str, source_key: str, chunks: list, user_metadata: dict) -> int:
+    """
+    Write the metadata sidecar of every part
+
+    Unchanged sidecars (same body hash) are not rewritten, so they do not
+    trigger another Knowledge Base ingestion.
+
+    Args:
+        chunks: Chunk records (key, startPage, endPage) in page order,
+            fresh from the split or from the manifest
+
+    Returns:
+        int: Number of sidecars written
+    """
+    attributes = load_source_attributes(s3_client, bucket, source_key, user_metadata)
+    written = 0
+    for part, chunk in enumerate(chunks, start=1):
+        key = metadata_sidecar_key(chunk['key'])
+        body = build_part_sidecar(attributes, source_key, chunk, part, len(chunks))
+        sha256 = hashlib.sha256(body).hexdigest()
+        if _sidecar_sha256(s3_client, bucket, key) == sha256:
+            continue
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType='application/json',
+            Metadata={SIDECAR_SHA256_METADATA_KEY: sha256}
+        )
+        written += 1
+
+    print(f"Metadata sidecars for {source_key}: {written} written, {len(chunks) - written} unchanged")
+    return written
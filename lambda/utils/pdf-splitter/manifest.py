@@ -0,0 +1,114 @@
+"""
+EleKnowledge-AI PDF Splitter - Split Manifest
+DynamoDB record of what was produced for each source PDF version
+
+Item (partition key: sourceKey):
+    status: 'processing' | 'completed' | 'failed'
+    etag: ETag of the source version the chunks were produced from
+    profile: Output profile ('lossless' or the image downsampling settings)
+    chunks: [{key, sha256, size, startPage, endPage}]
+    leaseOwner / leaseExpiresAt / processingEtag: set while a worker
+        is splitting; other workers back off until the lease expires
+"""
+import time
+from botocore.exceptions import ClientError
+
+# Lease settings (a little longer than the splitter's 900s timeout, so a
+# crashed worker's lease expires before SQS redelivers the message)
+LEASE_SECONDS = 960
+
+
+def get_manifest(table, source_key: str) -> dict:
+    """Get the manifest of a source PDF (None if it was never split)"""
+    response = table.get_item(Key={'sourceKey': source_key}, ConsistentRead=True)
+    return response.get('Item')
+
+
+def is_completed(manifest: dict, etag: str, profile: str) -> bool:
+    """True if this exact source version was already split with the same profile"""
+    return (bool(manifest) and manifest.get('status') == 'completed'
+            and manifest.get('etag') == etag and manifest.get('profile') == profile)
+
+
+def acquire_lease(table, source_key: str, etag: str, profile: str, owner: str) -> bool:
+    """
+    Take the processing lease for a source PDF
+
+    Fails if another worker holds an unexpired lease, or if this version
+    is already completed with the same profile. The previous chunk list
+    is kept so stale parts can be cleaned up afterwards.
+
+    Returns:
+        bool: True if the lease was acquired
+    """
+    now = int(time.time())
+    try:
+        table.update_item(
+            Key={'sourceKey': source_key},
+            UpdateExpression='SET #status = :processing, processingEtag = :etag, '
+                             'leaseOwner = :owner, leaseExpiresAt = :expires, updatedAt = :now',
+            ConditionExpression='(attribute_not_exists(sourceKey) OR #status <> :processing '
+                                'OR leaseExpiresAt < :now) '
+                                'AND NOT (#status = :completed AND etag = :etag AND profile = :profile)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':processing': 'processing',
+                ':completed': 'completed',
+                ':etag': etag,
+                ':profile': profile,
+                ':owner': owner,
+                ':expires': now + LEASE_SECONDS,
+                ':now': now
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+
+def complete_manifest(table, source_key: str, etag: str, profile: str, owner: str, chunks: list):
+    """Record the produced chunks and release the lease"""
+    table.update_item(
+        Key={'sourceKey': source_key},
+        UpdateExpression='SET #status = :completed, etag = :etag, profile = :profile, chunks = :chunks, '
+                         'updatedAt = :now '
+                         'REMOVE leaseOwner, leaseExpiresAt, processingEtag, lastError',
+        ConditionExpression='leaseOwner = :owner',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':completed': 'completed',
+            ':etag': etag,
+            ':profile': profile,
+            ':chunks': chunks,
+            ':owner': owner,
+            ':now': int(time.time())
+        }
+    )
+
+
+def release_lease(table, source_key: str, owner: str, error: str):
+    """Release the lease after a failure so a retry can start immediately"""
+    try:
+        table.update_item(
+            Key={'sourceKey': source_key},
+            UpdateExpression='SET #status = :failed, lastError = :error, updatedAt = :now '
+                             'REMOVE leaseOwner, leaseExpiresAt, processingEtag',
+            ConditionExpression='leaseOwner = :owner',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':failed': 'failed',
+                ':error': error[:1000],
+                ':owner': owner,
+                ':now': int(time.time())
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            print(f"Error releasing lease for {source_key}: {e}")
+
+
+def delete_manifest(table, source_key: str):
+    """Forget a source PDF that no longer needs splitting"""
+    table.delete_item(Key={'sourceKey': source_key})
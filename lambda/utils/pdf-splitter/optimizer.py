@@ -0,0 +1,165 @@
+"""
+EleKnowledge-AI PDF Splitter - Lossless Optimizer
+Shrink a PDF without changing how any page renders
+
+- Identical objects (fonts embedded once per page, repeated images) are
+  merged and unreferenced objects dropped
+- Uncompressed content streams are Flate-compressed
+- Page resources the page's content never names are removed
+- XMP metadata streams, thumbnails and application private data
+  (/PieceInfo) are dropped; the small /Info dictionary is kept
+"""
+import gc
+import re
+from io import BytesIO
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject
+
+# Optimization settings
+CONTENT_COMPRESSION_LEVEL = 6
+REMOVABLE_ROOT_KEYS = ('/Metadata', '/PieceInfo')
+REMOVABLE_PAGE_KEYS = ('/Thumb', '/PieceInfo', '/Metadata')
+PRUNABLE_RESOURCE_TYPES = ('/Font', '/XObject', '/ExtGState')
+NAME_TOKEN = re.compile(rb'/([^\s/\[\]()<>{}%]+)')
+RELEASE_EVERY_PAGES = 20  # Drop the reader's parsed originals this often
+
+
+def _content_streams(page) -> list:
+    contents = page.get('/Contents')
+    if contents is None:
+        return []
+    contents = contents.get_object()
+    if isinstance(contents, ArrayObject):
+        return [item.get_object() for item in contents]
+    return [contents]
+
+
+def compress_page_contents(page) -> bool:
+    """Flate-compress the page's content if any of its streams is unfiltered"""
+    streams = _content_streams(page)
+    if not streams or all('/Filter' in stream for stream in streams):
+        return False
+    page.compress_content_streams(level=CONTENT_COMPRESSION_LEVEL)
+    return True
+
+
+def _has_inheriting_streams(resources) -> bool:
+    """True if a form XObject or pattern has no /Resources of its own (it then uses the page's)"""
+    for resource_type in ('/XObject', '/Pattern'):
+        if resource_type not in resources:
+            continue
+        for value in resources[resource_type].get_object().values():
+            obj = value.get_object()
+            if obj.get('/Subtype') == '/Form' or resource_type == '/Pattern':
+                if '/Resources' not in obj and obj.get('/PatternType', 1) == 1:
+                    return True
+    return False
+
+
+def prune_unused_resources(page) -> int:
+    """
+    Remove /Font, /XObject and /ExtGState entries the page content never
+    names
+
+    The scan is deliberately conservative: any name token anywhere in the
+    content (including strings and comments) keeps the resource. Shared
+    resource dictionaries are copied before editing so other pages keep
+    theirs. Pages whose forms or patterns borrow the page resources, and
+    resources inherited from the page tree, are left alone.
+
+    Returns:
+        int: Number of resource entries removed
+    """
+    if '/Resources' not in page:
+        return 0
+    resources = page['/Resources'].get_object()
+    if _has_inheriting_streams(resources):
+        return 0
+
+    used = set()
+    for stream in _content_streams(page):
+        used.update(match.decode('latin-1') for match in NAME_TOKEN.findall(stream.get_data()))
+
+    pruned = DictionaryObject(resources)
+    removed = 0
+    for resource_type in PRUNABLE_RESOURCE_TYPES:
+        if resource_type not in resources:
+            continue
+        entries = resources[resource_type].get_object()
+        # Escaped names (#xx) are compared as written; keep them to be safe
+        kept = DictionaryObject({
+            name: value for name, value in entries.items()
+            if name[1:] in used or '#' in name
+        })
+        if len(kept) < len(entries):
+            removed += len(entries) - len(kept)
+            pruned[NameObject(resource_type)] = kept
+
+    if removed:
+        page[NameObject('/Resources')] = pruned
+    return removed
+
+
+def optimize_writer(writer: PdfWriter) -> dict:
+    """
+    Apply the lossless optimizations to everything in a PdfWriter
+
+    Returns:
+        dict: Counts of what was changed
+    """
+    stats = {'compressedPages': 0, 'prunedResources': 0, 'removedEntries': 0}
+
+    for key in REMOVABLE_ROOT_KEYS:
+        if key in writer.root_object:
+            del writer.root_object[key]
+            stats['removedEntries'] += 1
+
+    for page in writer.pages:
+        for key in REMOVABLE_PAGE_KEYS:
+            if key in page:
+                del page[key]
+                stats['removedEntries'] += 1
+        stats['prunedResources'] += prune_unused_resources(page)
+        if compress_page_contents(page):
+            stats['compressedPages'] += 1
+
+    writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+    return stats
+
+
+def optimize_pdf(pdf_stream) -> tuple:
+    """
+    Optimize a whole PDF in memory
+
+    Returns:
+        tuple: (optimized BytesIO, stats dict)
+    """
+    writer = PdfWriter(clone_from=PdfReader(pdf_stream))
+    stats = optimize_writer(writer)
+    output = BytesIO()
+    writer.write(output)
+    return output, stats
+
+
+def write_optimized_pdf(pdf_stream, output) -> dict:
+    """
+    Write an optimized copy of a large (memory-mapped) PDF to `output`
+
+    Pages are copied one at a time and the reader's parsed originals are
+    released periodically, so only the copy is held in memory. Unlike
+    optimize_pdf, document-level entries (outlines, names) are not kept.
+
+    Returns:
+        dict: Counts of what was changed
+    """
+    reader = PdfReader(pdf_stream)
+    writer = PdfWriter()
+    for page_num, page in enumerate(reader.pages):
+        writer.add_page(page)
+        if (page_num + 1) % RELEASE_EVERY_PAGES == 0:
+            reader.resolved_objects.clear()
+            gc.collect()
+
+    stats = optimize_writer(writer)
+    writer.write(output)
+    return stats
@@ -0,0 +1,145 @@
+"""
+EleKnowledge-AI PDF Split Planner
+Size-aware page range planning in a single pass over the object graph
+
+Each indirect object is measured once. Objects shared between pages
+(fonts, images, form XObjects) are counted once per chunk, matching how
+PdfWriter deduplicates them when the pages are written together.
+"""
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+
+# Estimation settings
+PER_OBJECT_OVERHEAD_BYTES = 40  # "N 0 obj ... endobj" wrapper + xref entry
+FILE_OVERHEAD_BYTES = 4096  # Header, page tree, trailer
+FILL_TARGET = 0.97  # Leave headroom for estimation error before the verifying write
+
+
+class ByteCounter:
+    """Write-only stream that only counts bytes"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.size
+
+
+def measure_object(obj) -> int:
+    """Serialized size of a single (already resolved) PDF object"""
+    counter = ByteCounter()
+    obj.write_to_stream(counter)
+    return counter.size + PER_OBJECT_OVERHEAD_BYTES
+
+
+def _is_page(obj) -> bool:
+    return isinstance(obj, DictionaryObject) and obj.get('/Type') == '/Page'
+
+
+def measure_page_objects(reader, release_objects: bool = False) -> tuple:
+    """
+    Walk every page's object graph once
+
+    Args:
+        release_objects: Drop the reader's parsed-object cache after each
+            page so stream data is not held for the whole document
+            (objects are re-parsed from the source on demand)
+
+    Returns:
+        tuple: (page_objects, object_sizes)
+            page_objects: list of sets of object keys referenced by each page
+            object_sizes: {object key: serialized size in bytes}
+    """
+    object_sizes = {}
+    page_objects = []
+
+    for page in reader.pages:
+        page_ref = page.indirect_reference
+        page_key = (page_ref.idnum, page_ref.generation) if page_ref else None
+        referenced = set()
+
+        if page_key:
+            referenced.add(page_key)
+            if page_key not in object_sizes:
+                object_sizes[page_key] = measure_object(page)
+
+        stack = [page]
+        while stack:
+            obj = stack.pop()
+
+            if isinstance(obj, IndirectObject):
+                key = (obj.idnum, obj.generation)
+                if key in referenced:
+                    continue
+                resolved = obj.get_object()
+                # Links to other pages do not pull those pages into the chunk
+                if key != page_key and _is_page(resolved):
+                    continue
+                referenced.add(key)
+                if key not in object_sizes:
+                    object_sizes[key] = measure_object(resolved)
+                stack.append(resolved)
+
+            elif isinstance(obj, DictionaryObject):
+                for name, value in obj.items():
+                    if name != '/Parent':
+                        stack.append(value)
+
+            elif isinstance(obj, ArrayObject):
+                stack.extend(obj)
+
+        page_objects.append(referenced)
+        if release_objects:
+            reader.resolved_objects.clear()
+
+    return page_objects, object_sizes
+
+
+def plan_page_ranges(page_objects: list, object_sizes: dict, max_size_bytes: int,
+                     report_oversized: bool = True) -> list:
+    """
+    Greedily fill chunks up to the size budget
+
+    Args:
+        report_oversized: Log pages that exceed the budget on their own
+
+    Returns:
+        list: [(start_page, end_page_exclusive), ...]
+    """
+    budget = int(max_size_bytes * FILL_TARGET) - FILE_OVERHEAD_BYTES
+    ranges = []
+    chunk_start = 0
+    chunk_objects = set()
+    chunk_size = 0
+
+    for page_num, referenced in enumerate(page_objects):
+        new_objects = referenced - chunk_objects
+        added_size = sum(object_sizes[key] for key in new_objects)
+
+        if chunk_size + added_size > budget and page_num > chunk_start:
+            ranges.append((chunk_start, page_num))
+            chunk_start = page_num
+            chunk_objects = set()
+            new_objects = referenced
+            added_size = sum(object_sizes[key] for key in new_objects)
+            chunk_size = 0
+
+        if added_size > budget and report_oversized:
+            print(f"Page {page_num + 1} alone is ~{added_size / 1024 / 1024:.1f} MB and exceeds the limit")
+
+        chunk_objects |= new_objects
+        chunk_size += added_size
+
+    if chunk_start < len(page_objects):
+        ranges.append((chunk_start, len(page_objects)))
+
+    return ranges
+
+
+def estimate_range_size(page_objects: list, object_sizes: dict, start: int, end: int) -> int:
+    """Estimated file size of a page range (shared objects counted once)"""
+    objects = set().union(*page_objects[start:end]) if end > start else set()
+    return sum(object_sizes[key] for key in objects) + FILE_OVERHEAD_BYTES
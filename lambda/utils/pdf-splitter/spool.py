@@ -0,0 +1,92 @@
+"""
+EleKnowledge-AI PDF Splitter - Disk Spooling
+Bounded-memory I/O: ranged downloads to /tmp, memory-mapped reading,
+and temporary chunk files
+"""
+import mmap
+import os
+import shutil
+import tempfile
+
+# Spooling settings
+TMP_DIR = os.environ.get('SPOOL_DIR', '/tmp')
+DOWNLOAD_PART_SIZE_BYTES = 8 * 1024 * 1024
+READ_BLOCK_SIZE_BYTES = 1024 * 1024
+
+
+def download_to_file(s3_client, bucket: str, key: str, file_size: int, etag: str = None) -> str:
+    """
+    Download an S3 object to a temporary file using ranged GETs
+
+    Only one READ_BLOCK_SIZE_BYTES block is in memory at a time. IfMatch
+    keeps all ranges on the same object version.
+
+    Returns:
+        str: Path of the temporary file (caller removes it)
+    """
+    fd, path = tempfile.mkstemp(suffix='.pdf', dir=TMP_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for start in range(0, file_size, DOWNLOAD_PART_SIZE_BYTES):
+                end = min(start + DOWNLOAD_PART_SIZE_BYTES, file_size) - 1
+                request = {'Bucket': bucket, 'Key': key, 'Range': f"bytes={start}-{end}"}
+                if etag:
+                    request['IfMatch'] = etag
+                response = s3_client.get_object(**request)
+                for block in response['Body'].iter_chunks(READ_BLOCK_SIZE_BYTES):
+                    f.write(block)
+    except Exception:
+        remove_file(path)
+        raise
+    return path
+
+
+class MappedFile:
+    """Read-only memory map of a file usable as a PdfReader stream"""
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self.map
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def spool_stream(stream) -> str:
+    """
+    Copy a seekable stream (BytesIO, mmap) to a temporary file
+
+    Returns:
+        str: Path of the temporary file (caller removes it)
+    """
+    path = new_chunk_path()
+    try:
+        stream.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(stream, f, READ_BLOCK_SIZE_BYTES)
+    except Exception:
+        remove_file(path)
+        raise
+    return path
+
+
+def new_chunk_path() -> str:
+    """Create an empty temporary file for a chunk"""
+    fd, path = tempfile.mkstemp(suffix='.pdf', dir=TMP_DIR)
+    os.close(fd)
+    return path
+
+
+def remove_file(path: str):
+    """Remove a temporary file, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
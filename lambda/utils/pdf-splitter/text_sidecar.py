@@ -0,0 +1,200 @@
+"""
+EleKnowledge-AI PDF Splitter - Text Sidecars
+Extract every page's text in parallel worker processes and store it as a
+gzip JSONL sidecar per chunk in the sidecar bucket (TEXT_SIDECAR_BUCKET,
+same key as the chunk), outside the bucket the Knowledge Base ingests
+
+    manual_part2.pdf -> manual_part2.pages.jsonl.gz
+    {"page": 51, "partPage": 1, "text": "..."}   (page = original page number)
+
+Workers are started by a fork server and connected by pipes: Lambda has no
+/dev/shm, so multiprocessing.Pool and Queue are unavailable. Plain fork is
+not safe here, since record and upload threads run meanwhile and a child
+could inherit one of their locks. Each worker memory-maps the source file
+and extracts a contiguous page range.
+"""
+import gzip
+import json
+import multiprocessing
+import os
+import time
+from botocore.exceptions import ClientError
+from pypdf import PdfReader
+from spool import MappedFile, spool_stream, remove_file
+from upload_pipeline import SHA256_METADATA_KEY
+
+# Sidecar settings
+TEXT_SIDECAR_BUCKET = os.environ.get('TEXT_SIDECAR_BUCKET')
+TEXT_SIDECARS_ENABLED = bool(TEXT_SIDECAR_BUCKET) and os.environ.get('TEXT_SIDECARS', 'true').lower() == 'true'
+TEXT_WORKERS = int(os.environ.get('TEXT_WORKERS', '0')) or os.cpu_count() or 1
+SIDECAR_SUFFIX = '.pages.jsonl.gz'
+GZIP_LEVEL = 6
+WORKER_JOIN_TIMEOUT_SECONDS = 5
+
+
+def sidecar_key(pdf_key: str) -> str:
+    """Sidecar object key of a chunk (manual_part2.pdf -> manual_part2.pages.jsonl.gz)"""
+    return pdf_key.rsplit('.', 1)[0] + SIDECAR_SUFFIX
+
+
+def extract_range(pdf_stream, start: int, end: int) -> tuple:
+    """
+    Extract the text of pages [start, end)
+
+    Returns:
+        tuple: (list of page texts, list of page numbers that failed)
+    """
+    reader = PdfReader(pdf_stream)
+    texts = []
+    failed = []
+    for page_num in range(start, end):
+        try:
+            texts.append(reader.pages[page_num].extract_text() or '')
+        except Exception:
+            texts.append('')
+            failed.append(page_num + 1)
+    return texts, failed
+
+
+def _extract_worker(conn, source_path: str, start: int, end: int):
+    try:
+        with MappedFile(source_path) as pdf_stream:
+            conn.send(('ok', extract_range(pdf_stream, start, end)))
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def extract_page_texts(pdf_stream, page_count: int, workers: int, source_path: str = None) -> list:
+    """
+    Extract the text of every page, splitting the pages into `workers`
+    contiguous ranges processed in parallel
+
+    Args:
+        source_path: File holding pdf_stream, if any (otherwise the stream
+            is copied to /tmp for the workers)
+
+    Returns:
+        list: Page texts in page order ('' for pages that failed)
+    """
+    workers = max(1, min(workers, page_count))
+    if workers == 1:
+        texts, failed = extract_range(pdf_stream, 0, page_count)
+        results = [(texts, failed)]
+    else:
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        bounds = [page_count * i // workers for i in range(workers + 1)]
+        spooled_path = None if source_path else spool_stream(pdf_stream)
+        processes = []
+        try:
+            for start, end in zip(bounds, bounds[1:]):
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=_extract_worker,
+                                          args=(sender, source_path or spooled_path, start, end),
+                                          daemon=True)
+                process.start()
+                sender.close()
+                processes.append((process, receiver))
+
+            results = []
+            for (process, receiver), start in zip(processes, bounds):
+                try:
+                    status, result = receiver.recv()
+                except EOFError:
+                    process.join()
+                    raise RuntimeError(f"Text worker for pages from {start + 1} exited "
+                                       f"with code {process.exitcode}")
+                if status == 'error':
+                    raise RuntimeError(f"Text worker for pages from {start + 1} failed: {result}")
+                results.append(result)
+        finally:
+            for process, receiver in processes:
+                receiver.close()
+                process.join(WORKER_JOIN_TIMEOUT_SECONDS)
+                if process.is_alive():
+                    process.terminate()
+            if spooled_path:
+                remove_file(spooled_path)
+
+    failed = [page for _, range_failed in results for page in range_failed]
+    if failed:
+        print(f"Text extraction failed on {len(failed)} pages: {failed[:20]}")
+    return [text for range_texts, _ in results for text in range_texts]
+
+
+def build_sidecar(texts: list, start_page: int, end_page: int) -> bytes:
+    """Gzip JSONL of pages start_page..end_page (1-based, inclusive) of the original"""
+    lines = [
+        json.dumps({'page': page, 'partPage': page - start_page + 1, 'text': texts[page - 1]},
+                   ensure_ascii=False)
+        for page in range(start_page, end_page + 1)
+    ]
+    return gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'), compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _is_current(s3_client, key: str, sha256: str) -> bool:
+    try:
+        response = s3_client.head_object(Bucket=TEXT_SIDECAR_BUCKET, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+    return response.get('Metadata', {}).get(SHA256_METADATA_KEY) == sha256
+
+
+def write_text_sidecars(s3_client, chunks: list, pdf_stream, source_path: str = None) -> dict:
+    """
+    Write a text sidecar for every chunk whose sidecar is missing or was
+    made from different chunk bytes (tagged with the chunk's SHA-256)
+
+    Args:
+        chunks: Chunk records (key, sha256, startPage, endPage) in page order
+        pdf_stream: The split source (pages numbered as in the original)
+        source_path: File holding pdf_stream, if any
+
+    Returns:
+        dict: Sidecar counts and extraction throughput
+    """
+    pending = [chunk for chunk in chunks
+               if not _is_current(s3_client, sidecar_key(chunk['key']), chunk['sha256'])]
+    report = {'sidecars': len(chunks), 'written': len(pending), 'pages': 0, 'workers': 0,
+              'extractSeconds': 0, 'pagesPerSecond': None}
+    if not pending:
+        return report
+
+    page_count = chunks[-1]['endPage']
+    workers = max(1, min(TEXT_WORKERS, page_count))
+    start_time = time.perf_counter()
+    texts = extract_page_texts(pdf_stream, page_count, workers, source_path)
+    elapsed = time.perf_counter() - start_time
+
+    for chunk in pending:
+        s3_client.put_object(
+            Bucket=TEXT_SIDECAR_BUCKET,
+            Key=sidecar_key(chunk['key']),
+            Body=build_sidecar(texts, chunk['startPage'], chunk['endPage']),
+            ContentType='application/gzip',
+            Metadata={SHA256_METADATA_KEY: chunk['sha256']}
+        )
+
+    report.update({
+        'pages': page_count,
+        'workers': workers,
+        'extractSeconds': round(elapsed, 2),
+        'pagesPerSecond': round(page_count / elapsed, 1) if elapsed else None
+    })
+    return report
+
+
+def delete_text_sidecars(s3_client, part_keys: list):
+    """Delete the sidecars of removed chunks"""
+    if not TEXT_SIDECAR_BUCKET:
+        return
+    keys = [sidecar_key(part_key) for part_key in part_keys]
+    for i in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=TEXT_SIDECAR_BUCKET,
+            Delete={'Objects': [{'Key': key} for key in keys[i:i + 1000]], 'Quiet': True}
+        )
@@ -0,0 +1,219 @@
+"""
+EleKnowledge-AI PDF Splitter - Upload Pipeline
+Upload chunks while the splitter is still writing the next ones
+
+Each chunk is sent as an S3 multipart upload whose parts go through a
+shared thread pool. A failed part is retried on its own; the rest of
+the file is not re-sent. The number of chunks waiting for upload is
+capped so memory (or /tmp) use stays bounded.
+
+Chunks whose existing S3 object already has the same SHA-256 (stored in
+the object metadata) are not uploaded again, so re-splitting a manual
+with small changes does not re-trigger ingestion of unchanged parts.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from spool import remove_file
+
+# Upload settings
+PART_SIZE_BYTES = 8 * 1024 * 1024  # S3 multipart minimum is 5 MB
+UPLOAD_CONCURRENCY = int(os.environ.get('UPLOAD_CONCURRENCY', '8'))  # Parts in flight
+MAX_QUEUED_CHUNKS = int(os.environ.get('MAX_QUEUED_CHUNKS', '2'))  # Written, not yet uploaded
+MAX_PART_ATTEMPTS = 3
+RETRY_BASE_DELAY_SECONDS = 0.5
+SHA256_METADATA_KEY = 'chunk-sha256'
+
+
+def chunk_object_key(base_key: str, chunk_index: int) -> str:
+    """S3 key of a chunk: manual.pdf -> manual_part1.pdf"""
+    key_parts = base_key.rsplit('.', 1)
+    if len(key_parts) == 2:
+        return f"{key_parts[0]}_part{chunk_index + 1}.{key_parts[1]}"
+    return f"{base_key}_part{chunk_index + 1}"
+
+
+def chunk_sha256(chunk: dict) -> str:
+    """SHA-256 of a chunk's bytes"""
+    digest = hashlib.sha256()
+    if 'path' in chunk:
+        with open(chunk['path'], 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        with chunk['stream'].getbuffer() as view:
+            digest.update(view)
+    return digest.hexdigest()
+
+
+def read_part(chunk: dict, offset: int, size: int) -> bytes:
+    """Read one part of a chunk from memory ('stream') or disk ('path')"""
+    if 'path' in chunk:
+        with open(chunk['path'], 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
+    return bytes(chunk['stream'].getbuffer()[offset:offset + size])
+
+
+def release_chunk(chunk: dict):
+    """Free a chunk's buffer or temporary file"""
+    if 'path' in chunk:
+        remove_file(chunk['path'])
+    stream = chunk.pop('stream', None)
+    if stream is not None:
+        stream.close()
+
+
+def upload_part_with_retry(s3_client, bucket: str, key: str, upload_id: str,
+                           part_number: int, chunk: dict, offset: int, size: int) -> dict:
+    """Upload one part, retrying only this part on failure"""
+    for attempt in range(1, MAX_PART_ATTEMPTS + 1):
+        try:
+            response = s3_client.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=read_part(chunk, offset, size)
+            )
+            return {'ETag': response['ETag'], 'PartNumber': part_number}
+        except Exception as e:
+            if attempt == MAX_PART_ATTEMPTS:
+                raise
+            print(f"Part {part_number} of {key} failed (attempt {attempt}): {e}")
+            time.sleep(RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+
+
+def upload_chunk(s3_client, part_executor, bucket: str, key: str, chunk: dict, metadata: dict):
+    """
+    Upload a chunk, as a multipart upload when it spans more than one part
+
+    The multipart upload is aborted if any part fails for good, so no
+    orphaned parts are left behind.
+    """
+    if chunk['size'] <= PART_SIZE_BYTES:
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=read_part(chunk, 0, chunk['size']),
+            ContentType='application/pdf',
+            Metadata=metadata
+        )
+        return
+
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        ContentType='application/pdf',
+        Metadata=metadata
+    )['UploadId']
+
+    try:
+        futures = [
+            part_executor.submit(
+                upload_part_with_retry, s3_client, bucket, key, upload_id,
+                part_number, chunk, offset, min(PART_SIZE_BYTES, chunk['size'] - offset)
+            )
+            for part_number, offset in enumerate(range(0, chunk['size'], PART_SIZE_BYTES), start=1)
+        ]
+        parts = [future.result() for future in futures]
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except Exception:
+        try:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except ClientError as e:
+            print(f"Error aborting multipart upload of {key}: {e}")
+        raise
+
+
+class ChunkUploadPipeline:
+    """
+    Accept chunks from the splitter and upload them in the background
+
+    submit() blocks while MAX_QUEUED_CHUNKS chunks are already waiting or
+    uploading, so at most MAX_QUEUED_CHUNKS + 1 chunks (the one being
+    written) exist at a time.
+
+    Usage:
+        with ChunkUploadPipeline(s3_client, bucket, key, metadata) as pipeline:
+            for chunk in chunks:
+                pipeline.submit(chunk)
+            chunks = pipeline.results()
+    """
+
+    def __init__(self, s3_client, bucket: str, base_key: str, metadata: dict):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.base_key = base_key
+        self.metadata = metadata
+        self.slots = threading.BoundedSemaphore(MAX_QUEUED_CHUNKS)
+        self.chunk_executor = ThreadPoolExecutor(max_workers=MAX_QUEUED_CHUNKS)
+        self.part_executor = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY)
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.chunk_executor.shutdown(wait=True)
+        self.part_executor.shutdown(wait=True)
+
+    def _is_unchanged(self, key: str, sha256: str) -> bool:
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return response.get('Metadata', {}).get(SHA256_METADATA_KEY) == sha256
+
+    def _upload(self, chunk_index: int, chunk: dict) -> dict:
+        key = chunk_object_key(self.base_key, chunk_index)
+        try:
+            sha256 = chunk_sha256(chunk)
+            uploaded = not self._is_unchanged(key, sha256)
+            if uploaded:
+                metadata = {**self.metadata, SHA256_METADATA_KEY: sha256}
+                upload_chunk(self.s3_client, self.part_executor, self.bucket, key, chunk, metadata)
+            print(f"{'Uploaded' if uploaded else 'Unchanged'} chunk {chunk_index + 1}: {key} "
+                  f"({chunk['size'] / 1024 / 1024:.2f} MB, pages {chunk['startPage']}-{chunk['endPage']})")
+            return {
+                'key': key,
+                'sha256': sha256,
+                'size': chunk['size'],
+                'startPage': chunk['startPage'],
+                'endPage': chunk['endPage'],
+                'uploaded': uploaded
+            }
+        finally:
+            release_chunk(chunk)
+            self.slots.release()
+
+    def submit(self, chunk: dict):
+        """Queue a chunk for upload (blocks while the queue is full)"""
+        # Stop feeding the pipeline once an upload has failed for good
+        for future in self.futures:
+            if future.done() and future.exception():
+                release_chunk(chunk)
+                raise future.exception()
+
+        self.slots.acquire()
+        self.futures.append(self.chunk_executor.submit(self._upload, len(self.futures), chunk))
+
+    def results(self) -> list:
+        """
+        Wait for all uploads
+
+        Returns:
+            list: Chunk records (key, sha256, size, startPage, endPage,
+                uploaded) in page order
+        """
+        return [future.result() for future in self.futures]
@@ -0,0 +1,48 @@
+"""
+EleKnowledge-AI Tests
+Lambda layers and handler directories on sys.path, as in the deployed
+functions, plus the environment their modules read at import time
+"""
+import importlib.util
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIRS = [
+    os.path.join(ROOT_DIR, 'lambda', 'layers', 'shared', 'python'),
+    os.path.join(ROOT_DIR, 'lambda', 'layers', 'auth', 'python'),
+    os.path.join(ROOT_DIR, 'lambda', 'layers', 'warmup', 'python'),
+]
+# In-process AWS stand-ins (fake_dynamodb, fake_aws, local_s3)
+BENCHMARK_DIRS = [
+    os.path.join(ROOT_DIR, 'benchmarks', 'load'),
+    os.path.join(ROOT_DIR, 'benchmarks', 'pdf-splitter'),
+]
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('COGNITO_USER_POOL_ID', 'us-east-1_TestPool')
+os.environ.setdefault('COGNITO_CLIENT_ID', 'test-client')
+os.environ.setdefault('CHATLOGS_TABLE', 'test-chatlogs')
+os.environ.setdefault('DYNAMODB_CHATLOGS_TABLE', 'test-chatlogs')
+
+for path in LAYER_DIRS + BENCHMARK_DIRS:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def load_handler(function_dir: str, module_name: str):
+    """
+    Import a function's app.py under its own module name (every function
+    has an `app` module), with its directory on sys.path
+    """
+    path = os.path.join(ROOT_DIR, 'lambda', function_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(path, 'app.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
@@ -0,0 +1,118 @@
+"""Local verification of Cognito tokens (auth_tokens.verify_token)"""
+import base64
+import json
+import time
+
+import pytest
+
+import auth_tokens
+from auth_tokens import AuthError, verify_token
+from fake_aws import RsaSigningKey
+
+
+@pytest.fixture(scope='module')
+def signing_key():
+    return RsaSigningKey(bits=1024)
+
+
+@pytest.fixture(autouse=True)
+def jwks(monkeypatch, signing_key):
+    monkeypatch.setattr(auth_tokens, '_jwks', {signing_key.kid: (signing_key.modulus, signing_key.exponent)})
+    monkeypatch.setattr(auth_tokens, '_jwks_fetched_at', time.time())
+
+
+def make_claims(token_use='id', **overrides) -> dict:
+    now = int(time.time())
+    claims = {
+        'sub': 'user-1',
+        'iss': auth_tokens.issuer(),
+        'token_use': token_use,
+        'iat': now,
+        'exp': now + 3600,
+    }
+    claims['aud' if token_use == 'id' else 'client_id'] = auth_tokens.CLIENT_ID
+    claims.update(overrides)
+    return {key: value for key, value in claims.items() if value is not None}
+
+
+def test_valid_id_and_access_tokens(signing_key):
+    assert verify_token(signing_key.jwt(make_claims('id')))['sub'] == 'user-1'
+    assert verify_token(signing_key.jwt(make_claims('access')))['token_use'] == 'access'
+
+
+def test_token_use_restriction(signing_key):
+    token = signing_key.jwt(make_claims('access'))
+    assert verify_token(token, token_use='access')
+    with pytest.raises(AuthError, match='Wrong token type'):
+        verify_token(token, token_use='id')
+    with pytest.raises(AuthError, match='Wrong token type'):
+        verify_token(signing_key.jwt(make_claims(token_use='refresh')))
+
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'iss': 'https://cognito-idp.us-east-1.amazonaws.com/us-east-1_Other'}, 'another user pool'),
+    ({'aud': 'other-client'}, 'another app client'),
+    ({'aud': None}, 'another app client'),
+    ({'sub': None}, 'no subject'),
+])
+def test_rejects_wrong_claims(signing_key, overrides, message):
+    with pytest.raises(AuthError, match=message):
+        verify_token(signing_key.jwt(make_claims(**overrides)))
+
+
+def test_access_token_audience_is_client_id(signing_key):
+    with pytest.raises(AuthError, match='another app client'):
+        verify_token(signing_key.jwt(make_claims('access', client_id='other-client')))
+
+
+def test_expiry_allows_clock_skew(signing_key):
+    now = int(time.time())
+    assert verify_token(signing_key.jwt(make_claims(exp=now - auth_tokens.CLOCK_SKEW_SECONDS + 5)))
+    with pytest.raises(AuthError, match='expired'):
+        verify_token(signing_key.jwt(make_claims(exp=now - auth_tokens.CLOCK_SKEW_SECONDS - 5)))
+    with pytest.raises(AuthError, match='expired'):
+        verify_token(signing_key.jwt(make_claims(exp=None)))
+
+
+@pytest.mark.parametrize('claim', ['iat', 'nbf'])
+def test_rejects_tokens_not_yet_valid(signing_key, claim):
+    now = int(time.time())
+    assert verify_token(signing_key.jwt(make_claims(**{claim: now + auth_tokens.CLOCK_SKEW_SECONDS - 5})))
+    with pytest.raises(AuthError, match='not yet valid'):
+        verify_token(signing_key.jwt(make_claims(**{claim: now + auth_tokens.CLOCK_SKEW_SECONDS + 5})))
+    with pytest.raises(AuthError, match='not yet valid'):
+        verify_token(signing_key.jwt(make_claims(**{claim: 'soon'})))
+
+
+def test_rejects_tampered_payload(signing_key):
+    header, _, signature = signing_key.jwt(make_claims()).split('.')
+    payload = base64.urlsafe_b64encode(json.dumps(make_claims(sub='admin')).encode()).rstrip(b'=').decode()
+    with pytest.raises(AuthError, match='Invalid token signature'):
+        verify_token(f"{header}.{payload}.{signature}")
+
+
+def test_rejects_other_signing_key():
+    other_key = RsaSigningKey(bits=1024)
+    with pytest.raises(AuthError, match='Unknown signing key'):
+        verify_token(other_key.jwt(make_claims()))
+
+
+def test_rejects_other_algorithms(signing_key):
+    _, payload, signature = signing_key.jwt(make_claims()).split('.')
+    header = base64.urlsafe_b64encode(json.dumps({'kid': signing_key.kid, 'alg': 'none'}).encode())
+    with pytest.raises(AuthError, match='Unsupported token algorithm'):
+        verify_token(f"{header.rstrip(b'=').decode()}.{payload}.{signature}")
+
+
+@pytest.mark.parametrize('kid', [None, ['kid'], {'kid': 1}, 42])
+def test_rejects_key_ids_that_are_not_strings(signing_key, kid):
+    _, payload, signature = signing_key.jwt(make_claims()).split('.')
+    header = base64.urlsafe_b64encode(json.dumps({'kid': kid, 'alg': 'RS256'}).encode())
+    with pytest.raises(AuthError, match='Malformed token'):
+        verify_token(f"{header.rstrip(b'=').decode()}.{payload}.{signature}")
+
+
+@pytest.mark.parametrize('token', ['', 'abc', 'a.b', 'a.b.c.d', '!!!.???.***'])
+def test_rejects_malformed_tokens(token):
+    with pytest.raises(AuthError, match='Malformed token'):
+        verify_token(token)
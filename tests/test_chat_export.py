@@ -0,0 +1,127 @@
+"""Chat history export to S3 (export_user_history)"""
+import gzip
+import json
+import os
+import random
+
+import pytest
+
+from conftest import load_handler
+from fake_dynamodb import FakeDynamoDB
+from local_s3 import LocalS3Client
+from message_codec import encode_message_item
+
+load_handler('chat/chat-management', 'chat_management_app')
+
+import export  # noqa: E402
+
+BUCKET = 'uploads'
+TABLE = 'test-chatlogs'
+
+
+@pytest.fixture
+def chatlogs_table():
+    dynamodb = FakeDynamoDB()
+    return dynamodb.create_table(TABLE, ('sessionId', 'messageId'), {
+        'userId-timestamp-index': ('userId', 'timestamp', ('title', 'ttl'))})
+
+
+@pytest.fixture
+def s3_client(tmp_path):
+    return LocalS3Client(str(tmp_path))
+
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    monkeypatch.setattr(export, 'PART_SIZE_BYTES', 64 * 1024)
+
+
+def add_messages(table, user_id: str, session_id: str, count: int, content_bytes: int, rng) -> list:
+    """Store `count` messages (stored encoded, as the RAG function writes them); returns them decoded"""
+    messages = []
+    table.put_item(Item={'sessionId': session_id, 'messageId': '#meta', 'version': 1})
+    for i in range(count):
+        message = {
+            'sessionId': session_id,
+            'messageId': f"msg_{i:04d}",
+            'userId': user_id,
+            'timestamp': f"2025-10-19T10:{i:02d}:00",
+            'role': 'user' if i % 2 == 0 else 'assistant',
+            # Hex of random bytes: compresses ~2:1, so the gzip output spans several parts
+            'content': rng.randbytes(content_bytes // 2).hex()
+        }
+        table.put_item(Item=encode_message_item(message))
+        messages.append(message)
+    return messages
+
+
+def read_export(s3_client, key: str) -> list:
+    with open(os.path.join(s3_client.root, BUCKET, key), 'rb') as f:
+        return [json.loads(line) for line in gzip.decompress(f.read()).decode('utf-8').splitlines()]
+
+
+def test_exports_every_page_across_part_boundaries(chatlogs_table, s3_client):
+    rng = random.Random(7)
+    # 300 KB messages (~175 KB stored): session and index queries end pages at 1 MB
+    expected = []
+    for session in range(3):
+        expected += add_messages(chatlogs_table, 'user-1', f"session_{session}", 8, 300 * 1024, rng)
+    add_messages(chatlogs_table, 'user-2', 'session_other', 2, 1024, rng)
+
+    summary = export.export_user_history(chatlogs_table, s3_client, BUCKET, 'user-1', 'export_1')
+
+    assert summary['sessionCount'] == 3
+    assert summary['messageCount'] == 24
+    # More than one page for the index and for every session
+    assert chatlogs_table.resource.requests[TABLE]['Query'] >= 2 + 3 * 2
+    assert s3_client.calls['UploadPart'] > 1
+    assert s3_client.multipart == {}
+
+    exported = read_export(s3_client, summary['objectKey'])
+    key = lambda message: (message['sessionId'], message['messageId'])  # noqa: E731
+    assert sorted(exported, key=key) == sorted(expected, key=key)
+    # Messages of a session stay in order
+    for session in range(3):
+        ids = [m['messageId'] for m in exported if m['sessionId'] == f"session_{session}"]
+        assert ids == sorted(ids)
+
+
+def test_exports_an_empty_history(chatlogs_table, s3_client):
+    summary = export.export_user_history(chatlogs_table, s3_client, BUCKET, 'user-1', 'export_1')
+    assert summary['messageCount'] == 0
+    assert read_export(s3_client, summary['objectKey']) == []
+
+
+class FailingS3Client(LocalS3Client):
+    def upload_part(self, PartNumber: int, **kwargs) -> dict:
+        if PartNumber == 2:
+            raise RuntimeError('connection reset')
+        return super().upload_part(PartNumber=PartNumber, **kwargs)
+
+
+class FailingTable:
+    def __init__(self, table):
+        self.table = table
+        self.queries = 0
+
+    def query(self, **kwargs):
+        self.queries += 1
+        if self.queries == 3:
+            raise RuntimeError('throttled')
+        return self.table.query(**kwargs)
+
+
+@pytest.mark.parametrize('failure', ['s3', 'dynamodb'])
+def test_aborts_the_upload_on_failure(chatlogs_table, tmp_path, failure):
+    add_messages(chatlogs_table, 'user-1', 'session_0', 6, 300 * 1024, random.Random(7))
+    add_messages(chatlogs_table, 'user-1', 'session_1', 6, 300 * 1024, random.Random(8))
+    s3_client = FailingS3Client(str(tmp_path)) if failure == 's3' else LocalS3Client(str(tmp_path))
+    table = FailingTable(chatlogs_table) if failure == 'dynamodb' else chatlogs_table
+
+    with pytest.raises(RuntimeError):
+        export.export_user_history(table, s3_client, BUCKET, 'user-1', 'export_1')
+
+    assert s3_client.calls['AbortMultipartUpload'] == 1
+    assert 'CompleteMultipartUpload' not in s3_client.calls
+    assert s3_client.multipart == {}
+    assert not os.path.exists(os.path.join(str(tmp_path), BUCKET, export.export_object_key('user-1', 'export_1')))
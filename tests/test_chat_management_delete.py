@@ -0,0 +1,42 @@
+"""Session deletion of the chat management API (delete_session)"""
+from conftest import load_handler
+
+chat_app = load_handler('chat/chat-management', 'chat_management_app')
+
+
+class PagedTable:
+    """Stand-in for the chatlogs table returning `page_size` items per query"""
+
+    def __init__(self, items: list, page_size: int):
+        self.items = items
+        self.page_size = page_size
+        self.queries = 0
+        self.deleted = []
+        self.updated = []
+
+    def query(self, ExclusiveStartKey=None, **kwargs):
+        self.queries += 1
+        start = self.items.index(ExclusiveStartKey) + 1 if ExclusiveStartKey else 0
+        remaining = self.items[start:]
+        page = remaining[:self.page_size]
+        response = {'Items': [dict(item, userId='user-1') for item in page]}
+        if len(remaining) > self.page_size:
+            response['LastEvaluatedKey'] = page[-1]
+        return response
+
+    def delete_item(self, Key):
+        self.deleted.append({'messageId': Key['messageId']})
+
+    def update_item(self, Key, **kwargs):
+        self.updated.append(Key['sessionId'])
+
+
+def test_deletes_every_page_of_a_session(monkeypatch):
+    items = [{'messageId': chat_app.META_MESSAGE_ID}] + [{'messageId': f"msg_{i:04d}"} for i in range(25)]
+    table = PagedTable(items, page_size=10)
+    monkeypatch.setattr(chat_app, 'chatlogs_table', table)
+
+    assert chat_app.delete_session('session_1') == 25
+    assert table.queries == 3
+    assert table.deleted == items
+    assert table.updated == [f"{chat_app.USER_META_PREFIX}user-1"]
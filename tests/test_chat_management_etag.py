@@ -0,0 +1,69 @@
+"""Conditional GETs of the chat management API (etag_matches, get_version_etag)"""
+import pytest
+
+from conftest import load_handler
+
+chat_app = load_handler('chat/chat-management', 'chat_management_app')
+
+ETAG = '"v7-w123"'
+
+
+@pytest.mark.parametrize('if_none_match', [
+    '"v7-w123"',
+    'W/"v7-w123"',
+    ' "v7-w123" ',
+    '"v6-w123", "v7-w123"',
+    '"v6-w123",W/"v7-w123"',
+    '*',
+    ' * ',
+])
+def test_matching_if_none_match(if_none_match):
+    assert chat_app.etag_matches({'if-none-match': if_none_match}, ETAG)
+
+
+@pytest.mark.parametrize('if_none_match', [
+    '"v6-w123"',
+    '"v7-w124"',
+    'v7-w123',
+    '"V7-W123"',
+    '"v7-w123-summary"',
+    '"v6", "v8"',
+    '',
+])
+def test_other_if_none_match(if_none_match):
+    assert not chat_app.etag_matches({'if-none-match': if_none_match}, ETAG)
+
+
+def test_no_header_or_no_etag():
+    assert not chat_app.etag_matches({}, ETAG)
+    # Legacy sessions without a version item have no ETag: never 304
+    assert not chat_app.etag_matches({'if-none-match': '*'}, None)
+
+
+class VersionTable:
+    def __init__(self, item: dict = None):
+        self.item = item
+
+    def get_item(self, Key, **kwargs):
+        assert Key == {'sessionId': 'session_1', 'messageId': chat_app.META_MESSAGE_ID}
+        return {'Item': self.item} if self.item is not None else {}
+
+
+def test_version_etag(monkeypatch):
+    monkeypatch.setattr(chat_app, 'chatlogs_table', VersionTable({'version': 7}))
+    assert chat_app.get_version_etag('session_1') == '"v7"'
+    assert chat_app.get_version_etag('session_1', 'w123') == '"v7-w123"'
+
+
+@pytest.mark.parametrize('item', [None, {}])
+def test_version_etag_of_legacy_sessions(monkeypatch, item):
+    monkeypatch.setattr(chat_app, 'chatlogs_table', VersionTable(item))
+    assert chat_app.get_version_etag('session_1') is None
+
+
+def test_etag_changes_with_the_signing_window(monkeypatch):
+    monkeypatch.setattr(chat_app, 'chatlogs_table', VersionTable({'version': 7}))
+    window = chat_app.signing_window()
+    etag = chat_app.get_version_etag('session_1', f"w{window}")
+    assert chat_app.etag_matches({'if-none-match': etag}, chat_app.get_version_etag('session_1', f"w{window}"))
+    assert not chat_app.etag_matches({'if-none-match': etag}, chat_app.get_version_etag('session_1', f"w{window + 1}"))
@@ -0,0 +1,46 @@
+"""Export status route of the chat management API (GET /chat/exports/{jobId})"""
+import json
+
+import pytest
+from botocore.stub import Stubber
+
+from conftest import load_handler
+
+chat_app = load_handler('chat/chat-management', 'chat_management_app')
+
+
+@pytest.fixture
+def s3_stub(monkeypatch):
+    monkeypatch.setattr(chat_app, 'authenticate', lambda event: {'sub': 'user-1'})
+    monkeypatch.setattr(chat_app, 'EXPORTS_BUCKET', 'uploads')
+    with Stubber(chat_app.s3_client) as stubber:
+        yield stubber
+
+
+def get_export_status(job_id: str) -> dict:
+    return chat_app.lambda_handler({
+        'httpMethod': 'GET',
+        'path': f"/chat/exports/{job_id}",
+        'pathParameters': {'jobId': job_id},
+        'headers': {'Authorization': 'Bearer token'}
+    }, None)
+
+
+def test_unknown_job_is_not_found(s3_stub):
+    s3_stub.add_client_error('get_object', service_error_code='NoSuchKey', http_status_code=404,
+                             expected_params={'Bucket': 'uploads',
+                                              'Key': 'tmp/exports/user-1/export_123.status.json'})
+    response = get_export_status('export_123')
+    assert response['statusCode'] == 404
+    assert json.loads(response['body'])['error'] == 'NotFound'
+    s3_stub.assert_no_pending_responses()
+
+
+def test_access_denied_is_not_reported_as_missing(s3_stub):
+    s3_stub.add_client_error('get_object', service_error_code='AccessDenied', http_status_code=403)
+    assert get_export_status('export_123')['statusCode'] == 500
+
+
+@pytest.mark.parametrize('job_id', ['export_', 'export_1/../x', 'session_123'])
+def test_rejects_invalid_job_ids(s3_stub, job_id):
+    assert get_export_status(job_id)['statusCode'] == 400
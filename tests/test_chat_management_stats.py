@@ -0,0 +1,72 @@
+"""Statistics route of the chat management API (GET /chat/stats)"""
+import json
+
+import pytest
+
+from conftest import load_handler
+
+chat_app = load_handler('chat/chat-management', 'chat_management_app')
+
+DAY = '2025-10-19'
+STATS_ITEMS = [
+    {'pk': f"day#{DAY}", 'sk': 'queries', 'queryCount': 42},
+    {'pk': f"top-queries#{DAY}", 'sk': 'top', 'entries': {'配線の接続方法は': 5}},
+    {'pk': 'top-bad-documents', 'sk': 'top', 'entries': {'wiring-manual_v2.pdf': 3}},
+    {'pk': 'doc#wiring-manual_v2.pdf', 'sk': 'feedback', 'good': 10, 'bad': 3},
+]
+
+
+class StatsDynamoDB:
+    """Stand-in for the DynamoDB resource answering BatchGetItem from STATS_ITEMS"""
+
+    def __init__(self):
+        self.keys = []
+
+    def batch_get_item(self, RequestItems):
+        keys = RequestItems[chat_app.STATS_TABLE_NAME]['Keys']
+        self.keys.extend(keys)
+        items = [item for item in STATS_ITEMS if {'pk': item['pk'], 'sk': item['sk']} in keys]
+        return {'Responses': {chat_app.STATS_TABLE_NAME: items}}
+
+
+@pytest.fixture
+def stats_dynamodb(monkeypatch):
+    dynamodb = StatsDynamoDB()
+    monkeypatch.setattr(chat_app, 'dynamodb', dynamodb)
+    monkeypatch.setattr(chat_app, 'STATS_TABLE_NAME', 'test-chatstats')
+    return dynamodb
+
+
+def get_stats(monkeypatch, claims: dict) -> dict:
+    monkeypatch.setattr(chat_app, 'authenticate', lambda event: claims)
+    response = chat_app.lambda_handler({
+        'httpMethod': 'GET',
+        'path': '/chat/stats',
+        'queryStringParameters': {'day': DAY, 'document': 'wiring-manual_v2.pdf'},
+        'headers': {'Authorization': 'Bearer token'}
+    }, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_admins_see_rankings(monkeypatch, stats_dynamodb):
+    stats = get_stats(monkeypatch, {'sub': 'admin-1', 'cognito:groups': ['admins']})
+    assert stats['topQueries'] == [{'name': '配線の接続方法は', 'count': 5}]
+    assert stats['worstDocuments'] == [{'name': 'wiring-manual_v2.pdf', 'count': 3}]
+    assert stats['queryCount'] == 42
+
+
+@pytest.mark.parametrize('claims', [
+    {'sub': 'user-1'},
+    {'sub': 'user-1', 'cognito:groups': ['editors']},
+    {'sub': 'user-1', 'cognito:groups': 'admins'},
+])
+def test_other_users_see_counts_only(monkeypatch, stats_dynamodb, claims):
+    stats = get_stats(monkeypatch, claims)
+    assert stats == {
+        'day': DAY,
+        'queryCount': 42,
+        'document': {'documentName': 'wiring-manual_v2.pdf', 'good': 10, 'bad': 3}
+    }
+    # Rankings are not even read
+    assert all(key['pk'] not in (f"top-queries#{DAY}", 'top-bad-documents') for key in stats_dynamodb.keys)
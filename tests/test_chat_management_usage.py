@@ -0,0 +1,69 @@
+"""Usage route of the chat management API (GET /chat/usage)"""
+import json
+
+import pytest
+
+from conftest import load_handler
+
+chat_app = load_handler('chat/chat-management', 'chat_management_app')
+
+USER_ITEMS = [{'pk': 'usage-user#user-1', 'sk': '2025-10-19', 'answerCount': 3, 'inputTokens': 1500}]
+DAY_ITEMS = [{'pk': 'usage-day#2025-10-19', 'sk': 'total', 'answerCount': 40, 'inputTokens': 20000}]
+
+
+class UsageTable:
+    def query(self, ExpressionAttributeValues, **kwargs):
+        assert ExpressionAttributeValues[':pk'] == 'usage-user#user-1'
+        return {'Items': USER_ITEMS}
+
+
+class UsageDynamoDB:
+    def __init__(self):
+        self.batch_gets = 0
+
+    def batch_get_item(self, RequestItems):
+        self.batch_gets += 1
+        return {'Responses': {chat_app.STATS_TABLE_NAME: DAY_ITEMS}}
+
+
+@pytest.fixture
+def usage_dynamodb(monkeypatch):
+    dynamodb = UsageDynamoDB()
+    monkeypatch.setattr(chat_app, 'dynamodb', dynamodb)
+    monkeypatch.setattr(chat_app, 'stats_table', UsageTable())
+    monkeypatch.setattr(chat_app, 'STATS_TABLE_NAME', 'test-chatstats')
+    return dynamodb
+
+
+def get_usage(monkeypatch, claims: dict) -> dict:
+    monkeypatch.setattr(chat_app, 'authenticate', lambda event: claims)
+    response = chat_app.lambda_handler({
+        'httpMethod': 'GET',
+        'path': '/chat/usage',
+        'queryStringParameters': {'from': '2025-10-13', 'to': '2025-10-19'},
+        'headers': {'Authorization': 'Bearer token'}
+    }, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_admins_see_all_users(monkeypatch, usage_dynamodb):
+    usage = get_usage(monkeypatch, {'sub': 'user-1', 'cognito:groups': ['admins']})
+    assert usage['user']['totals']['inputTokens'] == 1500
+    assert usage['all']['totals']['inputTokens'] == 20000
+    assert usage['all']['days'][0]['answers'] == 40
+
+
+@pytest.mark.parametrize('claims', [
+    {'sub': 'user-1'},
+    {'sub': 'user-1', 'cognito:groups': ['editors']},
+])
+def test_other_users_see_their_own_usage_only(monkeypatch, usage_dynamodb, claims):
+    usage = get_usage(monkeypatch, claims)
+    assert set(usage) == {'from', 'to', 'user'}
+    assert usage['user']['totals'] == {
+        'answers': 3, 'inputTokens': 1500, 'outputTokens': 0, 'cacheReadInputTokens': 0,
+        'cacheWriteInputTokens': 0, 'costUsd': 0.0, 'averageRetrieveMs': 0,
+        'averageGenerateMs': 0, 'averageTotalMs': 0
+    }
+    assert usage_dynamodb.batch_gets == 0
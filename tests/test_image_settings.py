@@ -0,0 +1,42 @@
+"""Image downsampling settings of the PDF splitter (resolve_image_settings)"""
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'lambda', 'utils', 'pdf-splitter'))
+
+import image_resampler  # noqa: E402
+from image_resampler import resolve_image_settings  # noqa: E402
+
+RULES = [{'prefix': 'scanned/', 'dpi': 150, 'quality': 70}]
+
+
+@pytest.fixture(autouse=True)
+def folder_rules(monkeypatch):
+    monkeypatch.setattr(image_resampler, 'IMAGE_RULES', RULES)
+
+
+def test_metadata_wins_over_folder_rules():
+    assert resolve_image_settings('scanned/a.pdf', {'image-target-dpi': '200', 'image-quality': '60'}) == \
+        {'dpi': 200, 'quality': 60}
+    assert resolve_image_settings('scanned/a.pdf', {'image-target-dpi': '0'}) is None
+    assert resolve_image_settings('scanned/a.pdf', {'image-target-dpi': ''}) is None
+
+
+def test_folder_rules_without_metadata():
+    assert resolve_image_settings('scanned/a.pdf', {}) == {'dpi': 150, 'quality': 70}
+    assert resolve_image_settings('manuals/a.pdf', {}) is None
+
+
+@pytest.mark.parametrize('dpi', ['high', '150dpi', '1.5e2'])
+def test_non_numeric_dpi_tag_is_ignored(dpi):
+    assert resolve_image_settings('scanned/a.pdf', {'image-target-dpi': dpi}) == {'dpi': 150, 'quality': 70}
+    assert resolve_image_settings('manuals/a.pdf', {'image-target-dpi': dpi}) is None
+
+
+def test_non_numeric_quality_tag_uses_the_default():
+    assert resolve_image_settings('manuals/a.pdf', {'image-target-dpi': '150', 'image-quality': 'best'}) == \
+        {'dpi': 150, 'quality': image_resampler.DEFAULT_QUALITY}
@@ -0,0 +1,94 @@
+"""Compression of large chat message attributes (encode_message_item / decode_message_item)"""
+import json
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.types import Binary
+
+from message_codec import (COMPRESSION_THRESHOLD_BYTES, decode_message_item, encode_message_item,
+                           is_encoded)
+
+THRESHOLD = COMPRESSION_THRESHOLD_BYTES
+
+
+def message(**attributes) -> dict:
+    return {'sessionId': 'session_1', 'messageId': 'msg_1', 'role': 'assistant', **attributes}
+
+
+def source_documents(json_bytes: int) -> list:
+    """Source documents whose JSON (as encoded) is exactly `json_bytes` long"""
+    documents = [{'documentKey': 'manuals/wiring.pdf', 'score': Decimal('0.87'), 'page': 3, 'excerpt': ''}]
+    padding = json_bytes - len(json.dumps(documents, ensure_ascii=False, default=float).encode('utf-8'))
+    documents[0]['excerpt'] = 'x' * padding
+    return documents
+
+
+@pytest.mark.parametrize('content', [
+    'a' * THRESHOLD,
+    '配' * (THRESHOLD // 3),        # 1023 bytes
+])
+def test_content_at_the_threshold_is_stored_as_is(content):
+    item = message(content=content)
+    encoded = encode_message_item(item)
+    assert encoded['content'] == content
+    assert not is_encoded(encoded)
+    assert decode_message_item(dict(encoded)) == item
+
+
+@pytest.mark.parametrize('content', [
+    'a' * (THRESHOLD + 1),
+    '配' * (THRESHOLD // 3 + 1),    # 1026 bytes
+])
+def test_content_above_the_threshold_round_trips(content):
+    item = message(content=content)
+    encoded = encode_message_item(item)
+    assert encoded['contentEncoding'] == 'zlib-v1'
+    assert isinstance(encoded['content'], bytes)
+    assert item['content'] == content  # input item unchanged
+    assert decode_message_item(dict(encoded)) == item
+
+
+def test_source_documents_at_the_threshold_are_stored_as_is():
+    item = message(content='answer', sourceDocuments=source_documents(THRESHOLD))
+    encoded = encode_message_item(item)
+    assert encoded['sourceDocuments'] == item['sourceDocuments']
+    assert not is_encoded(encoded)
+
+
+def test_source_documents_above_the_threshold_round_trip():
+    item = message(content='answer', sourceDocuments=source_documents(THRESHOLD + 1))
+    encoded = encode_message_item(item)
+    assert encoded['sourceDocumentsEncoding'] == 'zlib-json-v1'
+    assert 'contentEncoding' not in encoded
+    decoded = decode_message_item(dict(encoded))
+    assert decoded == item
+    # Numbers come back as Decimal, as DynamoDB returns them
+    assert decoded['sourceDocuments'][0]['score'] == Decimal('0.87')
+    assert isinstance(decoded['sourceDocuments'][0]['score'], Decimal)
+
+
+def test_source_documents_compression_can_be_disabled():
+    item = message(content='answer', sourceDocuments=source_documents(THRESHOLD * 4))
+    assert encode_message_item(item, compress_source_documents=False) == item
+
+
+def test_decodes_boto3_binary():
+    item = message(content='b' * 4096, sourceDocuments=source_documents(4096))
+    encoded = encode_message_item(item)
+    encoded['content'] = Binary(encoded['content'])
+    encoded['sourceDocuments'] = Binary(encoded['sourceDocuments'])
+    assert decode_message_item(encoded) == item
+
+
+def test_legacy_items_are_read_unchanged():
+    legacy = message(content='c' * 4096, sourceDocuments=source_documents(4096), timestamp='2025-10-19T10:00:00')
+    assert decode_message_item(dict(legacy)) == legacy
+
+
+@pytest.mark.parametrize('attribute, marker', [
+    ('content', 'contentEncoding'),
+    ('sourceDocuments', 'sourceDocumentsEncoding'),
+])
+def test_rejects_unknown_encodings(attribute, marker):
+    with pytest.raises(ValueError, match='Unsupported'):
+        decode_message_item(message(**{attribute: b'...', marker: 'brotli-v9'}))
@@ -0,0 +1,181 @@
+"""Split manifest of the PDF splitter (manifest, process_object, delete_stale_parts)"""
+import os
+
+import pytest
+
+from conftest import load_handler
+from fake_dynamodb import FakeDynamoDB
+from local_s3 import LocalS3Client
+
+splitter_app = load_handler('utils/pdf-splitter', 'pdf_splitter_app')
+
+import manifest  # noqa: E402
+import text_sidecar  # noqa: E402
+
+BUCKET = 'documents'
+SOURCE_KEY = 'manuals/wiring.pdf'
+NOW = 1_760_000_000
+
+
+@pytest.fixture
+def manifest_table():
+    return FakeDynamoDB().create_table('test-pdf-split-manifest', ('sourceKey', None))
+
+
+@pytest.fixture
+def s3_client(tmp_path, monkeypatch):
+    client = LocalS3Client(str(tmp_path))
+    monkeypatch.setattr(splitter_app, 's3_client', client)
+    return client
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(manifest.time, 'time', lambda: now[0])
+    return now
+
+
+def part_keys(count: int) -> list:
+    return [f"manuals/wiring_part{i}.pdf" for i in range(1, count + 1)]
+
+
+def chunks_of(keys: list) -> list:
+    return [{'key': key, 'sha256': f"sha-{key}", 'size': 1024, 'startPage': i * 10 + 1, 'endPage': i * 10 + 10}
+            for i, key in enumerate(keys)]
+
+
+def exists(s3_client, bucket: str, key: str) -> bool:
+    return os.path.exists(os.path.join(s3_client.root, bucket, key))
+
+
+# ---------------------------------------------------------------------------
+# ETag-keyed skip (process_object)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def splitter(monkeypatch, manifest_table, s3_client):
+    """process_object with a 60 MB source whose ETag the test sets; counts splits"""
+    source = {'size': 60 * 1024 * 1024, 'etag': '"etag-1"', 'metadata': {}}
+    splits = []
+
+    def split_and_upload_in_memory(bucket, key, head, image_settings=None):
+        splits.append(head['etag'])
+        return chunks_of(part_keys(2)), None
+
+    monkeypatch.setattr(splitter_app, 'manifest_table', manifest_table)
+    monkeypatch.setattr(splitter_app, 'get_object_head', lambda bucket, key: dict(source))
+    monkeypatch.setattr(splitter_app, 'split_and_upload_in_memory', split_and_upload_in_memory)
+    return source, splits
+
+
+def test_skips_versions_already_split(splitter, manifest_table):
+    source, splits = splitter
+
+    assert splitter_app.process_object(BUCKET, SOURCE_KEY)['status'] == 'split'
+    stored = manifest.get_manifest(manifest_table, SOURCE_KEY)
+    assert (stored['status'], stored['etag'], stored['profile']) == ('completed', '"etag-1"', 'lossless')
+    assert 'leaseOwner' not in stored
+
+    # Duplicate delivery / identical re-upload: same ETag
+    result = splitter_app.process_object(BUCKET, SOURCE_KEY)
+    assert (result['status'], result['reason']) == ('skipped', 'already split')
+    assert result['chunks'] == part_keys(2)
+    assert splits == ['"etag-1"']
+
+    # New version of the source
+    source['etag'] = '"etag-2"'
+    assert splitter_app.process_object(BUCKET, SOURCE_KEY)['status'] == 'split'
+    assert splits == ['"etag-1"', '"etag-2"']
+    assert manifest.get_manifest(manifest_table, SOURCE_KEY)['etag'] == '"etag-2"'
+
+
+def test_completed_is_keyed_by_etag_and_profile(manifest_table):
+    manifest_table.put_item(Item={'sourceKey': SOURCE_KEY, 'status': 'completed', 'etag': '"etag-1"',
+                                  'profile': 'lossless', 'chunks': []})
+    stored = manifest.get_manifest(manifest_table, SOURCE_KEY)
+    assert manifest.is_completed(stored, '"etag-1"', 'lossless')
+    assert not manifest.is_completed(stored, '"etag-1"', 'images-150dpi-q70')
+    assert not manifest.is_completed(stored, '"etag-2"', 'lossless')
+    assert not manifest.is_completed(None, '"etag-1"', 'lossless')
+
+
+# ---------------------------------------------------------------------------
+# Lease
+# ---------------------------------------------------------------------------
+
+def test_lease_is_exclusive_until_it_expires(manifest_table, clock):
+    assert manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-a')
+    assert not manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-b')
+
+    clock[0] = NOW + manifest.LEASE_SECONDS - 1
+    assert not manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-2"', 'lossless', 'worker-b')
+
+    # worker-a crashed: its lease expired
+    clock[0] = NOW + manifest.LEASE_SECONDS + 1
+    assert manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-2"', 'lossless', 'worker-b')
+    stored = manifest.get_manifest(manifest_table, SOURCE_KEY)
+    assert (stored['leaseOwner'], stored['processingEtag']) == ('worker-b', '"etag-2"')
+    assert stored['leaseExpiresAt'] == clock[0] + manifest.LEASE_SECONDS
+
+
+def test_expired_owner_cannot_complete_or_release(manifest_table, clock):
+    manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-a')
+    clock[0] = NOW + manifest.LEASE_SECONDS + 1
+    manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-b')
+
+    with pytest.raises(manifest.ClientError, match='ConditionalCheckFailed'):
+        manifest.complete_manifest(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-a', [])
+    manifest.release_lease(manifest_table, SOURCE_KEY, 'worker-a', 'late failure')
+    stored = manifest.get_manifest(manifest_table, SOURCE_KEY)
+    assert (stored['status'], stored['leaseOwner']) == ('processing', 'worker-b')
+
+    manifest.complete_manifest(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-b', chunks_of(part_keys(1)))
+    assert manifest.get_manifest(manifest_table, SOURCE_KEY)['status'] == 'completed'
+
+
+def test_no_lease_for_a_completed_version(manifest_table, clock):
+    manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-a')
+    manifest.complete_manifest(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-a', [])
+
+    assert not manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-b')
+    assert manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'images-150dpi-q70', 'worker-b')
+
+
+def test_failed_split_releases_the_lease(manifest_table, clock):
+    manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-a')
+    manifest.release_lease(manifest_table, SOURCE_KEY, 'worker-a', 'PdfReadError')
+    stored = manifest.get_manifest(manifest_table, SOURCE_KEY)
+    assert (stored['status'], stored['lastError']) == ('failed', 'PdfReadError')
+    assert manifest.acquire_lease(manifest_table, SOURCE_KEY, '"etag-1"', 'lossless', 'worker-b')
+
+
+# ---------------------------------------------------------------------------
+# Stale parts
+# ---------------------------------------------------------------------------
+
+def test_deletes_only_parts_of_the_previous_manifest(monkeypatch, s3_client):
+    monkeypatch.setattr(text_sidecar, 'TEXT_SIDECAR_BUCKET', 'pdf-text')
+    previous = part_keys(3)
+    users_own = 'manuals/wiring_part4.pdf'  # same naming, never produced by the splitter
+    for key in previous + [users_own]:
+        s3_client.put_object(Bucket=BUCKET, Key=key, Body=b'%PDF')
+        s3_client.put_object(Bucket=BUCKET, Key=splitter_app.metadata_sidecar_key(key), Body=b'{}')
+        s3_client.put_object(Bucket='pdf-text', Key=text_sidecar.sidecar_key(key), Body=b'')
+
+    removed = splitter_app.delete_stale_parts(BUCKET, SOURCE_KEY, chunks_of(previous), keep_keys=previous[:1])
+
+    assert removed == previous[1:]
+    for key in previous[1:]:
+        assert not exists(s3_client, BUCKET, key)
+        assert not exists(s3_client, BUCKET, splitter_app.metadata_sidecar_key(key))
+        assert not exists(s3_client, 'pdf-text', text_sidecar.sidecar_key(key))
+    for key in [previous[0], users_own]:
+        assert exists(s3_client, BUCKET, key)
+        assert exists(s3_client, BUCKET, splitter_app.metadata_sidecar_key(key))
+        assert exists(s3_client, 'pdf-text', text_sidecar.sidecar_key(key))
+
+
+def test_nothing_to_delete_without_a_previous_manifest(s3_client):
+    assert splitter_app.delete_stale_parts(BUCKET, SOURCE_KEY, [], keep_keys=part_keys(2)) == []
+    assert 'DeleteObjects' not in s3_client.calls
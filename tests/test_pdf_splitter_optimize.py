@@ -0,0 +1,41 @@
+"""Lossless optimization before splitting in memory (split_and_upload_in_memory)"""
+from io import BytesIO
+
+import pytest
+
+from conftest import load_handler
+
+splitter_app = load_handler('utils/pdf-splitter', 'pdf_splitter_app')
+
+SOURCE = b'%PDF-1.7 source bytes'
+
+
+@pytest.fixture
+def split_streams(monkeypatch):
+    """Streams handed to split_and_upload"""
+    streams = []
+    monkeypatch.setattr(splitter_app, 'download_pdf_from_s3', lambda bucket, key: BytesIO(SOURCE))
+    monkeypatch.setattr(splitter_app, 'split_and_upload',
+                        lambda pdf_stream, bucket, key, metadata: streams.append(pdf_stream) or [])
+    return streams
+
+
+def optimized_to(data: bytes):
+    def optimize_pdf(pdf_stream):
+        output = BytesIO()
+        output.write(data)
+        return output, {}
+    return optimize_pdf
+
+
+def test_uses_the_smaller_optimized_copy(monkeypatch, split_streams):
+    monkeypatch.setattr(splitter_app, 'optimize_pdf', optimized_to(b'%PDF small'))
+    splitter_app.split_and_upload_in_memory('bucket', 'manual.pdf', {'size': len(SOURCE), 'metadata': {}})
+    assert split_streams[0].getvalue() == b'%PDF small'
+
+
+@pytest.mark.parametrize('data', [SOURCE, SOURCE + b' grown by the rewrite'])
+def test_keeps_the_source_when_optimization_does_not_shrink_it(monkeypatch, split_streams, data):
+    monkeypatch.setattr(splitter_app, 'optimize_pdf', optimized_to(data))
+    splitter_app.split_and_upload_in_memory('bucket', 'manual.pdf', {'size': len(SOURCE), 'metadata': {}})
+    assert split_streams[0].getvalue() == SOURCE
@@ -0,0 +1,18 @@
+"""Message IDs of the RAG function (generate_message_id)"""
+from conftest import load_handler
+
+rag_app = load_handler('rag/rag-function', 'rag_app')
+
+
+def test_ids_of_the_same_millisecond_do_not_collide(monkeypatch):
+    monkeypatch.setattr(rag_app.time, 'time', lambda: 1760850000.1234)
+    ids = {rag_app.generate_message_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(message_id.startswith('msg_1760850000123_') for message_id in ids)
+
+
+def test_ids_sort_by_time(monkeypatch):
+    monkeypatch.setattr(rag_app.time, 'time', lambda: 1760850000.001)
+    earlier = rag_app.generate_message_id()
+    monkeypatch.setattr(rag_app.time, 'time', lambda: 1760850000.002)
+    assert earlier < rag_app.generate_message_id()
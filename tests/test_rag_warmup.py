@@ -0,0 +1,25 @@
+"""Warm-up invocations of the RAG function (WARMUP_TARGETS)"""
+from botocore.stub import Stubber
+
+import warmup
+from conftest import load_handler
+
+rag_app = load_handler('rag/rag-function', 'rag_app')
+
+BEDROCK_TARGETS = ('bedrock-agent-runtime', 'bedrock-runtime')
+
+
+def test_bedrock_targets_send_no_requests():
+    # A stubber without queued responses fails every request
+    with Stubber(rag_app.bedrock_agent), Stubber(rag_app.bedrock_runtime):
+        result = warmup.warm_up({name: rag_app.WARMUP_TARGETS[name] for name in BEDROCK_TARGETS})
+
+    for name in BEDROCK_TARGETS:
+        assert set(result['targets'][name]) == {'ms'}
+
+
+def test_prepare_client_loads_operation_models():
+    with Stubber(rag_app.bedrock_runtime):
+        warmup.prepare_client(rag_app.bedrock_runtime, 'InvokeModel')
+    operation_model = rag_app.bedrock_runtime.meta.service_model.operation_model('InvokeModel')
+    assert 'modelId' in operation_model.input_shape.members
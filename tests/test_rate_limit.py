@@ -0,0 +1,139 @@
+"""Token buckets and shared counters of the auth rate limiter (rate_limit.check_rate_limit)"""
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+import rate_limit
+from rate_limit import check_rate_limit
+
+LIMITS = {'login': {'ip': (3, 60), 'account': (2, 60)}}
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class CounterTable:
+    """Stand-in for the rate limit table: hits per pk, conditional ADD"""
+
+    def __init__(self, error: Exception = None, on_update=None):
+        self.hits = {}
+        self.calls = 0
+        self.error = error
+        self.on_update = on_update
+
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs):
+        self.calls += 1
+        if self.on_update:
+            self.on_update()
+        if self.error:
+            raise self.error
+        if self.hits.get(Key['pk'], 0) >= ExpressionAttributeValues[':limit']:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+        self.hits[Key['pk']] = self.hits.get(Key['pk'], 0) + 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    monkeypatch.setattr(rate_limit, '_buckets', {})
+    monkeypatch.setattr(rate_limit, 'RATE_LIMITS', LIMITS)
+    monkeypatch.setattr(rate_limit, 'rate_limit_table', None)
+    return clock
+
+
+def event(ip: str = '198.51.100.1') -> dict:
+    return {'requestContext': {'identity': {'sourceIp': ip}}}
+
+
+def test_bucket_allows_limit_then_waits_for_refill(clock):
+    assert [check_rate_limit('login', event()) for _ in range(3)] == [0, 0, 0]
+    assert check_rate_limit('login', event()) == 20  # one token per 60s / 3
+
+    clock.now += 19
+    assert check_rate_limit('login', event()) == 1
+    clock.now += 1
+    assert check_rate_limit('login', event()) == 0
+
+
+def test_bucket_refill_is_capped_at_limit(clock):
+    for _ in range(3):
+        check_rate_limit('login', event())
+    clock.now += 3600
+    assert [check_rate_limit('login', event()) for _ in range(4)] == [0, 0, 0, 20]
+
+
+def test_rejected_requests_take_no_token(clock):
+    for _ in range(3):
+        check_rate_limit('login', event())
+    for _ in range(5):
+        assert check_rate_limit('login', event())
+    clock.now += 20
+    assert check_rate_limit('login', event()) == 0
+
+
+def test_keys_are_per_ip_and_per_normalized_account(clock):
+    for _ in range(3):
+        check_rate_limit('login', event('198.51.100.1'))
+    assert check_rate_limit('login', event('198.51.100.2')) == 0
+
+    assert check_rate_limit('login', event('203.0.113.1'), 'User@Example.com') == 0
+    assert check_rate_limit('login', event('203.0.113.2'), ' user@example.com ') == 0
+    assert check_rate_limit('login', event('203.0.113.3'), 'USER@example.com') == 30
+
+
+def test_events_without_ip_or_rules_are_not_limited(clock):
+    for _ in range(10):
+        assert check_rate_limit('login', {}) == 0
+        assert check_rate_limit('unknown-action', event()) == 0
+
+
+def test_full_bucket_cache_is_emptied_before_the_check(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'LOCAL_BUCKETS_MAX_ENTRIES', 2)
+    check_rate_limit('login', event('198.51.100.1'), 'a@example.com')
+    assert len(rate_limit._buckets) == 2
+
+    check_rate_limit('login', event('198.51.100.1'), 'a@example.com')
+    assert len(rate_limit._buckets) == 2
+
+    check_rate_limit('login', event('198.51.100.2'))
+    assert list(rate_limit._buckets) == ['login#ip#198.51.100.2']
+
+
+def test_shared_counter_blocks_until_window_end(clock, monkeypatch):
+    table = CounterTable()
+    monkeypatch.setattr(rate_limit, 'rate_limit_table', table)
+    # Other containers used up the window of this IP
+    window_start = int(clock.now) // 60 * 60
+    table.hits[f"login#ip#198.51.100.1#{window_start}"] = 3
+
+    wait = check_rate_limit('login', event())
+    assert wait == window_start + 60 - int(clock.now)
+    calls = table.calls
+
+    # Blocked locally for the rest of the window, without table calls
+    clock.now += wait - 1
+    assert check_rate_limit('login', event()) == 1
+    assert table.calls == calls
+
+
+def test_eviction_during_shared_check_does_not_fail(clock, monkeypatch):
+    table = CounterTable(
+        error=ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem'),
+        on_update=rate_limit._buckets.clear
+    )
+    monkeypatch.setattr(rate_limit, 'rate_limit_table', table)
+    assert check_rate_limit('login', event()) > 0
+
+
+@pytest.mark.parametrize('error', [
+    ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'UpdateItem'),
+    EndpointConnectionError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com'),
+])
+def test_table_failures_fail_open(clock, monkeypatch, error):
+    monkeypatch.setattr(rate_limit, 'rate_limit_table', CounterTable(error=error))
+    assert [check_rate_limit('login', event()) for _ in range(3)] == [0, 0, 0]